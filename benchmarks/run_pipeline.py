@@ -0,0 +1,291 @@
+# ----------------------- run_pipeline.py -----------------------
+"""
+Benchmark end-to-end pipeline NL2SQL dengan LLM stub (offline, deterministik).
+
+Tahapan yang diukur per pertanyaan (sama seperti nl2sql.py):
+    sql (intent/get_sql_query) -> execute -> dataframe -> insight -> viz -> figure
+
+Pemakaian:
+    python benchmarks/run_pipeline.py                       # scale 0.1,1,5 lalu bandingkan dengan baseline
+    python benchmarks/run_pipeline.py --scales 1 --iterations 10
+    python benchmarks/run_pipeline.py --save-baseline       # simpan hasil sebagai baseline baru
+    python benchmarks/run_pipeline.py --llm-latency 300     # simulasi latensi LLM (ms per panggilan)
+    python benchmarks/run_pipeline.py --sql-mode combined   # SQL + rencana grafik dalam satu panggilan LLM
+
+Database tiap scale factor dibuat sekali oleh seed_data.py (--seed 42) di benchmarks/.data/.
+Exit code 1 jika ada regresi p95/memori melebihi toleransi terhadap baseline.
+Exit code 2 jika baseline diukur dengan pengaturan lain (sql_mode / llm_latency_ms):
+hasilnya tidak sebanding, jadi perbandingan ditolak.
+
+Angka baseline bergantung pada mesin (CPU, disk, versi Python/SQLite). baseline.json
+di repo hanya contoh; buat ulang di setiap mesin sebelum membandingkan:
+    python benchmarks/run_pipeline.py --save-baseline [--sql-mode ...] [--llm-latency ...]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+CORPUS_PATH = os.path.join(BENCH_DIR, "corpus.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+STAGES = ["sql", "execute", "dataframe", "insight", "viz", "figure", "total"]
+SEED = 42
+# Pengaturan yang harus sama agar hasil sebanding (default dipakai untuk baseline lama tanpa field ini)
+COMPARABLE_META = {"sql_mode": "separate", "llm_latency_ms": 0.0}
+
+
+# --- Worker: satu proses per scale factor (DATABASE_PATH dibaca saat import config) ---
+
+def _run_question(question, pipeline):
+    timings = {}
+    start = time.perf_counter()
+
+    mark = time.perf_counter()
+    schema = pipeline["get_current_schema"]()
+    intent = pipeline["match_intent"](question) if pipeline["INTENT_FAST_PATH"] else None
+    viz_plan = None
+    if intent:
+        sql = intent[1]
+    elif pipeline["SQL_MODE"] == "combined":
+        sql, viz_plan = pipeline["get_sql_and_visualization"](question, schema, use_cache=False)
+    else:
+        sql = pipeline["get_sql_query"](question, schema, use_cache=False)
+    timings["sql"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    rows, cols = pipeline["execute_sql_query"](sql, use_cache=False, question=question)
+    timings["execute"] = time.perf_counter() - mark
+    if isinstance(rows, str):
+        raise RuntimeError(f"{question}: {rows}")
+
+    mark = time.perf_counter()
+    df = pipeline["result_to_dataframe"](rows, cols)
+    timings["dataframe"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    pipeline["generate_data_insight"](question, df)
+    timings["insight"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    if viz_plan is not None:
+        viz_config = pipeline["visualization_from_plan"](question, df, viz_plan)
+    else:
+        viz_config = pipeline["get_visualization_recommendation"](question, df)
+    timings["viz"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    if viz_config.get("chart_type", "none") != "none":
+        pipeline["build_chart"](df, viz_config)
+    timings["figure"] = time.perf_counter() - mark
+
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def run_worker(args):
+    sys.path.insert(0, REPO_DIR)
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    import stub_llm
+    stub = stub_llm.install(corpus, args.llm_latency)
+
+    from module.config import INTENT_FAST_PATH, DATABASE_PATH, SQL_MODE
+    from module.intent_registry import match_intent
+    from module.query_engine import (
+        get_sql_query, get_sql_and_visualization, generate_data_insight,
+        get_visualization_recommendation, visualization_from_plan,
+    )
+    from module.sql_utils import execute_sql_query, get_current_schema
+    from module.render_utils import result_to_dataframe, build_chart
+    from module.connection_pool import get_pool
+    pipeline = {
+        "INTENT_FAST_PATH": INTENT_FAST_PATH, "match_intent": match_intent, "get_sql_query": get_sql_query,
+        "SQL_MODE": SQL_MODE, "get_sql_and_visualization": get_sql_and_visualization,
+        "visualization_from_plan": visualization_from_plan,
+        "get_current_schema": get_current_schema, "execute_sql_query": execute_sql_query,
+        "result_to_dataframe": result_to_dataframe, "generate_data_insight": generate_data_insight,
+        "get_visualization_recommendation": get_visualization_recommendation, "build_chart": build_chart,
+    }
+
+    with get_pool(DATABASE_PATH).connection() as conn:
+        orders = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    questions = [entry["question"] for entry in corpus]
+    for question in questions:  # Warm-up: koneksi, schema cache, import lazy
+        _run_question(question, pipeline)
+
+    samples = {stage: [] for stage in STAGES}
+    for _ in range(args.iterations):
+        for question in questions:
+            for stage, seconds in _run_question(question, pipeline).items():
+                samples[stage].append(seconds * 1000)
+
+    # Satu putaran terpisah dengan tracemalloc (tidak ikut diukur waktunya)
+    tracemalloc.start()
+    for question in questions:
+        _run_question(question, pipeline)
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {
+        "orders": orders,
+        "stages": {
+            stage: {
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "p99": float(np.percentile(values, 99)),
+                "mean": float(np.mean(values)),
+            }
+            for stage, values in samples.items()
+        },
+        # ru_maxrss dalam KB di Linux, byte di macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+        "peak_traced_mb": traced_peak / (1024 * 1024),
+        "llm_calls": stub.calls,
+    }
+    print(json.dumps(result))
+
+
+# --- Orkestrator ---
+
+def ensure_database(scale: float, workers: int) -> str:
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"sf_{scale:g}.db")
+    if not os.path.exists(path):
+        print(f"⏳ Membuat database scale {scale:g}...")
+        subprocess.run(
+            [sys.executable, os.path.join(REPO_DIR, "seed_data.py"), "--db", path,
+             "--scale", str(scale), "--seed", str(SEED), "--workers", str(workers)],
+            check=True, cwd=REPO_DIR, stdout=subprocess.DEVNULL,
+        )
+    return path
+
+
+def run_scale(scale: float, args) -> dict:
+    db_path = ensure_database(scale, args.seed_workers)
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        env = dict(os.environ, DATABASE_PATH=db_path, WORKLOAD_LOG_PATH=os.path.join(tmp, "workload_log.db"),
+                   GROQ_API_KEY=os.environ.get("GROQ_API_KEY", "stub"), SQL_MODE=args.sql_mode)
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker",
+             "--iterations", str(args.iterations), "--llm-latency", str(args.llm_latency)],
+            check=True, cwd=tmp, env=env, capture_output=True, text=True,
+        )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def print_results(results: dict):
+    for scale, result in results.items():
+        print(f"\n=== scale {scale} ({result['orders']:,} order) | peak RSS {result['peak_rss_mb']:.1f} MB"
+              f" | peak Python alloc {result['peak_traced_mb']:.1f} MB | LLM calls {result['llm_calls']}")
+        print(f"  {'stage':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+        for stage in STAGES:
+            s = result["stages"][stage]
+            print(f"  {stage:<10}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['p99']:>10.2f}{s['mean']:>10.2f}")
+
+
+def run_meta(args) -> dict:
+    return {"python": platform.python_version(), "machine": platform.machine(),
+            "iterations": args.iterations, "llm_latency_ms": args.llm_latency, "sql_mode": args.sql_mode}
+
+
+def meta_mismatch(meta: dict, baseline: dict) -> list:
+    """Pengaturan yang berbeda antara run ini dan baseline (membuat perbandingan tidak valid)."""
+    base_meta = baseline.get("meta", {})
+    return [
+        f"{key}: baseline {base_meta.get(key, default)!r}, run ini {meta[key]!r}"
+        for key, default in COMPARABLE_META.items()
+        if base_meta.get(key, default) != meta[key]
+    ]
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """Daftar regresi: p95 per stage dan peak RSS yang memburuk melebihi toleransi."""
+    regressions = []
+    for scale, result in results.items():
+        base = baseline.get("results", {}).get(scale)
+        if base is None:
+            continue
+        for stage in STAGES:
+            now, before = result["stages"][stage]["p95"], base["stages"][stage]["p95"]
+            if now > before * (1 + tolerance) and now - before > min_delta_ms:
+                regressions.append(f"scale {scale} {stage}: p95 {before:.2f} -> {now:.2f} ms")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"scale {scale}: peak RSS {base['peak_rss_mb']:.1f} -> {result['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline NL2SQL end-to-end (LLM stub)")
+    parser.add_argument("--scales", default="0.1,1,5", help="Daftar scale factor seed_data, dipisah koma")
+    parser.add_argument("--iterations", type=int, default=5, help="Putaran corpus per scale factor")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latensi simulasi LLM (ms per panggilan)")
+    parser.add_argument("--sql-mode", choices=["separate", "combined"], default="separate",
+                        help="Mode SQL_MODE (combined = SQL + rencana grafik dalam satu panggilan)")
+    parser.add_argument("--seed-workers", type=int, default=4, help="Worker seed_data saat membuat database")
+    parser.add_argument("--save-baseline", action="store_true", help="Simpan hasil sebagai baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Toleransi regresi (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Selisih p95 minimal agar dianggap regresi")
+    parser.add_argument("--output", help="Tulis hasil mentah ke file JSON")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    results = {}
+    for scale in [float(s) for s in args.scales.split(",")]:
+        results[f"{scale:g}"] = run_scale(scale, args)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    meta = run_meta(args)
+    if args.save_baseline:
+        baseline = {"meta": meta, "results": results}
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\n💾 Baseline disimpan ke {BASELINE_PATH}")
+        return
+
+    if not os.path.exists(BASELINE_PATH):
+        print("\nℹ️ Belum ada baseline (jalankan dengan --save-baseline).")
+        return
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f)
+    mismatch = meta_mismatch(meta, baseline)
+    if mismatch:
+        print("\n⚠️ Baseline diukur dengan pengaturan berbeda, perbandingan ditolak:")
+        for line in mismatch:
+            print(f"  - {line}")
+        print("  Jalankan dengan pengaturan yang sama, atau buat baseline baru dengan --save-baseline.")
+        sys.exit(2)
+    base_meta = baseline.get("meta", {})
+    if (base_meta.get("machine"), base_meta.get("python")) != (meta["machine"], meta["python"]):
+        print(f"\nℹ️ Baseline dibuat di {base_meta.get('machine')} / Python {base_meta.get('python')}; "
+              "angka antar mesin tidak sebanding, buat ulang baseline di mesin ini.")
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print("\n❌ Regresi terhadap baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\n✅ Tidak ada regresi terhadap baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# ----------------------- stub_llm.py -----------------------
+import json
+import time
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+# LLM pengganti ChatGroq untuk benchmark: jawaban deterministik dari corpus,
+# tanpa jaringan. Prompt, parser, dan seluruh pipeline tetap yang asli.
+
+
+class StubLLM:
+    def __init__(self, corpus: list, latency_ms: float = 0.0):
+        # Pertanyaan terpanjang dicocokkan dulu agar tidak tertukar dengan pertanyaan yang lebih pendek
+        self.entries = sorted(corpus, key=lambda e: len(e["question"]), reverse=True)
+        self.latency = latency_ms / 1000.0
+        self.calls = {"sql": 0, "combined": 0, "insight": 0, "viz": 0}
+
+    def _find(self, prompt: str) -> dict:
+        for entry in self.entries:
+            if entry["question"] in prompt:
+                return entry
+        raise KeyError("Pertanyaan tidak ada di corpus benchmark")
+
+    def respond(self, prompt_value) -> AIMessage:
+        prompt = prompt_value.to_string()
+        entry = self._find(prompt)
+        if self.latency:
+            time.sleep(self.latency)
+        if "### Output Format (JSON)" in prompt:
+            self.calls["combined"] += 1
+            return AIMessage(content=json.dumps({"sql": entry["sql"], **entry.get("viz", {"chart_type": "none"})}))
+        if "SQLite Data Analyst" in prompt:
+            self.calls["sql"] += 1
+            return AIMessage(content=entry["sql"])
+        if "Data Visualization Expert" in prompt:
+            self.calls["viz"] += 1
+            return AIMessage(content=json.dumps(entry.get("viz", {"chart_type": "none"})))
+        self.calls["insight"] += 1
+        return AIMessage(content=f"Insight untuk: {entry['question']}")
+
+    def as_runnable(self):
+        return RunnableLambda(self.respond)
+
+
+def install(corpus: list, latency_ms: float = 0.0) -> StubLLM:
+    """Ganti get_llm di llm_client dengan stub (panggil sebelum chain pertama dibangun)."""
+    import module.llm_client as llm_client
+    stub = StubLLM(corpus, latency_ms)
+    llm_client.get_llm = lambda temperature=0, model=None: stub.as_runnable()
+    return stub
@@ -2,4 +2,100 @@ import os
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 MODEL_NAME = "llama-3.3-70b-versatile"
-DATABASE_PATH = "ecommerce.db"
\ No newline at end of file
+DATABASE_PATH = os.getenv("DATABASE_PATH", "ecommerce.db")
+
+# --- Connection Pool (Read-Only) ---
+DB_POOL_SIZE = 4               # Maksimal koneksi read-only yang disimpan
+DB_POOL_TIMEOUT = 10           # Detik menunggu koneksi kosong sebelum gagal
+DB_MMAP_SIZE = 256 * 1024 * 1024   # 256 MB memory-mapped I/O
+DB_CACHE_SIZE_KB = 64 * 1024       # 64 MB page cache per koneksi
+
+# --- LLM Client ---
+LLM_TIMEOUT = 60               # Detik timeout request ke Groq
+LLM_MAX_CONNECTIONS = 10       # Batas koneksi HTTP (keep-alive) yang dibagi semua chain
+
+# --- Question -> SQL Cache (persisten di disk) ---
+QUESTION_CACHE_PATH = "query_cache.db"
+QUESTION_CACHE_TTL = 24 * 60 * 60      # Detik sebelum entri dianggap kedaluwarsa
+QUESTION_CACHE_MAX_ENTRIES = 2000      # Batas entri (LRU dibuang jika lewat)
+
+# --- Query Result Cache (in-memory) ---
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024   # Budget memori total hasil query yang di-cache
+RESULT_CACHE_COMPACT_ROWS = 200             # Di atas jumlah baris ini hasil disimpan terkompresi (harus < RESULT_PAGE_ROWS)
+
+# --- Fan-out Insight & Visualisasi ---
+LLM_WORKERS = 8                # Thread pool untuk panggilan LLM paralel
+LLM_STAGE_TIMEOUT = 30         # Detik maksimal menunggu insight / rekomendasi grafik
+
+# --- Pengambilan Hasil Query (streaming + paginasi) ---
+RESULT_PAGE_ROWS = 1000                 # Baris maksimal per halaman hasil
+RESULT_PAGE_MAX_BYTES = 8 * 1024 * 1024 # Perkiraan byte maksimal per halaman
+RESULT_FETCH_BATCH = 256                # Ukuran batch cursor.fetchmany
+RESULT_COUNT_BUDGET = 0.25              # Detik maksimal untuk menghitung total baris
+
+# --- History Store (append-only, SQLite WAL) ---
+HISTORY_DB_PATH = "history.db"
+HISTORY_LOAD_LIMIT = 200                    # Pesan terakhir yang dimuat saat aplikasi dibuka / per "load older"
+HISTORY_COMPACT_WAL_BYTES = 8 * 1024 * 1024 # Compaction background jika file WAL melewati ukuran ini
+HISTORY_WINDOW_TURNS = 10                   # Giliran tanya-jawab terakhir yang dirender per rerun
+
+# --- Result Side Files (Arrow IPC) ---
+RESULT_STORE_DIR = "history_results"   # Folder file hasil query (.arrow)
+RESULT_SPILL_MIN_ROWS = 50             # Hasil dengan baris lebih dari ini disimpan di file terpisah
+RESULT_PREVIEW_ROWS = 5                # Baris preview yang tetap disimpan di history
+
+# --- Render Cache (DataFrame & figure per pesan history) ---
+RENDER_CACHE_MAX_ENTRIES = 256
+
+# --- Dashboard Metrics ---
+DASHBOARD_SUMMARY_TABLE = "dashboard_summary"   # Tabel ringkasan opsional (dirawat trigger)
+INTERNAL_TABLES = (DASHBOARD_SUMMARY_TABLE,)    # Tabel internal: tidak ditampilkan di schema untuk LLM
+
+# --- Rekomendasi Visualisasi ---
+VIZ_LLM_FALLBACK = True        # Pakai LLM hanya jika aturan lokal tidak bisa memutuskan
+# "separate": LLM hanya menulis SQL. "combined": satu respons JSON berisi SQL + rencana grafik
+# (divalidasi lokal terhadap kolom hasil), sehingga tidak ada panggilan LLM viz terpisah.
+SQL_MODE = os.getenv("SQL_MODE", "separate")
+
+# --- Insight ---
+INSIGHT_MODE = os.getenv("INSIGHT_MODE", "llm")   # "llm" (narasi AI dari ringkasan) atau "local" (template, tanpa LLM)
+INSIGHT_TOP_K = 3                                 # Jumlah top/bottom kategori di ringkasan
+INSIGHT_PREVIEW_ROWS = 3                          # Baris contoh yang tetap dikirim ke LLM
+
+# --- Intent Fast Path ---
+INTENT_FAST_PATH = True      # Pertanyaan umum (Quick Action dll.) dijawab template SQL tanpa LLM
+INTENT_DEFAULT_LIMIT = 10    # Sama dengan aturan LIMIT default di prompt SQL
+
+# --- Query Guard (EXPLAIN QUERY PLAN sebelum eksekusi) ---
+GUARD_ENABLED = True
+GUARD_LARGE_TABLE_ROWS = 100_000       # Tabel dengan baris sebanyak ini dianggap "besar"
+GUARD_MAX_ROWS = 100_000               # LIMIT maksimal untuk full scan tabel besar
+GUARD_MAX_JOIN_COST = 10_000_000       # Batas kombinasi baris join tanpa kondisi sebelum query ditolak
+
+# --- Timeout Query ---
+# Budget waktu (detik) per kelas query; query yang melewatinya dihentikan lewat progress handler
+QUERY_TIMEOUTS = {"select": 10, "aggregate": 20, "page": 10}
+QUERY_PROGRESS_STEPS = 1000     # Progress handler dicek tiap N instruksi VM SQLite
+QUERY_POLL_INTERVAL = 0.2       # Detik antar pengecekan UI saat query berjalan (tombol Batalkan)
+
+# --- Workload Log & Index Advisor ---
+WORKLOAD_LOG_PATH = os.getenv("WORKLOAD_LOG_PATH", "workload_log.db")  # SQL yang benar-benar dijalankan (bahan index advisor)
+WORKLOAD_LOG_ENABLED = True
+WORKLOAD_LOG_MAX_EXECUTIONS = 200_000  # Baris executions yang disimpan (yang lama dipangkas)
+ADVISOR_MAX_INDEX_COLUMNS = 4          # Kolom maksimal per index usulan (termasuk kolom covering)
+ADVISOR_MIN_GAIN = 0.10                # Index dipertahankan jika mempercepat workload minimal 10%
+
+# --- Pemangkasan Schema untuk Prompt SQL (BM25) ---
+SCHEMA_PRUNING = True
+SCHEMA_PRUNE_MIN_TABLES = 6            # Schema dengan tabel <= ini selalu dikirim utuh
+SCHEMA_PRUNE_TOP_K = 4                 # Tabel teratas per pertanyaan (ditambah tetangga foreign key)
+SCHEMA_SAMPLE_ROWS = 1000              # Baris awal per tabel yang diambil contoh nilainya
+SCHEMA_SAMPLE_VALUES = 50              # Contoh nilai teks per kolom
+
+# --- Telemetry (span per tahap pipeline) ---
+TELEMETRY_ENABLED = os.getenv("TELEMETRY", "0") == "1"   # Mati: overhead hanya satu cek boolean
+TELEMETRY_EXPORTERS = os.getenv("TELEMETRY_EXPORTERS", "jsonl").split(",")   # "jsonl", "prometheus"
+TELEMETRY_JSONL_PATH = "telemetry/spans.jsonl"
+TELEMETRY_JSONL_MAX_BYTES = 5 * 1024 * 1024   # Rotasi file per 5 MB
+TELEMETRY_JSONL_BACKUPS = 3
+TELEMETRY_PROMETHEUS_PORT = int(os.getenv("TELEMETRY_PROMETHEUS_PORT", "9464"))
@@ -0,0 +1,164 @@
+# ----------------------- connection_pool.py -----------------------
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from module.config import (
+    DATABASE_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_MMAP_SIZE, DB_CACHE_SIZE_KB
+)
+
+
+class ReadOnlyConnectionPool:
+    """
+    Pool koneksi SQLite read-only dengan jumlah maksimal terbatas.
+    Koneksi dibuka sekali (dengan PRAGMA yang sudah di-tuning) lalu dipakai ulang,
+    sehingga biaya connect & page cache yang dingin tidak dibayar di setiap query.
+    """
+
+    def __init__(self, db_path: str, max_size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max_size)  # LIFO: koneksi terakhir cache-nya paling hangat
+        self._created = 0
+        self._lock = threading.Lock()
+        self._file_id = self._stat_file()
+        self._watcher = None
+        self._watcher_lock = threading.Lock()
+
+    def _stat_file(self):
+        # Identitas file: jika database dibuat ulang (seed_data.py), koneksi lama harus dibuang
+        try:
+            st = os.stat(self.db_path)
+            return (st.st_dev, st.st_ino)
+        except OSError:
+            return None
+
+    def _open(self) -> sqlite3.Connection:
+        # check_same_thread=False karena Streamlit bisa menjalankan rerun di thread berbeda;
+        # keamanan tetap terjaga karena satu koneksi hanya dipinjam oleh satu pemakai.
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False
+        )
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+        conn.execute(f"PRAGMA cache_size = -{int(DB_CACHE_SIZE_KB)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        # Pool penuh: tunggu sampai ada koneksi yang dikembalikan
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Connection pool habis (timeout menunggu koneksi)")
+
+    def _release(self, conn: sqlite3.Connection, discard: bool = False):
+        if discard:
+            self._discard(conn)
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._created -= 1
+
+    def _check_file(self):
+        # Jika file database diganti, tutup semua koneksi idle (yang sedang dipinjam
+        # akan dibuang saat dikembalikan karena generasinya sudah berbeda).
+        file_id = self._stat_file()
+        if file_id != self._file_id:
+            with self._lock:
+                self._file_id = file_id
+            self.close_all()
+
+    @contextmanager
+    def connection(self):
+        """Meminjam satu koneksi read-only dari pool."""
+        self._check_file()
+        file_id = self._file_id
+        conn = self._acquire()
+        broken = False
+        try:
+            yield conn
+        except sqlite3.DatabaseError as e:
+            # OperationalError biasa (syntax error, tabel tidak ada) tidak merusak koneksi
+            broken = not isinstance(e, sqlite3.OperationalError)
+            raise
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn, discard=broken or file_id != self._file_id)
+
+    def data_token(self):
+        """
+        Token versi data: (PRAGMA data_version, mtime_ns, size).
+        data_version dibaca dari satu koneksi 'watcher' khusus, karena nilainya hanya
+        berubah jika koneksi LAIN melakukan commit (nilainya berbeda per koneksi).
+        """
+        self._check_file()
+        try:
+            st = os.stat(self.db_path)
+            file_part = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            file_part = (None, None)
+
+        with self._watcher_lock:
+            if self._watcher is None or self._watcher[1] != self._file_id:
+                if self._watcher is not None:
+                    self._watcher[0].close()
+                self._watcher = (self._open(), self._file_id)
+            version = self._watcher[0].execute("PRAGMA data_version").fetchone()[0]
+        return (version,) + file_part
+
+    def close_all(self):
+        """Menutup semua koneksi yang sedang idle di pool."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = DATABASE_PATH) -> ReadOnlyConnectionPool:
+    """Pool dibagi antar session Streamlit (satu pool per file database)."""
+    key = os.path.abspath(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ReadOnlyConnectionPool(db_path)
+                _pools[key] = pool
+    return pool
+
+
+def get_data_token(db_path: str = DATABASE_PATH):
+    """Token yang berubah setiap kali isi database berubah (lihat ReadOnlyConnectionPool.data_token)."""
+    return get_pool(db_path).data_token()
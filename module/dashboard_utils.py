@@ -0,0 +1,79 @@
+# ----------------------- dashboard_utils.py -----------------------
+import threading
+from module.config import DATABASE_PATH, DASHBOARD_SUMMARY_TABLE
+from module.connection_pool import get_pool, get_data_token
+
+# Metrik "Live Database Overview" dihitung dalam SATU query lalu di-cache sampai
+# data_version database berubah. Jika tabel ringkasan (dirawat trigger) tersedia,
+# angkanya dibaca langsung dari sana -> O(1) berapa pun ukuran tabel orders.
+_cache = {}
+_lock = threading.Lock()
+
+_ONE_PASS_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM products),
+        (SELECT COUNT(*) FROM customers),
+        (SELECT COALESCE(SUM(total_amount), 0) FROM orders)
+"""
+
+_SUMMARY_QUERY = f"""
+    SELECT product_count, customer_count, total_revenue
+    FROM {DASHBOARD_SUMMARY_TABLE} WHERE id = 1
+"""
+
+
+def get_dashboard_metrics(db_path: str = DATABASE_PATH):
+    """Mengembalikan (total_produk, total_pelanggan, total_pendapatan)."""
+    token = get_data_token(db_path)
+    cached = _cache.get(db_path)
+    if cached is not None and cached[0] == token:
+        return cached[1]
+
+    with get_pool(db_path).connection() as conn:
+        has_summary = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (DASHBOARD_SUMMARY_TABLE,)
+        ).fetchone()
+        row = conn.execute(_SUMMARY_QUERY if has_summary else _ONE_PASS_QUERY).fetchone()
+        if row is None and has_summary:
+            row = conn.execute(_ONE_PASS_QUERY).fetchone()
+
+    metrics = tuple(value or 0 for value in row)
+    with _lock:
+        _cache[db_path] = (token, metrics)
+    return metrics
+
+
+def install_summary_table(conn):
+    """
+    Membuat tabel ringkasan + trigger yang merawatnya (butuh koneksi read-write).
+    Dipanggil dari seed_data.py setelah data dibuat; aman dipanggil ulang.
+    """
+    t = DASHBOARD_SUMMARY_TABLE
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS {t} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            product_count INTEGER NOT NULL,
+            customer_count INTEGER NOT NULL,
+            total_revenue INTEGER NOT NULL
+        );
+        INSERT OR REPLACE INTO {t} (id, product_count, customer_count, total_revenue)
+        {_ONE_PASS_QUERY.replace("SELECT", "SELECT 1,", 1)};
+
+        CREATE TRIGGER IF NOT EXISTS trg_{t}_products_ins AFTER INSERT ON products
+        BEGIN UPDATE {t} SET product_count = product_count + 1 WHERE id = 1; END;
+        CREATE TRIGGER IF NOT EXISTS trg_{t}_products_del AFTER DELETE ON products
+        BEGIN UPDATE {t} SET product_count = product_count - 1 WHERE id = 1; END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_{t}_customers_ins AFTER INSERT ON customers
+        BEGIN UPDATE {t} SET customer_count = customer_count + 1 WHERE id = 1; END;
+        CREATE TRIGGER IF NOT EXISTS trg_{t}_customers_del AFTER DELETE ON customers
+        BEGIN UPDATE {t} SET customer_count = customer_count - 1 WHERE id = 1; END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_{t}_orders_ins AFTER INSERT ON orders
+        BEGIN UPDATE {t} SET total_revenue = total_revenue + COALESCE(NEW.total_amount, 0) WHERE id = 1; END;
+        CREATE TRIGGER IF NOT EXISTS trg_{t}_orders_upd AFTER UPDATE OF total_amount ON orders
+        BEGIN UPDATE {t} SET total_revenue = total_revenue - COALESCE(OLD.total_amount, 0)
+                                                         + COALESCE(NEW.total_amount, 0) WHERE id = 1; END;
+        CREATE TRIGGER IF NOT EXISTS trg_{t}_orders_del AFTER DELETE ON orders
+        BEGIN UPDATE {t} SET total_revenue = total_revenue - COALESCE(OLD.total_amount, 0) WHERE id = 1; END;
+    """)
@@ -2,6 +2,7 @@
 import json
 import pandas as pd
 import streamlit as st
+from module.result_store import load_result_rows
 
 def format_chat_history_as_text(chat_history):
     output = []
@@ -13,7 +14,7 @@ def format_chat_history_as_text(chat_history):
         elif role == "error":
             output.append(f"❌ Error:\n{content}")
         elif role == "result":
-            result, columns = content
+            result, columns = load_result_rows(content)
             df = pd.DataFrame(result, columns=columns)
             output.append(f"📊 Result:\n{df.to_markdown(index=False)}")
     return "\n\n".join(output)
@@ -22,7 +23,7 @@ def format_chat_history_as_json(chat_history):
     structured = []
     for role, content in chat_history:
         if role == "result":
-            result, columns = content
+            result, columns = load_result_rows(content)
             structured.append({ "role": role, "data": {"columns": columns, "rows": result} })
         else:
             structured.append({ "role": role, "content": content })
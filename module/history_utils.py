@@ -1,54 +1,310 @@
 import os
 import pickle
+import re
+import sqlite3
+import threading
+import time
+import uuid
 import streamlit as st
+from module.config import HISTORY_DB_PATH, HISTORY_LOAD_LIMIT, HISTORY_COMPACT_WAL_BYTES
+from module.result_store import delete_result_files, is_result_ref
+from module.telemetry import span
 
-# Nama file penyimpanan
+# Nama file penyimpanan lama (pickle) -- dimigrasikan otomatis ke HISTORY_DB_PATH
 HISTORY_FILE_SQL = "history_sql.pkl"
 HISTORY_FILE_PYTHON = "history_python.pkl"
 
-def load_history_from_disk():
-    """Memuat riwayat chat dari file fisik saat aplikasi pertama dibuka"""
-    
-    # 1. Load History SQL
-    if "chat_history" not in st.session_state:
-        if os.path.exists(HISTORY_FILE_SQL):
+_LEGACY_FILES = {"sql": HISTORY_FILE_SQL, "python": HISTORY_FILE_PYTHON}
+_STATE_KEYS = {"sql": "chat_history", "python": "python_history"}
+# Percakapan untuk history yang disimpan sebelum ada ID percakapan (termasuk migrasi pickle)
+DEFAULT_CONVERSATION = "default"
+_CONVERSATION_ID = re.compile(r"^[0-9a-zA-Z_-]{1,64}$")
+
+
+class HistoryStore:
+    """
+    Penyimpanan history append-only di SQLite (WAL).
+    Setiap pesan baru = satu INSERT dalam transaksi (biaya O(pesan), atomik),
+    bukan menulis ulang seluruh file seperti pickle.
+    Pesan dikelompokkan per percakapan (`conversation`): setiap tab/session menulis ke
+    percakapannya sendiri sehingga dua tab yang terbuka tidak saling menyisipkan pesan.
+    """
+
+    def __init__(self, path: str = HISTORY_DB_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._compacting = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS messages (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    conversation TEXT NOT NULL DEFAULT '{DEFAULT_CONVERSATION}',
+                    kind TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            # File history lama (sebelum ada kolom conversation): pesannya masuk percakapan default
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+            if "conversation" not in columns:
+                conn.execute(
+                    f"ALTER TABLE messages ADD COLUMN conversation TEXT NOT NULL DEFAULT '{DEFAULT_CONVERSATION}'"
+                )
+            conn.execute("DROP INDEX IF EXISTS idx_messages_kind_seq")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_messages_conversation_kind_seq ON messages(conversation, kind, seq)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def append(self, kind: str, messages, conversation: str = DEFAULT_CONVERSATION):
+        """Menambahkan pesan [(role, content), ...] dalam satu transaksi."""
+        if not messages:
+            return
+        now = time.time()
+        rows = [
+            (conversation, kind, role, pickle.dumps(content, protocol=pickle.HIGHEST_PROTOCOL), now)
+            for role, content in messages
+        ]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT INTO messages (conversation, kind, role, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+        self._maybe_compact()
+
+    def count(self, kind: str, conversation: str = DEFAULT_CONVERSATION) -> int:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM messages WHERE conversation = ? AND kind = ?", (conversation, kind)
+            ).fetchone()[0]
+
+    def load_range(self, kind: str, start: int, end: int = None, conversation: str = DEFAULT_CONVERSATION):
+        """Pesan ke-start s/d ke-(end-1) (posisi dihitung dari pesan pertama kind tsb di percakapan ini)."""
+        limit = -1 if end is None else max(0, end - start)
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT role, payload FROM messages WHERE conversation = ? AND kind = ? ORDER BY seq LIMIT ? OFFSET ?",
+                (conversation, kind, limit, start),
+            ).fetchall()
+        messages = []
+        for role, payload in rows:
             try:
-                with open(HISTORY_FILE_SQL, "rb") as f:
-                    st.session_state.chat_history = pickle.load(f)
+                messages.append((role, pickle.loads(payload)))
             except Exception:
-                st.session_state.chat_history = [] # Jika file rusak, reset
-        else:
-            st.session_state.chat_history = []
+                # Satu pesan rusak tidak boleh menghapus seluruh history
+                messages.append(("error", "Pesan history tidak dapat dibaca."))
+        return messages
 
-    # 2. Load History Python Agent
-    if "python_history" not in st.session_state:
-        if os.path.exists(HISTORY_FILE_PYTHON):
+    def load_tail(self, kind: str, limit: int = HISTORY_LOAD_LIMIT, conversation: str = DEFAULT_CONVERSATION):
+        """
+        Memuat hanya `limit` pesan terakhir, dimulai dari pesan 'user' agar satu
+        giliran tanya-jawab tidak terpotong. Mengembalikan (offset, messages).
+        """
+        total = self.count(kind, conversation)
+        start = max(0, total - limit) if limit else 0
+        if start > 0:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT COUNT(*) FROM messages WHERE conversation = ? AND kind = ? AND seq < ("
+                    "SELECT MIN(seq) FROM (SELECT seq, role FROM messages WHERE conversation = ? AND kind = ? "
+                    "ORDER BY seq LIMIT -1 OFFSET ?) WHERE role = 'user')",
+                    (conversation, kind, conversation, kind, start),
+                ).fetchone()
+            if row and row[0]:
+                start = row[0]
+            else:
+                # Tidak ada pesan 'user' setelah start (limit < panjang giliran terakhir):
+                # mundur ke awal giliran tersebut
+                start = self._turn_start_before(kind, start, conversation)
+        return start, self.load_range(kind, start, conversation=conversation)
+
+    def _turn_start_before(self, kind: str, position: int, conversation: str) -> int:
+        """Posisi pesan 'user' terakhir di atau sebelum `position` (0 jika tidak ada)."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT COUNT(*) FROM messages WHERE conversation = ? AND kind = ? AND seq < ("
+                "SELECT MAX(seq) FROM (SELECT seq, role FROM messages WHERE conversation = ? AND kind = ? "
+                "ORDER BY seq LIMIT ?) WHERE role = 'user')",
+                (conversation, kind, conversation, kind, position + 1),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def load_before(self, kind: str, end: int, limit: int = HISTORY_LOAD_LIMIT,
+                    conversation: str = DEFAULT_CONVERSATION):
+        """
+        Memuat sekitar `limit` pesan sebelum posisi `end`, mundur ke awal pesan 'user'
+        terdekat agar giliran tidak terpotong. Mengembalikan (start, messages).
+        """
+        start = max(0, end - limit)
+        if start > 0:
+            start = self._turn_start_before(kind, start, conversation)
+        return start, self.load_range(kind, start, end, conversation=conversation)
+
+    def clear(self, kind: str = None, conversation: str = None):
+        """Hapus pesan; conversation None = semua percakapan."""
+        where, params = [], []
+        if conversation is not None:
+            where.append("conversation = ?")
+            params.append(conversation)
+        if kind is not None:
+            where.append("kind = ?")
+            params.append(kind)
+        sql = "DELETE FROM messages" + (" WHERE " + " AND ".join(where) if where else "")
+        with self._lock:
+            self._connect().execute(sql, params)
+        self.compact_in_background()
+
+    def compact(self):
+        """Checkpoint WAL ke file utama lalu memotong WAL (dan VACUUM jika banyak halaman kosong)."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            total_pages = conn.execute("PRAGMA page_count").fetchone()[0]
+            if total_pages and free_pages / total_pages > 0.25:
+                conn.execute("VACUUM")
+
+    def compact_in_background(self):
+        if self._compacting:
+            return
+        self._compacting = True
+
+        def run():
             try:
-                with open(HISTORY_FILE_PYTHON, "rb") as f:
-                    st.session_state.python_history = pickle.load(f)
-            except Exception:
-                st.session_state.python_history = []
-        else:
-            st.session_state.python_history = []
+                self.compact()
+            except sqlite3.Error as e:
+                print(f"Gagal compact history: {e}")
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=run, name="history-compact", daemon=True).start()
+
+    def _maybe_compact(self):
+        try:
+            wal_size = os.path.getsize(self.path + "-wal")
+        except OSError:
+            return
+        if wal_size > HISTORY_COMPACT_WAL_BYTES:
+            self.compact_in_background()
+
+
+# Satu store (satu koneksi) dibagi oleh semua session; isinya dipisah per percakapan
+history_store = HistoryStore()
+
+
+def _conversation_id() -> str:
+    """ID percakapan session ini, disimpan di URL (?chat=...) agar reload tab melanjutkan percakapan yang sama."""
+    conversation = st.session_state.get("conversation_id")
+    if conversation is None:
+        conversation = st.query_params.get("chat", "")
+        if not _CONVERSATION_ID.match(conversation):
+            conversation = uuid.uuid4().hex
+        st.session_state.conversation_id = conversation
+        st.query_params["chat"] = conversation
+    return conversation
+
+
+def _migrate_legacy_pickle(kind: str):
+    """Memindahkan isi file pickle lama ke percakapan default (sekali saja)."""
+    legacy = _LEGACY_FILES[kind]
+    if not os.path.exists(legacy) or history_store.count(kind, DEFAULT_CONVERSATION) > 0:
+        return
+    try:
+        with open(legacy, "rb") as f:
+            messages = pickle.load(f)
+        history_store.append(kind, messages)
+        os.replace(legacy, legacy + ".migrated")
+    except Exception as e:
+        print(f"Gagal migrasi history lama: {e}")
+
+
+def load_history_from_disk():
+    """Memuat riwayat chat percakapan ini saat aplikasi pertama dibuka (hanya bagian terakhir)"""
+    conversation = _conversation_id()
+    for kind, state_key in _STATE_KEYS.items():
+        if state_key not in st.session_state:
+            try:
+                _migrate_legacy_pickle(kind)
+                offset, messages = history_store.load_tail(kind, conversation=conversation)
+            except sqlite3.Error as e:
+                print(f"Gagal memuat history: {e}")
+                offset, messages = 0, []
+            st.session_state[state_key] = messages
+            # offset: jumlah pesan lama yang belum dimuat; saved: total pesan yang sudah tersimpan
+            st.session_state[f"{state_key}_offset"] = offset
+            st.session_state[f"{state_key}_saved"] = offset + len(messages)
+            # ID generasi history: bagian dari ID stabil tiap pesan (berganti saat Reset)
+            st.session_state[f"{state_key}_id"] = uuid.uuid4().hex
+
 
 def save_history_to_disk(type="sql"):
-    """Menyimpan riwayat chat ke file fisik setiap kali ada update"""
+    """Menyimpan HANYA pesan yang belum tersimpan (append-only)"""
+    state_key = _STATE_KEYS.get(type)
+    if state_key is None:
+        return
     try:
-        if type == "sql":
-            with open(HISTORY_FILE_SQL, "wb") as f:
-                pickle.dump(st.session_state.chat_history, f)
-        elif type == "python":
-            with open(HISTORY_FILE_PYTHON, "wb") as f:
-                pickle.dump(st.session_state.python_history, f)
+        history = st.session_state.get(state_key, [])
+        offset = st.session_state.get(f"{state_key}_offset", 0)
+        saved = st.session_state.get(f"{state_key}_saved", offset)
+        new_messages = history[saved - offset:]
+        if new_messages:
+            with span("history.save", messages=len(new_messages)):
+                history_store.append(type, new_messages, conversation=_conversation_id())
+            st.session_state[f"{state_key}_saved"] = offset + len(history)
     except Exception as e:
         print(f"Gagal menyimpan history: {e}")
 
+def load_older_history(type="sql", limit=HISTORY_LOAD_LIMIT) -> int:
+    """Menambahkan pesan lama dari disk ke awal history di memori. Mengembalikan jumlah pesan yang dimuat."""
+    state_key = _STATE_KEYS.get(type)
+    if state_key is None:
+        return 0
+    offset = st.session_state.get(f"{state_key}_offset", 0)
+    if offset == 0:
+        return 0
+    try:
+        start, messages = history_store.load_before(type, offset, limit, conversation=_conversation_id())
+    except sqlite3.Error as e:
+        print(f"Gagal memuat history lama: {e}")
+        return 0
+    st.session_state[state_key] = messages + st.session_state[state_key]
+    st.session_state[f"{state_key}_offset"] = start
+    return len(messages)
+
 def clear_all_history():
     """Menghapus file fisik dan memori saat tombol Reset ditekan"""
     # Hapus Memori
     st.session_state.chat_history = []
     st.session_state.python_history = []
+    st.session_state.result_pages = {}
+    for state_key in _STATE_KEYS.values():
+        st.session_state[f"{state_key}_offset"] = 0
+        st.session_state[f"{state_key}_saved"] = 0
+        st.session_state[f"{state_key}_id"] = uuid.uuid4().hex
     
-    # Hapus File Fisik
+    # Hapus File Fisik (hanya percakapan ini; tab lain tetap utuh)
+    conversation = _conversation_id()
+    try:
+        refs = [
+            content for kind in _STATE_KEYS
+            for role, content in history_store.load_range(kind, 0, conversation=conversation)
+            if role == "result" and is_result_ref(content)
+        ]
+        history_store.clear(conversation=conversation)
+    except sqlite3.Error as e:
+        print(f"Gagal menghapus history: {e}")
+        return
+    delete_result_files(refs)
     if os.path.exists(HISTORY_FILE_SQL): os.remove(HISTORY_FILE_SQL)
-    if os.path.exists(HISTORY_FILE_PYTHON): os.remove(HISTORY_FILE_PYTHON)
\ No newline at end of file
+    if os.path.exists(HISTORY_FILE_PYTHON): os.remove(HISTORY_FILE_PYTHON)
@@ -0,0 +1,260 @@
+# ----------------------- index_advisor.py -----------------------
+"""
+Index advisor berbasis workload.
+
+Membaca SQL yang benar-benar dijalankan (workload_log), menganalisisnya dengan
+EXPLAIN QUERY PLAN, lalu mengusulkan index (covering bila memungkinkan) untuk
+kolom JOIN/filter pada tabel yang masih di-full scan. Setiap usulan diuji:
+ANALYZE, rencana & waktu sebelum/sesudah, dan hanya index yang mempercepat
+workload minimal ADVISOR_MIN_GAIN yang direkomendasikan.
+
+Pemakaian:
+    python -m module.index_advisor            # uji di salinan database, tidak mengubah apa pun
+    python -m module.index_advisor --apply    # buat index yang lolos di database asli
+"""
+import argparse
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from module.config import DATABASE_PATH, ADVISOR_MAX_INDEX_COLUMNS, ADVISOR_MIN_GAIN, INTERNAL_TABLES
+from module.query_guard import table_aliases, plan_summary
+from module.workload_log import workload_log
+
+# Pertanyaan contoh (Quick Action) dipakai jika workload log masih kosong
+SAMPLE_QUESTIONS = [
+    "Tampilkan 5 produk dengan harga termahal",
+    "Tampilkan tren penjualan harian berdasarkan tanggal order",
+    "Berapa total pendapatan dari masing-masing kota?",
+    "Tampilkan produk dengan stok kurang dari 20",
+    "produk terlaris",
+    "pendapatan per kategori",
+]
+
+_OPERATOR_AFTER = re.compile(r"^\s*(=|==|<=|>=|<>|!=|<|>|\bin\b|\bbetween\b|\blike\b|\bis\b)", re.IGNORECASE)
+_OPERATOR_BEFORE = re.compile(r"(=|==|<=|>=|<|>)\s*$")
+_RANGE_OPS = ("<", ">", "<=", ">=", "between", "like")
+_AUTOMATIC_INDEX = re.compile(r"^SEARCH (\w+) USING AUTOMATIC (?:PARTIAL )?(?:COVERING )?INDEX \(([^)]*)\)")
+
+
+def _table_columns(conn) -> dict:
+    tables = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ) if r[0] not in INTERNAL_TABLES]
+    return {t: [c[1] for c in conn.execute(f'PRAGMA table_info("{t}")')] for t in tables}
+
+
+def _already_indexed(conn, table: str, keys: tuple) -> bool:
+    """True jika index yang ada (atau rowid INTEGER PRIMARY KEY) sudah melayani kolom awal yang sama."""
+    for idx in conn.execute(f'PRAGMA index_list("{table}")'):
+        existing = [c[2] for c in conn.execute(f'PRAGMA index_info("{idx[1]}")')]
+        if existing[:len(keys)] == list(keys):
+            return True
+    pk = [c for c in conn.execute(f'PRAGMA table_info("{table}")') if c[5]]
+    return len(pk) == 1 and pk[0][2].upper() == "INTEGER" and pk[0][1] == keys[0]
+
+
+def _column_refs(query: str, table: str, aliases: dict, columns: dict) -> dict:
+    """
+    Kolom `table` yang dipakai query: {"eq": [...], "range": [...], "other": [...]}.
+    Kolom tanpa prefix alias hanya dihitung jika namanya unik di antara tabel query.
+    """
+    names = [a for a, t in aliases.items() if t == table]
+    used_tables = set(t for a, t in aliases.items() if re.search(rf"\b{re.escape(a)}\b", query, re.IGNORECASE))
+    shared = {c.lower() for t in used_tables if t != table for c in columns.get(t, [])}
+    refs = {"eq": [], "range": [], "other": []}
+
+    for col in columns[table]:
+        patterns = [rf"\b{re.escape(a)}\s*\.\s*{re.escape(col)}\b" for a in names]
+        if col.lower() not in shared:
+            patterns.append(rf"(?<![\w.]){re.escape(col)}\b")
+        kind = None
+        for pattern in patterns:
+            for m in re.finditer(pattern, query, re.IGNORECASE):
+                after = _OPERATOR_AFTER.match(query[m.end():])
+                before = _OPERATOR_BEFORE.search(query[:m.start()])
+                op = (after.group(1) if after else before.group(1) if before else "").lower()
+                if op in ("=", "==", "in", "is"):
+                    kind = "eq"
+                elif op in _RANGE_OPS and kind != "eq":
+                    kind = "range"
+                elif kind is None:
+                    kind = "other"
+        if kind:
+            refs[kind].append(col)
+    return refs
+
+
+def candidate_indexes(conn, query: str, columns: dict) -> list:
+    """[(tabel, (kolom, ...))] usulan index untuk satu query."""
+    aliases = table_aliases(query, columns)
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+    candidates = []
+
+    for detail in plan:
+        # SQLite sendiri membangun index sementara -> tanda paling jelas index permanen dibutuhkan
+        auto = _AUTOMATIC_INDEX.match(detail)
+        if auto and auto.group(1).lower() in aliases:
+            table = aliases[auto.group(1).lower()]
+            keys = [c.split("=")[0].split(">")[0].split("<")[0].strip() for c in auto.group(2).split(" AND ")]
+            candidates.append((table, tuple(k for k in keys if k)))
+            continue
+        if not detail.startswith("SCAN ") or " USING " in detail:
+            continue
+        name = detail.split()[1]
+        if name == "TABLE":
+            name = detail.split()[2]
+        table = aliases.get(name.lower())
+        if table is None:
+            continue
+        refs = _column_refs(query, table, aliases, columns)
+        keys = refs["eq"] + refs["range"][:1]
+        if keys:
+            candidates.append((table, tuple(keys)))
+
+    # Tambahkan kolom lain yang dipakai query agar index menjadi covering (jika muat)
+    result = []
+    for table, keys in candidates:
+        refs = _column_refs(query, table, aliases, columns)
+        extra = [c for c in refs["eq"] + refs["range"] + refs["other"] if c not in keys]
+        if len(keys) + len(extra) <= ADVISOR_MAX_INDEX_COLUMNS:
+            keys = keys + tuple(extra)
+        result.append((table, keys))
+    return result
+
+
+def _time_query(conn, query: str, repeat: int = 3, budget: float = 10.0) -> float:
+    """Waktu eksekusi terbaik (ms) dari beberapa kali jalan; inf jika melewati budget."""
+    best = float("inf")
+    for _ in range(repeat):
+        deadline = time.monotonic() + budget
+        conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 1000)
+        start = time.perf_counter()
+        try:
+            conn.execute(query).fetchall()
+        except sqlite3.OperationalError:
+            return float("inf")
+        finally:
+            conn.set_progress_handler(None, 0)
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def load_workload(limit: int = 200, db_path: str = DATABASE_PATH):
+    """[(sql, runs)] dari workload log; jika kosong, SQL template Quick Action."""
+    workload = workload_log.top_queries(limit)
+    if workload:
+        return workload
+    from module.intent_registry import match_intent
+    print("ℹ️ Workload log kosong, memakai SQL pertanyaan contoh.")
+    return [(m[1], 1) for m in (match_intent(q, db_path) for q in SAMPLE_QUESTIONS) if m]
+
+
+def advise(conn, workload, apply: bool = False, min_gain: float = ADVISOR_MIN_GAIN) -> list:
+    """
+    Menguji setiap kandidat index pada koneksi read-write `conn`.
+    Mengembalikan daftar laporan per kandidat; index yang tidak lolos selalu dihapus lagi.
+    """
+    conn.execute("ANALYZE")
+    columns = _table_columns(conn)
+
+    # Kelompokkan query per kandidat index
+    candidates = {}
+    for sql, runs in workload:
+        try:
+            for table, keys in candidate_indexes(conn, sql, columns):
+                candidates.setdefault((table, keys), []).append((sql, runs))
+        except sqlite3.Error as e:
+            print(f"⚠️ Query dilewati ({e}): {sql[:80]}")
+
+    # Index (a) yang merupakan awalan index lain (a, b) pada tabel yang sama digabung:
+    # index yang lebih panjang juga melayani query milik index pendek
+    for table, keys in sorted(candidates, key=lambda c: len(c[1])):
+        longer = [c for c in candidates if c[0] == table and len(c[1]) > len(keys) and c[1][:len(keys)] == keys]
+        if longer:
+            candidates[longer[0]].extend(candidates.pop((table, keys)))
+
+    reports = []
+    for (table, keys), queries in candidates.items():
+        if _already_indexed(conn, table, keys):
+            continue
+        name = f"idx_{table}_{'_'.join(keys)}"
+        before = {sql: (plan_summary(conn, sql), _time_query(conn, sql)) for sql, _ in queries}
+
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({", ".join(keys)})')
+        conn.execute(f'ANALYZE "{name}"')
+        after = {sql: (plan_summary(conn, sql), _time_query(conn, sql)) for sql, _ in queries}
+
+        # Waktu total tertimbang frekuensi query di workload
+        total_before = sum(before[sql][1] * runs for sql, runs in queries)
+        total_after = sum(after[sql][1] * runs for sql, runs in queries)
+        gain = 1 - total_after / total_before if total_before else 0.0
+        keep = gain >= min_gain
+        if not (keep and apply):
+            conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+        reports.append({
+            "index": name,
+            "ddl": f"CREATE INDEX {name} ON {table} ({', '.join(keys)});",
+            "queries": [
+                {"sql": sql, "runs": runs,
+                 "plan_before": before[sql][0], "plan_after": after[sql][0],
+                 "ms_before": before[sql][1], "ms_after": after[sql][1]}
+                for sql, runs in queries
+            ],
+            "ms_before": total_before,
+            "ms_after": total_after,
+            "gain": gain,
+            "recommended": keep,
+            "applied": keep and apply,
+        })
+    conn.execute("ANALYZE")
+    return sorted(reports, key=lambda r: r["gain"], reverse=True)
+
+
+def print_report(reports: list):
+    if not reports:
+        print("✅ Tidak ada index baru yang diusulkan untuk workload ini.")
+        return
+    for r in reports:
+        status = "DITERAPKAN" if r["applied"] else "DIREKOMENDASIKAN" if r["recommended"] else "tidak signifikan"
+        print(f"\n[{status}] {r['ddl']}")
+        print(f"  Workload: {r['ms_before']:.2f} ms -> {r['ms_after']:.2f} ms ({r['gain'] * 100:+.1f}% lebih cepat)")
+        for q in r["queries"]:
+            print(f"  - ({q['runs']}x) {' '.join(q['sql'].split())[:100]}")
+            print(f"      sebelum: {q['ms_before']:.2f} ms | {q['plan_before']}")
+            print(f"      sesudah: {q['ms_after']:.2f} ms | {q['plan_after']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Usulkan index berdasarkan workload SQL aplikasi")
+    parser.add_argument("--db", default=DATABASE_PATH, help="Path database SQLite")
+    parser.add_argument("--apply", action="store_true", help="Buat index yang lolos di database asli")
+    parser.add_argument("--limit", type=int, default=200, help="Jumlah query teratas dari workload log")
+    parser.add_argument("--min-gain", type=float, default=ADVISOR_MIN_GAIN,
+                        help="Percepatan minimal (0.1 = 10%%) agar index direkomendasikan")
+    args = parser.parse_args()
+
+    workload = load_workload(args.limit, args.db)
+    if args.apply:
+        target = args.db
+    else:
+        # Mode uji: index dibuat di salinan database agar file asli tidak berubah
+        tmp_dir = tempfile.mkdtemp(prefix="index_advisor_")
+        target = os.path.join(tmp_dir, os.path.basename(args.db))
+        with sqlite3.connect(args.db) as src, sqlite3.connect(target) as dst:
+            src.backup(dst)
+
+    conn = sqlite3.connect(target, isolation_level=None)
+    try:
+        print_report(advise(conn, workload, apply=args.apply, min_gain=args.min_gain))
+    finally:
+        conn.close()
+        if not args.apply:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
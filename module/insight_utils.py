@@ -0,0 +1,188 @@
+# ----------------------- insight_utils.py -----------------------
+import numpy as np
+import pandas as pd
+from module.config import INSIGHT_TOP_K
+from module.viz_recommender import classify_columns, pick_measure, question_words, CATEGORY_NAME_HINTS
+
+# Ringkasan statistik atas baris hasil query yang dimuat (halaman pertama, bukan hanya
+# 10 baris preview). Jika hasil terpotong (page_info["truncated"]), digest mencatat
+# total baris sebenarnya agar prompt / insight tidak menyebutnya "total keseluruhan".
+# Dipakai sebagai konteks prompt insight yang ringkas, atau langsung dijadikan
+# insight berbasis template (INSIGHT_MODE = "local").
+
+
+def _fmt(value) -> str:
+    """Format angka ala Indonesia: 1.234.567 atau 12,5."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "-"
+    if float(value).is_integer():
+        return f"{int(value):,}".replace(",", ".")
+    return f"{value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _pct(value) -> str:
+    """Persentase satu desimal: 16,7%."""
+    return "-" if value is None or value != value else f"{value:.1f}%".replace(".", ",")
+
+
+def _total_text(digest: dict) -> str:
+    total = digest.get("total_rows")
+    return _fmt(total) if total is not None else f"lebih dari {_fmt(digest['rows'])}"
+
+
+def summarize_dataframe(df: pd.DataFrame, user_query: str = "", top_k: int = INSIGHT_TOP_K,
+                        truncated: bool = False, total_rows: int = None) -> dict:
+    """
+    Digest terstruktur: jumlah baris, statistik kolom angka, top/bottom-k dan share
+    per kategori, perubahan antar periode, serta outlier. Semua dihitung vektor (NumPy).
+    truncated/total_rows: df hanya sebagian hasil query (total_rows None = tidak diketahui).
+    """
+    digest = {"rows": int(len(df)), "columns": [str(c) for c in df.columns], "measures": {}}
+    if truncated:
+        digest["truncated"] = True
+        digest["total_rows"] = int(total_rows) if total_rows is not None else None
+    if df.empty:
+        return digest
+
+    # classify_columns melewati nama kolom duplikat (JOIN), jadi df[col] selalu satu Series
+    kinds = classify_columns(df)
+    for col in kinds["measure"][:3]:
+        values = df[col].to_numpy(dtype=float, na_value=np.nan)
+        if np.isnan(values).all():
+            continue
+        digest["measures"][str(col)] = {
+            "sum": float(np.nansum(values)),
+            "mean": float(np.nanmean(values)),
+            "median": float(np.nanmedian(values)),
+            "min": float(np.nanmin(values)),
+            "max": float(np.nanmax(values)),
+        }
+
+    if not digest["measures"]:
+        return digest
+
+    y_col = pick_measure([c for c in kinds["measure"] if str(c) in digest["measures"]], question_words(user_query))
+    y = df[y_col].to_numpy(dtype=float, na_value=np.nan)
+    digest["measure"] = str(y_col)
+
+    # --- Per periode (sumbu waktu) ---
+    if kinds["date"]:
+        x_col = kinds["date"][0]
+        series = pd.Series(y, index=df[x_col].astype(str)).groupby(level=0, sort=True).sum()
+        digest["dimension"] = str(x_col)
+        digest["periods"] = {
+            "count": int(len(series)),
+            "first": (series.index[0], float(series.iloc[0])),
+            "last": (series.index[-1], float(series.iloc[-1])),
+            "peak": (series.idxmax(), float(series.max())),
+            "low": (series.idxmin(), float(series.min())),
+        }
+        if len(series) >= 2:
+            prev = float(series.iloc[-2])
+            delta = float(series.iloc[-1]) - prev
+            digest["periods"]["last_delta"] = delta
+            digest["periods"]["last_delta_pct"] = delta / prev * 100 if prev else None
+        labels, values = series.index.to_numpy(), series.to_numpy()
+
+    # --- Per kategori ---
+    elif kinds["category"]:
+        named = [c for c in kinds["category"] if CATEGORY_NAME_HINTS.search(str(c))]
+        x_col = named[0] if named else kinds["category"][0]
+        series = pd.Series(y, index=df[x_col].astype(str)).groupby(level=0, sort=False).sum()
+        digest["dimension"] = str(x_col)
+        labels, values = series.index.to_numpy(), series.to_numpy()
+    else:
+        labels, values = np.arange(1, len(y) + 1).astype(str), y
+
+    total = float(np.nansum(values))
+    order = np.argsort(-np.nan_to_num(values, nan=-np.inf), kind="stable")
+    share = values / total * 100 if total else np.full(len(values), np.nan)
+    digest["total"] = total
+    digest["groups"] = int(len(values))
+    digest["top"] = [(str(labels[i]), float(values[i]), float(share[i])) for i in order[:top_k]]
+    if len(values) > top_k:
+        digest["bottom"] = [(str(labels[i]), float(values[i]), float(share[i])) for i in order[::-1][:top_k]]
+
+    # --- Outlier (z-score > 3 atau di luar 1.5 IQR) ---
+    finite = values[np.isfinite(values)]
+    if len(finite) >= 5:
+        q1, q3 = np.percentile(finite, [25, 75])
+        iqr = q3 - q1
+        std = finite.std()
+        z = np.abs(values - finite.mean()) / std if std else np.zeros(len(values))
+        mask = (z > 3) | (values > q3 + 1.5 * iqr) | (values < q1 - 1.5 * iqr)
+        digest["outliers"] = [(str(l), float(v)) for l, v in zip(labels[mask], values[mask])][:top_k]
+
+    return digest
+
+
+def format_digest(digest: dict) -> str:
+    """Digest -> teks ringkas untuk prompt (jauh lebih hemat token dibanding tabel markdown)."""
+    lines = [f"Jumlah baris: {digest['rows']}; kolom: {', '.join(digest['columns'])}"]
+    if digest.get("truncated"):
+        lines.append(
+            f"PERHATIAN: hasil query terpotong, hanya {_fmt(digest['rows'])} dari {_total_text(digest)} baris yang dimuat; "
+            "semua angka di bawah dihitung dari baris yang dimuat saja."
+        )
+    for col, stats in digest.get("measures", {}).items():
+        lines.append(
+            f"{col}: total {_fmt(stats['sum'])}, rata-rata {_fmt(stats['mean'])}, median {_fmt(stats['median'])}, "
+            f"min {_fmt(stats['min'])}, max {_fmt(stats['max'])}"
+        )
+    if "dimension" in digest:
+        lines.append(f"Dimensi: {digest['dimension']} ({digest['groups']} grup), ukuran: {digest['measure']}")
+    if "top" in digest:
+        lines.append("Teratas: " + "; ".join(f"{l} = {_fmt(v)} ({_pct(p)})" for l, v, p in digest["top"]))
+    if "bottom" in digest:
+        lines.append("Terbawah: " + "; ".join(f"{l} = {_fmt(v)} ({_pct(p)})" for l, v, p in digest["bottom"]))
+    periods = digest.get("periods")
+    if periods:
+        lines.append(
+            f"Periode {periods['first'][0]} s/d {periods['last'][0]} ({periods['count']} periode); "
+            f"puncak {periods['peak'][0]} = {_fmt(periods['peak'][1])}; terendah {periods['low'][0]} = {_fmt(periods['low'][1])}"
+        )
+        if periods.get("last_delta_pct") is not None:
+            lines.append(f"Perubahan periode terakhir: {_pct(periods['last_delta_pct'])}")
+    if digest.get("outliers"):
+        lines.append("Outlier: " + "; ".join(f"{l} = {_fmt(v)}" for l, v in digest["outliers"]))
+    return "\n".join(lines)
+
+
+def local_insight(user_query: str, digest: dict) -> str:
+    """Insight berbasis template dari digest -- tanpa LLM sama sekali."""
+    rows = digest["rows"]
+    if rows == 0:
+        return "Query tidak mengembalikan data."
+    if not digest.get("measures"):
+        found = _total_text(digest) if digest.get("truncated") else _fmt(rows)
+        return f"Ditemukan {found} baris data yang sesuai dengan pertanyaan Anda."
+
+    measure = digest["measure"]
+    sentences = []
+    periods = digest.get("periods")
+    if periods:
+        sentences.append(
+            f"Selama {periods['count']} periode ({periods['first'][0]} s/d {periods['last'][0]}), total {measure} "
+            f"mencapai {_fmt(digest['total'])}, dengan puncak pada {periods['peak'][0]} ({_fmt(periods['peak'][1])}) "
+            f"dan titik terendah pada {periods['low'][0]} ({_fmt(periods['low'][1])})."
+        )
+        pct = periods.get("last_delta_pct")
+        if pct is not None:
+            arah = "naik" if pct >= 0 else "turun"
+            sentences.append(f"Periode terakhir {arah} {_pct(abs(pct))} dibanding periode sebelumnya.")
+    elif digest.get("top"):
+        label, value, share = digest["top"][0]
+        dimension = digest.get("dimension", "baris")
+        sentences.append(
+            f"Dari {digest['groups']} {dimension}, {label} memimpin dengan {measure} {_fmt(value)}"
+            + (f" ({_pct(share)} dari total {_fmt(digest['total'])})." if share == share else ".")
+        )
+        if digest.get("bottom"):
+            low_label, low_value, _ = digest["bottom"][0]
+            sentences.append(f"Nilai terendah ada pada {low_label} ({_fmt(low_value)}).")
+    if digest.get("outliers"):
+        sentences.append("Perlu dicermati nilai yang menyimpang: " + ", ".join(l for l, _ in digest["outliers"]) + ".")
+    sentences = sentences[:3]
+    if digest.get("truncated"):
+        sentences.append(f"(Dihitung dari {_fmt(rows)} baris pertama dari {_total_text(digest)} baris hasil query.)")
+    return " ".join(sentences)
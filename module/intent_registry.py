@@ -0,0 +1,238 @@
+# ----------------------- intent_registry.py -----------------------
+import re
+import threading
+from module.config import DATABASE_PATH, INTENT_DEFAULT_LIMIT
+from module.connection_pool import get_pool, get_data_token
+
+# Registry pertanyaan yang sering muncul (termasuk tombol Quick Action) beserta
+# template SQL yang sudah diuji. Pertanyaan yang cocok langsung mendapat SQL
+# dalam hitungan milidetik tanpa memanggil LLM.
+#
+# Setiap intent: nama, kata pemicu (indeks cepat: regex intent hanya dicoba jika
+# salah satu kata pemicunya ada di pertanyaan), slot opsional, regex, dan fungsi
+# pembentuk SQL. Slot {city} / {category} hanya menerima nilai yang benar-benar
+# ada di database.
+
+ALL_WORDS = re.compile(r"\b(semua|seluruh|selengkapnya|all)\b")
+# Filter yang tidak dicakup template -> pertanyaan diserahkan ke LLM
+EXTRA_FILTERS = re.compile(r"\b(tahun|bulan ini|bulan lalu|minggu|kemarin|hari ini|(19|20)\d\d|selain|kecuali|tanpa|antara)\b")
+# Kata yang mengubah arti (arah perbandingan, negasi, agregasi lain, atau subjek lain
+# seperti pelanggan/kota). Pertanyaan yang memuatnya diserahkan ke LLM, kecuali kata
+# itu bagian dari frasa intent (Intent.allows).
+CONFLICT_WORDS = re.compile(
+    r"lebih dari|di atas|>|\btidak\b|\bbukan\b|\bjumlah\b|\bberapa\b|\brata-?\s?rata\b|\bavg\b|\bharga"
+    r"|\b(?:pelanggan|customer|konsumen|pembeli|kota|pesanan|transaksi)\b"
+)
+_NUMBER = r"(?P<n>\d{1,4})"
+# Semua pola di-anchor di awal & akhir: hanya kata kerja pembuka opsional yang boleh
+# mendahului frasa intent, agar "pelanggan yang membeli produk termahal" tidak ikut cocok
+_PREFIX = r"^((tampilkan|tunjukkan|apa)\s+)?((semua|seluruh)\s+)?"
+
+_vocab_cache = {}
+_vocab_lock = threading.Lock()
+
+
+def _limit(match, query: str, default: int = INTENT_DEFAULT_LIMIT) -> str:
+    """Aturan LIMIT yang sama dengan prompt SQL: angka eksplisit > 'semua' > default."""
+    n = match.groupdict().get("n")
+    if n:
+        return f" LIMIT {int(n)}"
+    if ALL_WORDS.search(query):
+        return ""
+    return f" LIMIT {default}"
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _conflicts(query: str) -> set:
+    """Kata pengubah arti di pertanyaan, dinormalkan ("rata rata" -> "rata-rata", "harganya" -> "harga")."""
+    found = set()
+    for word in CONFLICT_WORDS.findall(query):
+        found.add("rata-rata" if word.startswith("rata") else word)
+    return found
+
+
+class Intent:
+    def __init__(self, name, triggers, pattern, build, slot=None, allows=()):
+        self.name = name
+        self.triggers = frozenset(triggers)
+        self.pattern = pattern
+        self.build = build
+        self.slot = slot
+        self.allows = frozenset(allows)
+        self.regex = None if slot else re.compile(pattern)
+
+    def search(self, query: str, slot_value: str = None):
+        if self.slot is None:
+            return self.regex.search(query)
+        # Nilai slot sudah dipastikan ada di database; re.compile di-cache oleh modul re
+        return re.search(self.pattern.replace("{%s}" % self.slot, re.escape(slot_value)), query)
+
+
+INTENTS = [
+    Intent(
+        "produk_termahal", {"produk"},
+        rf"{_PREFIX}(?:{_NUMBER}\s+)?produk\s+((dengan|yang)\s+)?(harga(nya)?\s+)?(termahal|paling mahal|tertinggi)\s*\??$",
+        lambda m, q, s: f"SELECT * FROM products ORDER BY price DESC{_limit(m, q)}",
+        allows={"harga"},
+    ),
+    Intent(
+        "produk_termurah", {"produk"},
+        rf"{_PREFIX}(?:{_NUMBER}\s+)?produk\s+((dengan|yang)\s+)?(harga(nya)?\s+)?(termurah|paling murah|terendah)\s*\??$",
+        lambda m, q, s: f"SELECT * FROM products ORDER BY price ASC{_limit(m, q)}",
+        allows={"harga"},
+    ),
+    Intent(
+        "produk_terlaris", {"produk"},
+        rf"{_PREFIX}(?:{_NUMBER}\s+)?produk\s+(yang\s+)?(terlaris|paling laris|paling banyak (terjual|dibeli))\s*\??$",
+        lambda m, q, s: (
+            "SELECT p.name, p.category, SUM(oi.quantity) AS total_terjual "
+            "FROM order_items oi JOIN products p ON p.product_id = oi.product_id "
+            f"GROUP BY p.product_id ORDER BY total_terjual DESC{_limit(m, q)}"
+        ),
+    ),
+    Intent(
+        "stok_menipis", {"stok"},
+        rf"{_PREFIX}(produk\s+((dengan|yang)\s+)?)?stok(nya)?\s+(yang\s+)?"
+        r"((kurang dari|di ?bawah|<)\s*(?P<threshold>\d+)|menipis|sedikit|rendah)\s*\??$",
+        lambda m, q, s: (
+            "SELECT * FROM products WHERE stock_quantity < "
+            f"{int(m.group('threshold') or 20)} ORDER BY stock_quantity ASC"
+        ),
+    ),
+    Intent(
+        "tren_penjualan_harian", {"tren"},
+        rf"{_PREFIX}tren\s+(penjualan|pendapatan|omzet)\s+"
+        r"((harian|per hari)(\s+berdasarkan tanggal)?|berdasarkan tanggal)(\s+(order|pesanan))?\s*\??$",
+        lambda m, q, s: (
+            "SELECT order_date, SUM(total_amount) AS total_penjualan "
+            "FROM orders GROUP BY order_date ORDER BY order_date"
+        ),
+    ),
+    Intent(
+        "tren_penjualan_bulanan", {"tren"},
+        rf"{_PREFIX}tren\s+(penjualan|pendapatan|omzet)(\s+(bulanan|per bulan|tiap bulan|setiap bulan))?\s*\??$",
+        lambda m, q, s: (
+            "SELECT strftime('%Y-%m', order_date) AS bulan, SUM(total_amount) AS total_penjualan "
+            "FROM orders GROUP BY bulan ORDER BY bulan"
+        ),
+    ),
+    Intent(
+        "pendapatan_per_kota", {"kota"},
+        r"^((berapa|tampilkan)\s+)?(total\s+)?(pendapatan|penjualan|omzet|revenue)\s+((dari|di)\s+)?"
+        r"(per|masing-masing|setiap|tiap|semua|seluruh)\s+kota\s*\??$",
+        lambda m, q, s: (
+            "SELECT c.city, SUM(o.total_amount) AS total_pendapatan "
+            "FROM orders o JOIN customers c ON c.customer_id = o.customer_id "
+            "GROUP BY c.city ORDER BY total_pendapatan DESC"
+        ),
+        allows={"berapa", "kota"},
+    ),
+    Intent(
+        "pendapatan_per_kategori", {"kategori"},
+        r"^((berapa|tampilkan)\s+)?(total\s+)?(pendapatan|penjualan|omzet|revenue)\s+((dari|di)\s+)?"
+        r"(per|masing-masing|setiap|tiap|semua|seluruh)\s+kategori\s*\??$",
+        lambda m, q, s: (
+            "SELECT p.category, SUM(oi.subtotal) AS total_pendapatan "
+            "FROM order_items oi JOIN products p ON p.product_id = oi.product_id "
+            "GROUP BY p.category ORDER BY total_pendapatan DESC"
+        ),
+        allows={"berapa"},
+    ),
+    Intent(
+        "pendapatan_kota", {"pendapatan", "penjualan", "omzet", "revenue"},
+        r"^((berapa|tampilkan)\s+)?(total\s+)?(pendapatan|penjualan|omzet|revenue)\s+(di|dari)\s+(kota\s+)?{city}\s*\??$",
+        lambda m, q, s: (
+            "SELECT c.city, SUM(o.total_amount) AS total_pendapatan "
+            "FROM orders o JOIN customers c ON c.customer_id = o.customer_id "
+            f"WHERE c.city = {_quote(s['city'])} GROUP BY c.city"
+        ),
+        slot="city",
+        allows={"berapa", "kota"},
+    ),
+    Intent(
+        "pelanggan_kota", {"pelanggan", "customer", "konsumen"},
+        rf"^((tampilkan|daftar|list)\s+)?(semua\s+|seluruh\s+)?(?:{_NUMBER}\s+)?(pelanggan|customer|konsumen)\s+"
+        r"(yang\s+)?(di|dari|tinggal di|berasal dari)\s+(kota\s+)?{city}\s*\??$",
+        lambda m, q, s: f"SELECT * FROM customers WHERE city = {_quote(s['city'])}{_limit(m, q)}",
+        slot="city",
+        allows={"pelanggan", "customer", "konsumen", "kota"},
+    ),
+    Intent(
+        "produk_kategori", {"produk"},
+        rf"{_PREFIX}(?:{_NUMBER}\s+)?produk\s+(di\s+|dari\s+|dalam\s+)?(kategori\s+)?{{category}}\s*\??$",
+        lambda m, q, s: f"SELECT * FROM products WHERE category = {_quote(s['category'])}{_limit(m, q)}",
+        slot="category",
+    ),
+]
+
+# Indeks kata pemicu -> intent (dibangun sekali saat import)
+_INDEX = {}
+for _intent in INTENTS:
+    for _word in _intent.triggers:
+        _INDEX.setdefault(_word, []).append(_intent)
+
+
+def _slot_vocab(db_path: str) -> dict:
+    """Nilai slot yang valid (kota & kategori), di-cache sampai data berubah."""
+    token = get_data_token(db_path)
+    cached = _vocab_cache.get(db_path)
+    if cached is not None and cached[0] == token:
+        return cached[1]
+
+    with get_pool(db_path).connection() as conn:
+        vocab = {
+            "city": {r[0].lower(): r[0] for r in conn.execute("SELECT DISTINCT city FROM customers") if r[0]},
+            "category": {r[0].lower(): r[0] for r in conn.execute("SELECT DISTINCT category FROM products") if r[0]},
+        }
+    with _vocab_lock:
+        _vocab_cache[db_path] = (token, vocab)
+    return vocab
+
+
+def match_intent(user_query: str, db_path: str = DATABASE_PATH):
+    """
+    Mengembalikan (nama_intent, sql) jika pertanyaan cocok dengan intent yang dikenal,
+    atau None agar pertanyaan diteruskan ke LLM.
+    """
+    query = " ".join(user_query.lower().split())
+    hits = {id(i) for word in re.findall(r"\w+", query) for i in _INDEX.get(word, ())}
+    candidates = [intent for intent in INTENTS if id(intent) in hits]
+    if not candidates:
+        return None
+
+    if EXTRA_FILTERS.search(query):
+        return None
+    conflicts = _conflicts(query)
+
+    try:
+        vocab = _slot_vocab(db_path)
+    except Exception as e:
+        print(f"Intent Vocab Error: {e}")
+        vocab = {}
+    mentioned = {
+        slot: [v for v in values if re.search(rf"\b{re.escape(v)}\b", query)]
+        for slot, values in vocab.items()
+    }
+
+    for intent in candidates:
+        if conflicts - intent.allows:
+            continue
+        # Semua kota/kategori yang disebut harus "dipakai" oleh intent; jika tidak,
+        # template akan membuang filter tersebut -> biarkan LLM yang menyusun.
+        extra = [slot for slot, found in mentioned.items() if found and slot != intent.slot]
+        if extra:
+            continue
+        slot_value = None
+        if intent.slot:
+            found = mentioned.get(intent.slot, [])
+            if len(found) != 1:
+                continue
+            slot_value = found[0]
+        match = intent.search(query, slot_value)
+        if match:
+            values = {intent.slot: vocab[intent.slot][slot_value]} if intent.slot else {}
+            return intent.name, intent.build(match, query, values)
+    return None
@@ -0,0 +1,73 @@
+# ----------------------- llm_client.py -----------------------
+import threading
+import httpx
+from langchain_groq import ChatGroq
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from module.config import GROQ_API_KEY, MODEL_NAME, LLM_TIMEOUT, LLM_MAX_CONNECTIONS
+from module.telemetry import llm_callbacks
+
+# Registry level modul: client HTTP, model, dan chain dibuat sekali lalu dipakai ulang
+# oleh semua session (keep-alive HTTP tidak dibuang di setiap pertanyaan).
+_lock = threading.Lock()
+_http_client = None
+_llms = {}
+_chains = {}
+
+
+def get_http_client() -> httpx.Client:
+    """Satu transport HTTP ber-pool yang dibagi oleh semua instance ChatGroq."""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    timeout=LLM_TIMEOUT,
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                    ),
+                )
+    return _http_client
+
+
+def get_llm(temperature: float = 0, model: str = MODEL_NAME) -> ChatGroq:
+    """ChatGroq per pasangan (model, temperature)."""
+    key = (model, temperature)
+    llm = _llms.get(key)
+    if llm is None:
+        http_client = get_http_client()
+        with _lock:
+            llm = _llms.get(key)
+            if llm is None:
+                llm = ChatGroq(
+                    groq_api_key=GROQ_API_KEY,
+                    model_name=model,
+                    temperature=temperature,
+                    http_client=http_client,
+                    callbacks=llm_callbacks() or None,
+                )
+                _llms[key] = llm
+    return llm
+
+
+def get_chain(name: str, template: str, temperature: float = 0, parser_cls=StrOutputParser, model: str = MODEL_NAME,
+              timeout: float = None):
+    """
+    Chain `prompt | llm | parser` yang dibangun sekali per (name, model, temperature, timeout).
+    Runnable LangChain aman dipanggil dari banyak thread sekaligus.
+    timeout: batas per request (termasuk tiap pembacaan stream) menggantikan LLM_TIMEOUT.
+    """
+    key = (name, model, temperature, timeout)
+    chain = _chains.get(key)
+    if chain is None:
+        llm = get_llm(temperature, model)
+        if timeout is not None:
+            llm = llm.bind(timeout=timeout)
+        with _lock:
+            chain = _chains.get(key)
+            if chain is None:
+                prompt = ChatPromptTemplate.from_template(template)
+                chain = prompt | llm | parser_cls()
+                _chains[key] = chain
+    return chain
@@ -1,18 +1,25 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 from langchain_core.output_parsers import JsonOutputParser
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from module.config import GROQ_API_KEY, MODEL_NAME
+import contextvars
+import json
+import time
+from module.config import (
+    LLM_WORKERS, LLM_STAGE_TIMEOUT, VIZ_LLM_FALLBACK, INSIGHT_MODE, INSIGHT_PREVIEW_ROWS, SCHEMA_PRUNING, SQL_MODE
+)
+from module.llm_client import get_chain
+from module.question_cache import question_cache, make_cache_key
+from module.viz_recommender import recommend_visualization, validate_visualization
+from module.insight_utils import summarize_dataframe, format_digest, local_insight
+from module.schema_index import prune_schema
+from module.telemetry import span, count, record_span
 import pandas as pd
 
-def get_sql_query(user_query: str, schema_description: str,chat_history: str = "") -> str:
-    # 1. Dapatkan tanggal hari ini agar AI paham konteks waktu
-    # (Penting untuk pertanyaan seperti "penjualan bulan ini" atau "tahun lalu")
-    current_date = datetime.now().strftime("%Y-%m-%d")
-
-    # 2. Prompt Engineering yang lebih spesifik untuk SQLite & E-Commerce
-    template = """
+# --- Prompt Templates ---
+# Template didefinisikan sekali di level modul; chain-nya dibangun sekali oleh
+# llm_client.get_chain lalu dipakai ulang di setiap pertanyaan.
+# Bagian tugas & aturan SQL dipakai bersama oleh SQL_PROMPT_TEMPLATE dan COMBINED_PROMPT_TEMPLATE
+_SQL_TASK_PROMPT = """
     You are an expert SQLite Data Analyst for an E-Commerce company.
     Your task is to convert the user's natural language question into a valid SQLite query.
 
@@ -37,7 +44,9 @@ def get_sql_query(user_query: str, schema_description: str,chat_history: str = "
     2. If the user asks a short follow-up question (e.g., "How about Jakarta?", "And in 2024?", "What about electronics?"), you MUST maintain the context of the **IMMEDIATELY PRECEDING SQL QUERY**.
     3. **DO NOT** create a simple "SELECT * FROM table" query if the previous topic was specific (like "best selling products" or "total revenue").
     4. **REUSE** the same tables, joins, and logic from the previous SQL query, and ONLY change the filter condition (e.g., change WHERE city = 'Kendari' to WHERE city = 'Jakarta').
+"""
 
+SQL_PROMPT_TEMPLATE = _SQL_TASK_PROMPT + """
     ### Strict Rules:
     1. Output ONLY the SQL query. No markdown, no explanations, no ```sql fences.
     2. Use 'single quotes' for string literals (e.g., city = 'Bandung').
@@ -53,43 +62,44 @@ def get_sql_query(user_query: str, schema_description: str,chat_history: str = "
     ### SQL Query:
     """
 
-    prompt = ChatPromptTemplate.from_template(template)
-
-    llm = ChatGroq(
-        groq_api_key=GROQ_API_KEY,
-        model_name=MODEL_NAME,
-        temperature=0 # Set 0 agar hasil konsisten dan tidak kreatif berlebihan
-    )
+COMBINED_PROMPT_TEMPLATE = _SQL_TASK_PROMPT + """
+    ### Strict Rules:
+    1. Use 'single quotes' for string literals (e.g., city = 'Bandung').
+    2. Use "double quotes" for column names if they contain spaces or special chars.
+    3. For date filtering, use SQLite functions like strftime() or date().
+    4. If the user asks about "sales" or "revenue", calculate using SUM(total_amount) or SUM(subtotal).
+    5. LIMIT the results to 10 unless the user asks for more (to keep UI clean).
+    6. The user may ask in INDONESIAN language. Translate the intent accurately to SQL.
 
-    # 3. Merakit Chain
-    chain = prompt | llm | StrOutputParser()
+    ### Chart Plan:
+    Also decide how the RESULT of your query should be charted.
+    - Trend over time -> "line". Comparison between categories -> "bar". Composition/Percentage -> "pie".
+    - If the result is not suitable for a chart (e.g., just a list of names), use "none".
+    - "x_column" and "y_column" MUST be column names (or aliases) produced by your SELECT; "y_column" must be numeric.
 
-    # 4. Eksekusi
-    return chain.invoke({
-        "user_query": user_query,
-        "schema_description": schema_description,
-        "current_date": current_date,
-        "chat_history": chat_history
-    }).strip()
+    ### Output Format (JSON):
+    Output ONLY a strictly valid JSON object with these keys, no markdown and no explanations:
+    - "sql": the SQLite query
+    - "chart_type": one of ["bar", "line", "pie", "none"]
+    - "x_column": column for the X axis (or category for pie)
+    - "y_column": column for the Y axis (or values for pie)
 
+    ### User Question:
+    {user_query}
 
-def generate_data_insight(user_query: str, df: pd.DataFrame) -> str:
+    ### JSON:
     """
-    Fungsi ini menerima pertanyaan user dan Dataframe hasil query,
-    lalu meminta LLM untuk memberikan analisis singkat.
-    """
-    
-    # Kita hanya mengirim maksimal 10 baris pertama agar tidak boros token
-    # dan menjaga performa tetap cepat.
-    data_preview = df.head(10).to_markdown(index=False)
-    
-    template = """
+
+INSIGHT_PROMPT_TEMPLATE = """
     Anda adalah Senior Data Analyst. Tugas Anda adalah memberikan insight singkat 
     berdasarkan data yang ditemukan untuk menjawab pertanyaan user.
 
     Pertanyaan User: {user_query}
-    
-    Data Hasil Query (Preview):
+
+    Ringkasan Statistik (dihitung lokal dari baris hasil query yang dimuat):
+    {data_summary}
+
+    Contoh Baris (Preview):
     {data_preview}
     
     Instruksi:
@@ -97,38 +107,14 @@ def generate_data_insight(user_query: str, df: pd.DataFrame) -> str:
     2. Jika ada tren atau angka yang mencolok (tertinggi/terendah), sebutkan.
     3. Gunakan Bahasa Indonesia yang profesional dan luwes.
     4. Jangan mengulang isi tabel mentah-mentah, berikan kesimpulan.
+    5. Gunakan angka dari Ringkasan Statistik, jangan menghitung ulang dari preview.
+    6. Jika Ringkasan menyebut hasil terpotong, jangan sebut angkanya sebagai total keseluruhan;
+       jelaskan bahwa angka tersebut hanya mewakili baris yang dimuat.
     
     Insight Singkat:
     """
-    
-    prompt = ChatPromptTemplate.from_template(template)
-    
-    llm = ChatGroq(
-        groq_api_key=GROQ_API_KEY,
-        model_name=MODEL_NAME,
-        temperature=0.5 # Sedikit kreatif untuk narasi
-    )
-    
-    chain = prompt | llm | StrOutputParser()
-    
-    return chain.invoke({
-        "user_query": user_query,
-        "data_preview": data_preview
-    })
-
-def get_visualization_recommendation(user_query: str, df: pd.DataFrame) -> dict:
-    """
-    Meminta AI untuk menentukan jenis grafik terbaik berdasarkan konteks data dan pertanyaan.
-    Output berupa dictionary (JSON).
-    """
-    # Jika data terlalu sedikit atau terlalu banyak kolom, tidak usah divisualisasikan
-    if len(df) < 2 or len(df.columns) > 5:
-         return {"chart_type": "none"}
-         
-    data_preview = df.head(5).to_markdown(index=False)
-    columns_list = ", ".join(df.columns.tolist())
 
-    template = """
+VIZ_PROMPT_TEMPLATE = """
     You are a Data Visualization Expert. Your task is to recommend the BEST type of chart
     to visualize the provided data, based on the user's intent.
 
@@ -148,20 +134,286 @@ def get_visualization_recommendation(user_query: str, df: pd.DataFrame) -> dict:
     - "x_column": "name of column for X axis (or category for pie)"
     - "y_column": "name of column for Y axis (or values for pie)"
     """
+
+def get_sql_query(user_query: str, schema_description: str,chat_history: str = "", use_cache: bool = True) -> str:
+    # 0. Pertanyaan yang sama (schema & konteks follow-up sama) tidak perlu ke LLM lagi
+    cache_key = make_cache_key(user_query, schema_description, chat_history)
+    if use_cache:
+        cached_sql = question_cache.get(cache_key)
+        count("cache", cache="question", result="hit" if cached_sql is not None else "miss")
+        if cached_sql is not None:
+            return cached_sql
+
+    # 1-2. Prompt Engineering yang lebih spesifik untuk SQLite & E-Commerce (SQL_PROMPT_TEMPLATE)
+    # Temperature 0 agar hasil konsisten dan tidak kreatif berlebihan
+    chain = get_chain("sql", SQL_PROMPT_TEMPLATE, temperature=0)
+
+    # 3. Eksekusi
+    with span("llm.sql"):
+        sql = chain.invoke(_sql_inputs(user_query, schema_description, chat_history)).strip()
+
+    if use_cache and sql:
+        question_cache.put(cache_key, user_query, sql)
+    return sql
+
+
+def _sql_inputs(user_query: str, schema_description: str, chat_history: str) -> dict:
+    # Tanggal hari ini agar AI paham konteks waktu
+    # (Penting untuk pertanyaan seperti "penjualan bulan ini" atau "tahun lalu")
+    current_date = datetime.now().strftime("%Y-%m-%d")
+
+    # Schema besar: hanya tabel yang relevan (BM25 + tetangga FK) yang masuk prompt.
+    # Cache key tetap memakai schema penuh.
+    prompt_schema = schema_description
+    if SCHEMA_PRUNING:
+        with span("schema.prune") as current:
+            prompt_schema, used, total = prune_schema(schema_description, user_query, chat_history)
+            current.set(tables=used, total_tables=total)
+    return {
+        "user_query": user_query,
+        "schema_description": prompt_schema,
+        "current_date": current_date,
+        "chat_history": chat_history
+    }
+
+
+def get_sql_and_visualization(user_query: str, schema_description: str, chat_history: str = "",
+                              use_cache: bool = True):
+    """
+    Mode combined: satu panggilan LLM menghasilkan SQL sekaligus rencana grafik.
+    Mengembalikan (sql, viz_plan); viz_plan divalidasi nanti terhadap hasil query
+    (lihat visualization_from_plan). Jika JSON tidak valid, jatuh ke get_sql_query
+    dengan viz_plan None (grafik lewat jalur biasa).
+    """
+    cache_key = make_cache_key(user_query, schema_description, chat_history, mode="combined")
+    if use_cache:
+        cached = question_cache.get(cache_key)
+        count("cache", cache="question", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            plan = json.loads(cached)
+            return plan.pop("sql"), plan
+
+    chain = get_chain("combined", COMBINED_PROMPT_TEMPLATE, temperature=0, parser_cls=JsonOutputParser)
+    try:
+        with span("llm.sql", mode="combined"):
+            response = chain.invoke(_sql_inputs(user_query, schema_description, chat_history))
+        sql = str(response.get("sql") or "").strip()
+    except Exception as e:
+        print(f"Combined Error: {e}")
+        sql = ""
+    if not sql:
+        return get_sql_query(user_query, schema_description, chat_history, use_cache), None
+
+    plan = {key: response.get(key) for key in ("chart_type", "x_column", "y_column")}
+    if use_cache:
+        question_cache.put(cache_key, user_query, json.dumps({"sql": sql, **plan}))
+    return sql, plan
+
+
+def forget_sql_query(user_query: str, schema_description: str, chat_history: str = ""):
+    """Hapus SQL dari cache (misalnya karena gagal dieksekusi) agar tidak dipakai ulang."""
+    question_cache.invalidate(make_cache_key(user_query, schema_description, chat_history))
+    if SQL_MODE == "combined":
+        question_cache.invalidate(make_cache_key(user_query, schema_description, chat_history, mode="combined"))
+
+
+def _insight_inputs(user_query: str, df: pd.DataFrame, digest: dict) -> dict:
+    """Input prompt insight: digest statistik baris yang dimuat + beberapa baris contoh."""
+    return {
+        "user_query": user_query,
+        "data_summary": format_digest(digest),
+        "data_preview": df.head(INSIGHT_PREVIEW_ROWS).to_csv(index=False),
+    }
+
+
+def _summarize(user_query: str, df: pd.DataFrame, page_info: dict = None) -> dict:
+    page_info = page_info or {}
+    with span("insight.summary", rows=len(df)):
+        return summarize_dataframe(
+            df, user_query, truncated=bool(page_info.get("truncated")), total_rows=page_info.get("total_estimate")
+        )
+
+
+def generate_data_insight(user_query: str, df: pd.DataFrame, page_info: dict = None) -> str:
+    """
+    Fungsi ini menerima pertanyaan user dan Dataframe hasil query,
+    lalu meminta LLM untuk memberikan analisis singkat.
+    page_info (dari execute_sql_page) menandai jika df hanya halaman pertama.
+    """
+    
+    # Statistik dihitung lokal dari baris yang dimuat; LLM hanya menerima ringkasan
+    # + beberapa baris contoh agar hemat token dan tetap akurat.
+    try:
+        digest = _summarize(user_query, df, page_info)
+    except Exception as e:
+        print(f"Insight Error: {e}")
+        return INSIGHT_FALLBACK
+    if INSIGHT_MODE == "local":
+        return local_insight(user_query, digest)
+    
+    # Sedikit kreatif untuk narasi
+    chain = get_chain("insight", INSIGHT_PROMPT_TEMPLATE, temperature=0.5)
     
-    prompt = ChatPromptTemplate.from_template(template)
-    llm = ChatGroq(groq_api_key=GROQ_API_KEY, model_name=MODEL_NAME, temperature=0)
+    with span("llm.insight"):
+        return chain.invoke(_insight_inputs(user_query, df, digest))
+
+
+_STREAM_END = object()
+
+
+def _close_stream(stream):
+    try:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+    except Exception as e:
+        print(f"Insight Error: gagal menutup stream: {e}")
+
+
+def stream_data_insight(user_query: str, df: pd.DataFrame, timeout: float = LLM_STAGE_TIMEOUT,
+                        page_info: dict = None):
+    """
+    Versi streaming dari generate_data_insight: menghasilkan potongan teks (token)
+    begitu diterima dari LLM. Jika gagal atau melewati timeout, stream ditutup
+    dengan teks fallback.
+    """
+    # Digest yang gagal dibentuk (bentuk hasil query tak terduga) -> teks fallback,
+    # bukan error yang menggagalkan seluruh jawaban
+    try:
+        digest = _summarize(user_query, df, page_info)
+        if INSIGHT_MODE == "local":
+            text = local_insight(user_query, digest)
+        else:
+            inputs = _insight_inputs(user_query, df, digest)
+    except Exception as e:
+        print(f"Insight Error: {e}")
+        yield INSIGHT_FALLBACK
+        return
+    if INSIGHT_MODE == "local":
+        yield text
+        return
+    # Timeout request = deadline stage: pembacaan chunk di worker tidak bisa menggantung lebih lama
+    chain = get_chain("insight", INSIGHT_PROMPT_TEMPLATE, temperature=0.5, timeout=timeout)
+
+    # Span stream diukur manual: generator berjalan bergantian dengan pemanggilnya
+    started = time.perf_counter()
+    first_chunk = None
+    deadline = time.monotonic() + timeout
+    produced = False
+    outcome = "ok"
+    # Setiap chunk dibaca lewat Future agar deadline juga berlaku saat menunggu
+    # chunk pertama (request LLM baru dikirim di next() pertama)
+    stream = iter(chain.stream(inputs))
+    read_chunk = contextvars.copy_context().run
+    pending = None
+    try:
+        while True:
+            future = _executor.submit(read_chunk, next, stream, _STREAM_END)
+            try:
+                chunk = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                # next() masih berjalan di worker; generator baru bisa ditutup setelah
+                # pembacaan itu kembali (dibatasi timeout request di atas)
+                pending = future
+                outcome = "timeout"
+                print("Insight Error: timeout")
+                yield " …" if produced else INSIGHT_FALLBACK
+                return
+            if chunk is _STREAM_END:
+                return
+            if chunk:
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+                produced = True
+                yield chunk
+    except Exception as e:
+        print(f"Insight Error: {e}")
+        outcome = "error"
+        if not produced:
+            yield INSIGHT_FALLBACK
+    finally:
+        # Menutup generator LangChain ikut menutup response HTTP stream dari LLM
+        if pending is not None:
+            pending.add_done_callback(lambda _: _close_stream(stream))
+        else:
+            _close_stream(stream)
+        record_span("llm.insight_stream", time.perf_counter() - started, outcome=outcome,
+                    ttft_ms=round(first_chunk * 1000, 3) if first_chunk is not None else None)
+
+def get_visualization_recommendation(user_query: str, df: pd.DataFrame) -> dict:
+    """
+    Menentukan jenis grafik terbaik berdasarkan konteks data dan pertanyaan.
+    Aturan lokal dulu (viz_recommender), AI hanya untuk kasus ambigu.
+    Output berupa dictionary (JSON).
+    """
+    # Jika data terlalu sedikit atau terlalu banyak kolom, tidak usah divisualisasikan
+    if len(df) < 2 or len(df.columns) > 5:
+         return {"chart_type": "none"}
+
+    # Aturan lokal (tipe kolom & kardinalitas) sudah cukup untuk kebanyakan kasus;
+    # LLM hanya dipanggil jika hasilnya ambigu.
+    with span("viz.local"):
+        local_config = recommend_visualization(user_query, df)
+    count("viz_source", source="local" if local_config is not None else "llm" if VIZ_LLM_FALLBACK else "none")
+    if local_config is not None:
+        return local_config
+    if not VIZ_LLM_FALLBACK:
+        return {"chart_type": "none"}
+         
+    data_preview = df.head(5).to_markdown(index=False)
+    columns_list = ", ".join(df.columns.tolist())
+
     # Menggunakan JsonOutputParser agar AI dipaksa mengeluarkan format JSON yang valid
-    chain = prompt | llm | JsonOutputParser()
+    chain = get_chain("viz", VIZ_PROMPT_TEMPLATE, temperature=0, parser_cls=JsonOutputParser)
 
     try:
-        response = chain.invoke({
-            "user_query": user_query,
-            "columns_list": columns_list,
-            "data_preview": data_preview
-        })
+        with span("llm.viz"):
+            response = chain.invoke({
+                "user_query": user_query,
+                "columns_list": columns_list,
+                "data_preview": data_preview
+            })
         return response
     except Exception as e:
         # Jika AI gagal menghasilkan JSON valid, fallback ke tidak ada chart
         print(f"Viz Error: {e}")
-        return {"chart_type": "none"}
\ No newline at end of file
+        return {"chart_type": "none"}
+
+
+def visualization_from_plan(user_query: str, df: pd.DataFrame, viz_plan: dict) -> dict:
+    """
+    Mode combined: rencana grafik dari respons SQL divalidasi terhadap kolom hasil.
+    Jika tidak cocok, dipakai aturan lokal; tidak ada panggilan LLM viz tambahan.
+    """
+    with span("viz.plan"):
+        config = validate_visualization(viz_plan, df)
+        source = "plan"
+        if config is None:
+            config = recommend_visualization(user_query, df) or {"chart_type": "none"}
+            source = "local"
+    count("viz_source", source=source)
+    return config
+
+
+# --- Fan-out Insight & Visualisasi ---
+# Insight dan rekomendasi grafik sama-sama hanya bergantung pada (pertanyaan, df),
+# jadi keduanya dijalankan paralel agar hemat satu round trip LLM per pertanyaan.
+_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm-stage")
+
+INSIGHT_FALLBACK = "Insight tidak tersedia saat ini (layanan AI lambat atau gagal merespons)."
+
+
+def submit_visualization_recommendation(user_query: str, df: pd.DataFrame):
+    """Menjalankan get_visualization_recommendation di background, mengembalikan Future."""
+    return _executor.submit(contextvars.copy_context().run, get_visualization_recommendation, user_query, df)
+
+
+def resolve_visualization(viz_future, timeout: float = LLM_STAGE_TIMEOUT) -> dict:
+    """Menunggu hasil Future rekomendasi grafik; fallback ke 'none' jika timeout/gagal."""
+    try:
+        return viz_future.result(timeout=max(0, timeout))
+    except FutureTimeoutError:
+        print("Viz Error: timeout")
+    except Exception as e:
+        print(f"Viz Error: {e}")
+    return {"chart_type": "none"}
@@ -0,0 +1,180 @@
+# ----------------------- query_guard.py -----------------------
+import re
+import threading
+from module.config import (
+    DATABASE_PATH, GUARD_LARGE_TABLE_ROWS, GUARD_MAX_ROWS, GUARD_MAX_JOIN_COST
+)
+from module.connection_pool import get_data_token
+from module.telemetry import current_span
+
+# Guard sebelum eksekusi: SQL dari LLM di-EXPLAIN QUERY PLAN dulu.
+# - Join nested loop dua+ full scan yang terlalu mahal (tanpa kondisi, atau kondisi
+#   yang tidak bisa memakai index seperti a.x < b.x) -> ditolak.
+# - Full scan tabel besar tanpa LIMIT (atau LIMIT terlalu besar) -> LIMIT ditambahkan di akhir
+#   statement/diperketat, kecuali query agregat / GROUP BY di level teratas (hasilnya sudah kecil).
+#   Query tidak dibungkus SELECT * FROM (...) karena SQLite mengganti nama kolom duplikat
+#   di subquery (customer_id -> customer_id:1); hanya LIMIT berbentuk ekspresi yang dibungkus.
+# Perubahan query dicatat di span telemetry "sql.guard" (atribut guard).
+# Perkiraan jumlah baris diambil dari sqlite_stat1 (hasil ANALYZE) atau MAX(rowid).
+
+_row_cache = {}
+_lock = threading.Lock()
+
+# LIMIT literal di akhir query: "LIMIT n [OFFSET m]" atau "LIMIT m, n"; grup n = jumlah baris
+_FINAL_LIMIT = re.compile(r"\blimit\s+(?:\d+\s*,\s*)?(?P<n>\d+)(?:\s+offset\s+\d+)?\s*$", re.IGNORECASE)
+_TOP_LIMIT = re.compile(r"\blimit\b", re.IGNORECASE)
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_DEDUP_SUFFIX = re.compile(r"^(.*):\d+$")
+_TABLE_REF = re.compile(r"\b(?:from|join|,)\s+\"?(\w+)\"?(?:\s+(?:as\s+)?(\w+))?", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PARENS = re.compile(r"\((?:[^()]|\(\))*\)")
+_AGGREGATE = re.compile(
+    r"\bgroup\s+by\b|\b(count|sum|avg|min|max|total|group_concat)\s*\(\)(?!\s*over\b)", re.IGNORECASE
+)
+_SQL_WORDS = {
+    "where", "join", "inner", "left", "right", "cross", "natural", "on", "using", "group",
+    "order", "limit", "having", "union", "except", "intersect", "window", "as", "select",
+}
+
+
+def table_row_estimates(conn, db_path: str = DATABASE_PATH) -> dict:
+    """{nama_tabel: perkiraan_baris}, di-cache sampai data berubah."""
+    token = get_data_token(db_path)
+    cached = _row_cache.get(db_path)
+    if cached is not None and cached[0] == token:
+        return cached[1]
+
+    estimates = {}
+    has_stat = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    if has_stat:
+        for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+            rows = int(stat.split()[0])
+            estimates[table] = max(rows, estimates.get(table, 0))
+
+    tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    for table in tables:
+        if table not in estimates:
+            # MAX(rowid) = lookup B-tree O(log n), bukan COUNT(*) yang memindai seluruh tabel
+            try:
+                estimates[table] = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+            except Exception:
+                estimates[table] = 0
+
+    with _lock:
+        _row_cache[db_path] = (token, estimates)
+    return estimates
+
+
+def table_aliases(query: str, tables: dict) -> dict:
+    """Alias di FROM/JOIN -> nama tabel asli (EXPLAIN QUERY PLAN menampilkan alias)."""
+    lowered = {t.lower(): t for t in tables}
+    aliases = {t.lower(): t for t in tables}
+    for name, alias in _TABLE_REF.findall(query):
+        table = lowered.get(name.lower())
+        if table and alias and alias.lower() not in _SQL_WORDS:
+            aliases[alias.lower()] = table
+    return aliases
+
+
+def plan_summary(conn, query: str) -> str:
+    """Detail EXPLAIN QUERY PLAN dalam satu baris (untuk log & laporan)."""
+    return "; ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+
+
+def inspect_plan(conn, query: str, db_path: str = DATABASE_PATH) -> dict:
+    """
+    Ringkasan rencana eksekusi:
+    {"scans": [(tabel, baris)], "cartesian": [(tabel, ...)], "join_cost": int}
+    """
+    estimates = table_row_estimates(conn, db_path)
+    aliases = table_aliases(query, estimates)
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+
+    scans = []
+    loops = {}  # parent id -> full scan berurutan (nested loop) di level yang sama
+    for _, parent, _, detail in plan:
+        if not detail.startswith("SCAN ") or detail.startswith("SCAN CONSTANT ROW"):
+            continue
+        name = detail.split()[1]
+        if name == "TABLE":  # Format lama: "SCAN TABLE orders AS o"
+            name = detail.split()[2]
+        table = aliases.get(name.lower())
+        if table is None:  # Subquery / CTE: ukurannya tidak diketahui di sini
+            continue
+        scans.append((table, estimates.get(table, 0)))
+        loops.setdefault(parent, []).append((table, estimates.get(table, 0)))
+
+    cartesian, join_cost = [], 0
+    for loop in loops.values():
+        if len(loop) < 2:
+            continue
+        cost = 1
+        for _, rows in loop:
+            cost *= max(rows, 1)
+        if cost > join_cost:
+            cartesian, join_cost = [t for t, _ in loop], cost
+    return {"scans": scans, "cartesian": cartesian, "join_cost": join_cost}
+
+
+def _top_level(query: str) -> str:
+    """Teks query level teratas: komentar dibuang, string & isi tanda kurung dikosongkan."""
+    top = _STRING_LITERAL.sub("''", _COMMENTS.sub(" ", query))
+    while True:
+        collapsed = _PARENS.sub("()", top)
+        if collapsed == top:
+            return top
+        top = collapsed
+
+
+def is_aggregate_query(query: str) -> bool:
+    """True jika SELECT teratas memakai GROUP BY atau fungsi agregat (subquery diabaikan)."""
+    return bool(_AGGREGATE.search(_top_level(query)))
+
+
+def original_column_names(columns) -> list:
+    """
+    Nama kolom sebelum query dibungkus subquery: SQLite menamai ulang duplikat
+    (customer_id, customer_id:1); akhiran ":n" dibuang jika nama dasarnya sudah muncul.
+    """
+    names = []
+    for name in columns:
+        m = _DEDUP_SUFFIX.match(name)
+        names.append(m.group(1) if m and m.group(1) in names else name)
+    return names
+
+
+def guard_query(conn, query: str, db_path: str = DATABASE_PATH):
+    """
+    Mengembalikan (query_aman, pesan_error). Query bisa diberi/diperketat LIMIT;
+    pesan_error berisi "SQL Error: ..." jika query ditolak.
+    """
+    plan = inspect_plan(conn, query, db_path)
+
+    current = current_span()
+    if plan["cartesian"] and plan["join_cost"] > GUARD_MAX_JOIN_COST:
+        tables = " x ".join(plan["cartesian"])
+        if current is not None:
+            current.set(guard="rejected", join_cost=plan["join_cost"])
+        return query, (
+            f"SQL Error: Query ditolak karena join terlalu mahal ({tables}: full scan bersarang, "
+            f"perkiraan {plan['join_cost']:,} kombinasi baris). Gunakan kondisi JOIN pada kolom kunci "
+            "(mis. ... ON a.id = b.a_id) atau persempit data dengan WHERE."
+        )
+
+    if any(rows >= GUARD_LARGE_TABLE_ROWS for _, rows in plan["scans"]) and not is_aggregate_query(query):
+        if not _TOP_LIMIT.search(_top_level(query)):
+            if current is not None:
+                current.set(guard="limit_added", limit=GUARD_MAX_ROWS)
+            # Baris baru: LIMIT tidak ikut tertelan komentar "--" di akhir query
+            return f"{query}\nLIMIT {GUARD_MAX_ROWS}", None
+        limit = _FINAL_LIMIT.search(query)
+        if limit is None:
+            # LIMIT berbentuk ekspresi: dibungkus; nama kolom dipulihkan oleh original_column_names
+            if current is not None:
+                current.set(guard="limit_wrapped", limit=GUARD_MAX_ROWS)
+            return f"SELECT * FROM ({query}\n) LIMIT {GUARD_MAX_ROWS}", None
+        if int(limit.group("n")) > GUARD_MAX_ROWS:
+            if current is not None:
+                current.set(guard="limit_tightened", limit=GUARD_MAX_ROWS)
+            return query[:limit.start("n")] + str(GUARD_MAX_ROWS) + query[limit.end("n"):], None
+    return query, None
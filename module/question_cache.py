@@ -0,0 +1,159 @@
+# ----------------------- question_cache.py -----------------------
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from datetime import datetime
+from module.config import QUESTION_CACHE_PATH, QUESTION_CACHE_TTL, QUESTION_CACHE_MAX_ENTRIES
+
+# Kata yang membuat SQL bergantung pada tanggal hari ini ("bulan ini", "kemarin", ...).
+# Untuk pertanyaan seperti ini, tanggal ikut masuk ke key cache.
+RELATIVE_TIME_WORDS = {
+    "hari", "kemarin", "minggu", "pekan", "bulan", "tahun", "terakhir", "lalu", "ini", "sekarang",
+    "today", "yesterday", "week", "month", "year", "last", "this", "current", "recent",
+}
+
+
+def normalize_question(question: str) -> str:
+    """Huruf kecil, tanpa tanda baca, spasi dirapikan: 'Berapa  total?' == 'berapa total'."""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def condense_context(chat_history: str) -> str:
+    """
+    Ringkas konteks follow-up menjadi SQL terakhir saja, karena prompt meminta
+    LLM memakai ulang 'IMMEDIATELY PRECEDING SQL QUERY'.
+    """
+    marker = "Assistant (SQL):"
+    idx = chat_history.rfind(marker)
+    if idx == -1:
+        return ""
+    last_sql = chat_history[idx + len(marker):]
+    end = last_sql.find("\nUser:")
+    if end != -1:
+        last_sql = last_sql[:end]
+    return " ".join(last_sql.split())
+
+
+def make_cache_key(question: str, schema_description: str, chat_history: str = "", mode: str = "sql") -> str:
+    norm = normalize_question(question)
+    schema_fp = hashlib.sha1(schema_description.encode("utf-8")).hexdigest()
+    parts = [norm, schema_fp, condense_context(chat_history)]
+    if mode != "sql":
+        # Mode lain (mis. "combined") menyimpan format nilai berbeda -> key terpisah
+        parts.append(mode)
+    if RELATIVE_TIME_WORDS.intersection(norm.split()):
+        parts.append(datetime.now().strftime("%Y-%m-%d"))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class QuestionCache:
+    """Cache persisten (SQLite) pertanyaan -> SQL dengan TTL dan eviksi LRU."""
+
+    def __init__(self, path: str = QUESTION_CACHE_PATH, ttl: float = QUESTION_CACHE_TTL,
+                 max_entries: int = QUESTION_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS question_cache (
+                    key TEXT PRIMARY KEY,
+                    question TEXT,
+                    sql TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_question_cache_access ON question_cache(last_access)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str):
+        """Mengembalikan SQL jika ada dan belum kedaluwarsa, selain itu None."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT sql, created_at FROM question_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or now - row[1] > self.ttl:
+                    if row is not None:
+                        conn.execute("DELETE FROM question_cache WHERE key = ?", (key,))
+                    self.misses += 1
+                    return None
+                conn.execute(
+                    "UPDATE question_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+                )
+                self.hits += 1
+                return row[0]
+        except sqlite3.Error as e:
+            print(f"Question cache error: {e}")
+            self.misses += 1
+            return None
+
+    def put(self, key: str, question: str, sql: str):
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO question_cache (key, question, sql, created_at, last_access, hits) "
+                    "VALUES (?, ?, ?, ?, ?, 0)",
+                    (key, question, sql, now, now),
+                )
+                # Buang entri yang paling lama tidak diakses jika melebihi batas
+                conn.execute(
+                    "DELETE FROM question_cache WHERE key IN ("
+                    "SELECT key FROM question_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error as e:
+            print(f"Question cache error: {e}")
+
+    def invalidate(self, key: str):
+        try:
+            with self._lock:
+                self._connect().execute("DELETE FROM question_cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"Question cache error: {e}")
+
+    def clear(self):
+        try:
+            with self._lock:
+                self._connect().execute("DELETE FROM question_cache")
+        except sqlite3.Error as e:
+            print(f"Question cache error: {e}")
+
+    def stats(self) -> dict:
+        try:
+            with self._lock:
+                entries = self._connect().execute("SELECT COUNT(*) FROM question_cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = 0
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# Satu instance dibagi oleh semua session Streamlit
+question_cache = QuestionCache()
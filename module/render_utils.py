@@ -0,0 +1,161 @@
+# ----------------------- render_utils.py -----------------------
+import threading
+from collections import OrderedDict
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+from module.config import RENDER_CACHE_MAX_ENTRIES
+from module.result_store import load_result_dataframe, result_row_count
+
+# --- Cache artefak render per pesan ---
+# Setiap rerun Streamlit menggambar ulang seluruh history; tanpa cache, DataFrame & figure
+# Plotly untuk SEMUA pesan lama dibangun ulang. Key = ID stabil pesan (lihat nl2sql.message_id).
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+_MISSING = object()
+
+
+def cached_render(key, builder):
+    """Ambil artefak dari cache (LRU terbatas) atau bangun dengan builder() lalu simpan."""
+    with _render_lock:
+        value = _render_cache.get(key, _MISSING)
+        if value is not _MISSING:
+            _render_cache.move_to_end(key)
+            return value
+    value = builder()
+    store_render(key, value)
+    return value
+
+
+def store_render(key, value):
+    with _render_lock:
+        _render_cache[key] = value
+        _render_cache.move_to_end(key)
+        while len(_render_cache) > RENDER_CACHE_MAX_ENTRIES:
+            _render_cache.popitem(last=False)
+
+
+def result_to_dataframe(result_data, col_names) -> pd.DataFrame:
+    df = pd.DataFrame(result_data, columns=col_names)
+    df.index = df.index + 1  # Index mulai dari 1
+    return df
+
+
+def result_content_to_dataframe(content, extra_rows=None):
+    """DataFrame siap tampil dari konten pesan 'result' (+ baris halaman berikutnya). None jika kosong."""
+    if not result_row_count(content):
+        return None
+    # Hasil besar dibaca dari file Arrow, bukan dari history
+    df = load_result_dataframe(content)
+    if extra_rows:
+        # Gabung per posisi kolom (nama kolom hasil JOIN bisa duplikat)
+        cols = df.columns
+        df = pd.concat(
+            [df.set_axis(range(len(cols)), axis=1), pd.DataFrame(extra_rows)],
+            ignore_index=True
+        ).set_axis(cols, axis=1)
+    df.index = df.index + 1
+    return df
+
+
+def build_chart(df: pd.DataFrame, viz_config: dict):
+    """Membangun figure Plotly dari rekomendasi grafik. None jika tidak bisa/tidak perlu."""
+    if df is None or df.empty or not isinstance(viz_config, dict):
+        return None
+
+    chart_type = viz_config.get("chart_type")
+    x_col = viz_config.get("x_column")
+    y_col = viz_config.get("y_column")
+    if chart_type == "none":
+        return None
+
+    cols_lower = {c.lower(): c for c in df.columns}
+    x_col = cols_lower.get(x_col.lower(), x_col) if x_col else None
+    y_col = cols_lower.get(y_col.lower(), y_col) if y_col else None
+    if not (x_col and y_col and x_col in df.columns and y_col in df.columns):
+        return None
+
+    try:
+        template = "plotly_dark"
+        fig = None
+
+        if chart_type == "bar":
+            df_sorted = df.sort_values(by=y_col, ascending=False).head(10)
+            fig = px.bar(
+                df_sorted,
+                x=x_col,
+                y=y_col,
+                color=x_col,
+                template=template,
+                title=f"Top {y_col} by {x_col}",
+                color_discrete_sequence=px.colors.qualitative.Vivid
+            )
+        elif chart_type == "line":
+            fig = px.line(
+                df,
+                x=x_col,
+                y=y_col,
+                markers=True,
+                template=template,
+                title=f"Trend: {y_col} vs {x_col}",
+                color_discrete_sequence=['#667eea']
+            )
+        elif chart_type == "pie":
+            fig = px.pie(
+                df,
+                names=x_col,
+                values=y_col,
+                hole=0.4,
+                template=template,
+                title=f"Distribution of {y_col}",
+                color_discrete_sequence=px.colors.qualitative.Vivid
+            )
+
+        if fig:
+            fig.update_layout(
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#e0e0e0"),
+                title_font_size=20,
+                title_font_color="#667eea",
+                showlegend=True,
+                height=500
+            )
+        return fig
+    except Exception:
+        return None
+
+
+# --- Render per jenis pesan (dipakai history & pipeline live) ---
+def render_user(content):
+    with st.chat_message("user", avatar="👤"):
+        st.markdown(content)
+
+
+def render_sql(content):
+    with st.expander("🛠️ Lihat Query SQL", expanded=False):
+        st.code(content, language="sql")
+
+
+def render_error(content):
+    with st.chat_message("assistant", avatar="🤖"):
+        st.error(f"❌ Terjadi kesalahan: {content}")
+
+
+def render_result(df):
+    with st.chat_message("assistant", avatar="🤖"):
+        if df is not None and not df.empty:
+            st.dataframe(df, use_container_width=True)
+        else:
+            st.warning("📭 Tidak ada data.")
+
+
+def render_insight(content):
+    with st.chat_message("assistant", avatar="💡"):
+        st.markdown(f"**Analisis:** {content}")
+
+
+def render_chart(fig):
+    if fig is not None:
+        with st.chat_message("assistant", avatar="📊"):
+            st.plotly_chart(fig, use_container_width=True)
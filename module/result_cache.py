@@ -0,0 +1,165 @@
+# ----------------------- result_cache.py -----------------------
+import pickle
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from module.config import DATABASE_PATH, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_COMPACT_ROWS
+from module.connection_pool import get_data_token
+
+
+def canonicalize_sql(query: str) -> str:
+    """
+    Bentuk kanonik SQL untuk key cache: komentar dibuang, whitespace di luar
+    string literal dirapatkan, titik koma di akhir dihapus.
+    Isi literal ('...' / "...") tidak diubah sama sekali.
+    """
+    out = []
+    i, n = 0, len(query)
+    pending_space = False
+    while i < n:
+        ch = query[i]
+        if ch in ("'", '"', "`", "["):
+            close = "]" if ch == "[" else ch
+            j = i + 1
+            while j < n:
+                if query[j] == close:
+                    # Quote ganda ('') adalah escape, bukan penutup
+                    if close != "]" and j + 1 < n and query[j + 1] == close:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            token = query[i:j + 1]
+            i = j + 1
+        elif query.startswith("--", i):
+            end = query.find("\n", i)
+            i = n if end == -1 else end
+            pending_space = True
+            continue
+        elif query.startswith("/*", i):
+            end = query.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            pending_space = True
+            continue
+        elif ch.isspace():
+            pending_space = True
+            i += 1
+            continue
+        else:
+            token = ch
+            i += 1
+
+        if pending_space and out:
+            out.append(" ")
+        pending_space = False
+        out.append(token)
+
+    return "".join(out).rstrip("; ").strip()
+
+
+def _estimate_size(rows) -> int:
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class QueryResultCache:
+    """
+    Cache hasil SELECT (rows, columns) yang berlaku selama token data_version/mtime
+    database belum berubah. Eviksi LRU berdasarkan ukuran (byte), bukan jumlah entri.
+    Hasil besar disimpan kolumnar + zlib, bukan list of tuples.
+    """
+
+    def __init__(self, db_path: str = DATABASE_PATH, max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 compact_rows: int = RESULT_CACHE_COMPACT_ROWS):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.compact_rows = compact_rows
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (payload, columns, compact, size, meta)
+        self._bytes = 0
+        self._token = None
+        self._lock = threading.Lock()
+
+    def _check_token(self):
+        # Dipanggil dengan self._lock terkunci
+        token = get_data_token(self.db_path)
+        if token != self._token:
+            self._entries.clear()
+            self._bytes = 0
+            self._token = token
+
+    def get(self, query: str, variant: str = ""):
+        """
+        Mengembalikan (rows, columns, meta) atau None.
+        `variant` membedakan potongan hasil dari query yang sama (mis. halaman ke-n).
+        """
+        key = canonicalize_sql(query) + "\x00" + variant
+        with self._lock:
+            self._check_token()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            payload, columns, compact, meta = entry[0], entry[1], entry[2], entry[4]
+
+        if compact:
+            column_values = pickle.loads(zlib.decompress(payload))
+            rows = list(zip(*column_values))
+        else:
+            rows = list(payload)
+        return rows, list(columns), dict(meta)
+
+    def put(self, query: str, rows, columns, token=None, variant: str = "", meta=None):
+        """`token`: data token saat query mulai dieksekusi; jika sudah berubah, hasil tidak disimpan."""
+        key = canonicalize_sql(query) + "\x00" + variant
+        compact = len(rows) > self.compact_rows
+        if compact:
+            # Simpan per kolom: tipe data seragam -> pickle & zlib jauh lebih ringkas
+            payload = zlib.compress(pickle.dumps(tuple(zip(*rows)), protocol=pickle.HIGHEST_PROTOCOL), 1)
+            size = len(payload)
+        else:
+            payload = tuple(rows)
+            size = _estimate_size(payload)
+
+        # Satu hasil tidak boleh menghabiskan lebih dari seperempat budget
+        if size > self.max_bytes // 4:
+            return
+
+        with self._lock:
+            self._check_token()
+            if token is not None and token != self._token:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[3]
+            self._entries[key] = (payload, tuple(columns), compact, size, dict(meta or {}))
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[3]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+# Satu instance dibagi oleh semua session Streamlit
+result_cache = QueryResultCache()
@@ -0,0 +1,113 @@
+# ----------------------- result_store.py -----------------------
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+from module.config import RESULT_STORE_DIR, RESULT_SPILL_MIN_ROWS, RESULT_PREVIEW_ROWS
+
+# Hasil query besar TIDAK disimpan di chat_history/history.db sebagai list of tuples.
+# Datanya ditulis sekali ke file Arrow IPC (kolumnar, tanpa kompresi), sedangkan history
+# hanya menyimpan referensi ringan:
+#   {"ref": "<file>.arrow", "row_count": n, "columns": [...], "schema": [...], "preview": rows[:5]}
+# Hasil kecil tetap disimpan inline dengan format lama: (rows, columns).
+# Saat dibaca, file di-memory-map sehingga tabel Arrow tidak perlu buffer baca tambahan,
+# tetapi konversi ke DataFrame / list tetap MENYALIN seluruh isi file (bukan zero-copy):
+# semua pemanggil (tabel, grafik, export) memang membutuhkan hasil utuh.
+
+
+def _to_arrow_column(values):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # SQLite bisa mengembalikan tipe campuran dalam satu kolom -> simpan sebagai teks
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def _write_arrow(path: str, rows, columns):
+    column_values = list(zip(*rows)) if rows else [[] for _ in columns]
+    # Nama kolom duplikat (mis. dua kolom "name" dari JOIN) dibuat unik di file;
+    # nama aslinya tetap disimpan di referensi history.
+    names = [f"{i}:{name}" for i, name in enumerate(columns)]
+    table = pa.Table.from_arrays([_to_arrow_column(list(v)) for v in column_values], names=names)
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)  # Atomik: tidak ada file setengah jadi
+    return table.schema
+
+
+def make_result_entry(rows, columns):
+    """Konten pesan 'result' untuk history: inline jika kecil, referensi file jika besar."""
+    if not rows or len(rows) <= RESULT_SPILL_MIN_ROWS:
+        return (rows, columns)
+    try:
+        os.makedirs(RESULT_STORE_DIR, exist_ok=True)
+        filename = f"{uuid.uuid4().hex}.arrow"
+        schema = _write_arrow(os.path.join(RESULT_STORE_DIR, filename), rows, columns)
+    except Exception as e:
+        print(f"Gagal menyimpan hasil ke file: {e}")
+        return (rows, columns)
+    return {
+        "ref": filename,
+        "row_count": len(rows),
+        "columns": list(columns),
+        "schema": [(name, str(field.type)) for name, field in zip(columns, schema)],
+        "preview": list(rows[:RESULT_PREVIEW_ROWS]),
+    }
+
+
+def is_result_ref(content) -> bool:
+    return isinstance(content, dict) and "ref" in content
+
+
+def result_row_count(content) -> int:
+    if is_result_ref(content):
+        return content["row_count"]
+    rows, _ = content
+    return len(rows) if rows else 0
+
+
+def _read_table(content):
+    """Membaca file Arrow (buffer menunjuk ke memory map). None jika file hilang/rusak."""
+    path = os.path.join(RESULT_STORE_DIR, content["ref"])
+    try:
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"Gagal membaca file hasil {content['ref']}: {e}")
+        return None
+
+
+def load_result_dataframe(content) -> pd.DataFrame:
+    """DataFrame dari konten 'result' (inline atau referensi file; isi file disalin ke pandas)."""
+    if not is_result_ref(content):
+        rows, columns = content
+        return pd.DataFrame(rows, columns=columns)
+
+    table = _read_table(content)
+    if table is None:
+        # File hilang/rusak: tampilkan preview yang masih tersimpan di history
+        return pd.DataFrame(content["preview"], columns=content["columns"])
+    df = table.to_pandas()
+    df.columns = content["columns"]
+    return df
+
+
+def load_result_rows(content):
+    """(rows, columns) dari konten 'result' -- untuk export/download (tipe Python asli, None tetap None)."""
+    if not is_result_ref(content):
+        return content
+    table = _read_table(content)
+    if table is None:
+        return content["preview"], content["columns"]
+    return list(zip(*[col.to_pylist() for col in table.columns])), content["columns"]
+
+
+def delete_result_files(contents):
+    """Hapus file hasil milik konten 'result' yang diberikan (mis. satu percakapan yang di-reset)."""
+    for content in contents:
+        try:
+            os.remove(os.path.join(RESULT_STORE_DIR, content["ref"]))
+        except OSError:
+            pass
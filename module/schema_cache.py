@@ -0,0 +1,58 @@
+# ----------------------- schema_cache.py -----------------------
+import threading
+from module.config import DATABASE_PATH, INTERNAL_TABLES
+from module.connection_pool import get_pool
+
+# Cache schema di level proses (dibagi antar session Streamlit).
+# Hanya dibangun ulang ketika PRAGMA schema_version berubah.
+_cache = {}
+_lock = threading.Lock()
+
+
+def _read_schema(conn, version: int) -> dict:
+    cursor = conn.cursor()
+    # Tabel internal SQLite (sqlite_sequence, sqlite_stat1 setelah ANALYZE) dan tabel
+    # internal aplikasi (mis. ringkasan dashboard) tidak perlu diketahui LLM
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+    table_names = [row[0] for row in cursor.fetchall() if row[0] not in INTERNAL_TABLES]
+
+    tables = {}
+    lines = []
+    for table_name in table_names:
+        cursor.execute(f'PRAGMA table_info("{table_name}")')
+        columns = [
+            {"name": col[1], "type": col[2], "notnull": bool(col[3]), "pk": bool(col[5])}
+            for col in cursor.fetchall()
+        ]
+        cursor.execute(f'PRAGMA foreign_key_list("{table_name}")')
+        foreign_keys = [
+            {"column": fk[3], "ref_table": fk[2], "ref_column": fk[4]}
+            for fk in cursor.fetchall()
+        ]
+        tables[table_name] = {"columns": columns, "foreign_keys": foreign_keys}
+        lines.append(f"- {table_name}({', '.join([c['name'] for c in columns])})")
+
+    return {"version": version, "tables": tables, "description": "\n".join(lines)}
+
+
+def get_schema_info(db_path: str = DATABASE_PATH) -> dict:
+    """
+    Mengembalikan schema terstruktur:
+    {"version": int, "tables": {nama: {"columns": [...], "foreign_keys": [...]}}, "description": str}
+    """
+    with get_pool(db_path).connection() as conn:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        cached = _cache.get(db_path)
+        if cached is not None and cached["version"] == version:
+            return cached
+
+        with _lock:
+            cached = _cache.get(db_path)
+            if cached is None or cached["version"] != version:
+                cached = _read_schema(conn, version)
+                _cache[db_path] = cached
+            return cached
+
+
+def get_schema_version(db_path: str = DATABASE_PATH) -> int:
+    return get_schema_info(db_path)["version"]
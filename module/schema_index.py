@@ -0,0 +1,204 @@
+# ----------------------- schema_index.py -----------------------
+import math
+import re
+import threading
+from module.config import (
+    DATABASE_PATH, SCHEMA_PRUNE_TOP_K, SCHEMA_PRUNE_MIN_TABLES, SCHEMA_SAMPLE_ROWS, SCHEMA_SAMPLE_VALUES
+)
+from module.connection_pool import get_pool
+from module.schema_cache import get_schema_info
+
+# Pemangkasan schema untuk prompt SQL: hanya tabel yang relevan dengan pertanyaan.
+# Setiap tabel menjadi satu dokumen BM25 berisi nama tabel (bobot 3) dan nama kolom
+# (bobot 2). Contoh nilai teks (mis. nama kota / kategori) dinilai terpisah (idf),
+# agar tabel dengan banyak nilai tidak "memanjang" dan kalah di normalisasi BM25.
+# Kata Indonesia di pertanyaan diterjemahkan ke istilah schema lewat SYNONYMS.
+# Hasil: top-k tabel + tabel yang dirujuk foreign key-nya + tabel di SQL sebelumnya
+# (agar pertanyaan lanjutan tetap punya konteks). Index dibangun ulang hanya jika
+# PRAGMA schema_version berubah.
+
+SYNONYMS = {
+    "produk": ["product", "item"], "barang": ["product", "item"],
+    "pelanggan": ["customer"], "konsumen": ["customer"], "pembeli": ["customer"], "member": ["customer"],
+    "pesanan": ["order"], "transaksi": ["order"], "pembelian": ["order"],
+    "penjualan": ["order", "sale", "amount", "quantity"], "terjual": ["quantity", "item"],
+    "terlaris": ["quantity", "item"], "laris": ["quantity", "item"], "dibeli": ["quantity", "item"],
+    "pendapatan": ["amount", "revenue", "subtotal"], "omzet": ["amount", "revenue", "subtotal"],
+    "harga": ["price"], "mahal": ["price"], "murah": ["price"], "termahal": ["price"], "termurah": ["price"],
+    "stok": ["stock"], "kota": ["city"], "kategori": ["category"], "nama": ["name"],
+    "jumlah": ["quantity", "count"], "tanggal": ["date"], "tren": ["date"], "harian": ["date"],
+    "bulanan": ["date"], "bulan": ["date"], "tahun": ["date"], "bergabung": ["join"],
+    "alamat": ["address"], "pembayaran": ["payment"], "bayar": ["payment"], "pengiriman": ["shipping", "shipment"],
+    "kirim": ["shipping", "shipment"], "diskon": ["discount"], "ulasan": ["review"], "rating": ["review", "rating"],
+    "karyawan": ["employee"], "pegawai": ["employee"], "toko": ["store"], "cabang": ["store", "branch"],
+    "gudang": ["warehouse"], "pemasok": ["supplier"], "supplier": ["supplier"],
+}
+STOPWORDS = {
+    "yang", "dan", "di", "ke", "dari", "per", "untuk", "dengan", "pada", "apa", "berapa", "tampilkan",
+    "tunjukkan", "daftar", "semua", "seluruh", "paling", "masing", "setiap", "tiap", "the", "of", "by",
+    "in", "show", "list", "all", "top", "what", "how", "many", "much", "is", "are", "a", "an", "and",
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+VALUE_WEIGHT = 1.0        # Bobot kecocokan contoh nilai (dihitung terpisah dari BM25 nama)
+MIN_RELATIVE_SCORE = 0.1  # Tabel dengan skor < 10% skor tertinggi tidak ikut top-k
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_cache = {}
+_lock = threading.Lock()
+
+
+def _stem(token: str) -> str:
+    """Stemming minimal: akhiran -nya (Indonesia) dan jamak -s/-es (Inggris)."""
+    if token.endswith("nya") and len(token) > 5:
+        token = token[:-3]
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith("s") and not token.endswith("ss") and len(token) > 3:
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list:
+    """Token BM25: huruf kecil, dipisah di non-alfanumerik (termasuk '_'), di-stem."""
+    return [_stem(t) for t in _TOKEN.findall(text.lower().replace("_", " ")) if t not in STOPWORDS]
+
+
+def _query_terms(question: str) -> list:
+    terms = []
+    for token in tokenize(question):
+        terms.append(token)
+        terms.extend(SYNONYMS.get(token, ()))
+    return terms
+
+
+def _sample_values(conn, table: str, columns: list) -> list:
+    """Contoh nilai teks dari baris-baris awal (dibatasi agar tetap murah di tabel besar)."""
+    values = []
+    for col in columns:
+        if col["type"].upper() not in ("TEXT", "VARCHAR", "CHAR", "") or col["pk"]:
+            continue
+        try:
+            rows = conn.execute(
+                f'SELECT DISTINCT "{col["name"]}" FROM (SELECT "{col["name"]}" FROM "{table}" LIMIT ?) '
+                f'WHERE typeof("{col["name"]}") = \'text\' LIMIT ?',
+                (SCHEMA_SAMPLE_ROWS, SCHEMA_SAMPLE_VALUES),
+            ).fetchall()
+        except Exception:
+            continue
+        # Nilai panjang (deskripsi, email, dsb.) tidak membantu pencocokan
+        values.extend(r[0] for r in rows if r[0] and len(r[0]) <= 40)
+    return values
+
+
+class SchemaIndex:
+    """Index BM25 tabel untuk satu versi schema."""
+
+    def __init__(self, schema: dict, samples: dict):
+        # Tabel internal SQLite sudah disaring oleh schema_cache
+        self.tables = schema["tables"]
+        self.docs = {}
+        self.values = {}  # token nilai -> {tabel}
+        for name, info in self.tables.items():
+            terms = tokenize(name) * 3
+            for col in info["columns"]:
+                terms += tokenize(col["name"]) * 2
+            self.docs[name] = terms
+            for token in tokenize(" ".join(samples.get(name, []))):
+                self.values.setdefault(token, set()).add(name)
+
+        self.avg_len = sum(len(d) for d in self.docs.values()) / max(len(self.docs), 1)
+        doc_freq = {}
+        for terms in self.docs.values():
+            for term in set(terms):
+                doc_freq[term] = doc_freq.get(term, 0) + 1
+        n = len(self.docs)
+        self.idf = {t: math.log(1 + (n - df + 0.5) / (df + 0.5)) for t, df in doc_freq.items()}
+        self.term_freq = {name: {} for name in self.docs}
+        for name, terms in self.docs.items():
+            for term in terms:
+                self.term_freq[name][term] = self.term_freq[name].get(term, 0) + 1
+
+        # Tetangga FK satu arah (tabel yang dirujuk): arah sebaliknya membuat tabel
+        # pusat seperti orders menarik semua tabel yang merujuknya
+        self.neighbours = {
+            name: {fk["ref_table"] for fk in info["foreign_keys"] if fk["ref_table"] in self.tables}
+            for name, info in self.tables.items()
+        }
+
+    def score(self, question: str) -> dict:
+        """{tabel: skor} untuk tabel dengan skor > 0 (BM25 nama + bonus contoh nilai)."""
+        scores = {}
+        n = len(self.docs)
+        for term in _query_terms(question):
+            idf = self.idf.get(term)
+            if idf is not None:
+                for name, freqs in self.term_freq.items():
+                    tf = freqs.get(term)
+                    if not tf:
+                        continue
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * len(self.docs[name]) / self.avg_len)
+                    scores[name] = scores.get(name, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+            tables = self.values.get(term, ())
+            for name in tables:
+                scores[name] = scores.get(name, 0.0) + VALUE_WEIGHT * math.log(1 + n / len(tables))
+        return scores
+
+    def relevant_tables(self, question: str, context: str = "", top_k: int = SCHEMA_PRUNE_TOP_K) -> list:
+        """Top-k tabel + tabel yang dirujuk FK + tabel yang disebut di konteks (history). [] jika tidak ada yang cocok."""
+        scores = self.score(question)
+        best = max(scores.values(), default=0.0)
+        ranked = [t for t in sorted(scores, key=lambda t: -scores[t])[:top_k] if scores[t] >= best * MIN_RELATIVE_SCORE]
+        selected = set(ranked)
+        for name in ranked:
+            selected |= self.neighbours[name]
+        if context:
+            lowered = context.lower()
+            selected |= {name for name in self.tables if re.search(rf"\b{re.escape(name.lower())}\b", lowered)}
+        return [name for name in self.tables if name in selected]
+
+
+def get_schema_index(db_path: str = DATABASE_PATH) -> SchemaIndex:
+    """SchemaIndex untuk versi schema saat ini (di-cache per schema_version)."""
+    schema = get_schema_info(db_path)
+    cached = _cache.get(db_path)
+    if cached is not None and cached[0] == schema["version"]:
+        return cached[1]
+
+    with _lock:
+        cached = _cache.get(db_path)
+        if cached is None or cached[0] != schema["version"]:
+            with get_pool(db_path).connection() as conn:
+                samples = {name: _sample_values(conn, name, info["columns"]) for name, info in schema["tables"].items()}
+            cached = (schema["version"], SchemaIndex(schema, samples))
+            _cache[db_path] = cached
+        return cached[1]
+
+
+def prune_schema(schema_description: str, question: str, context: str = "", db_path: str = DATABASE_PATH):
+    """
+    Mengembalikan (deskripsi_schema, jumlah_tabel_dipakai, jumlah_tabel_total).
+    Baris "- tabel(kolom, ...)" untuk tabel yang tidak relevan dibuang; schema kecil
+    (<= SCHEMA_PRUNE_MIN_TABLES) atau pertanyaan tanpa kecocokan memakai schema penuh.
+    """
+    lines = schema_description.splitlines()
+    table_lines = {}
+    for i, line in enumerate(lines):
+        m = re.match(r"-\s*(\w+)\(", line.strip())
+        if m:
+            table_lines[m.group(1)] = i
+    total = len(table_lines)
+    if total <= SCHEMA_PRUNE_MIN_TABLES:
+        return schema_description, total, total
+
+    try:
+        keep = set(get_schema_index(db_path).relevant_tables(question, context))
+    except Exception as e:
+        print(f"Schema Index Error: {e}")
+        keep = set()
+    if not keep:
+        return schema_description, total, total
+
+    dropped = {i for name, i in table_lines.items() if name not in keep}
+    pruned = "\n".join(line for i, line in enumerate(lines) if i not in dropped)
+    return pruned, total - len(dropped), total
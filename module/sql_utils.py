@@ -1,8 +1,59 @@
 # ----------------------- sql_utils.py -----------------------
+import re
 import sqlite3
-from module.config import DATABASE_PATH
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from module.config import (
+    DATABASE_PATH, DB_POOL_SIZE, RESULT_PAGE_ROWS, RESULT_PAGE_MAX_BYTES, RESULT_FETCH_BATCH, RESULT_COUNT_BUDGET,
+    GUARD_ENABLED, QUERY_TIMEOUTS, QUERY_PROGRESS_STEPS, WORKLOAD_LOG_ENABLED
+)
+from module.connection_pool import get_pool, get_data_token
+from module.schema_cache import get_schema_info
+from module.result_cache import result_cache
+from module.query_guard import guard_query, plan_summary, original_column_names
+from module.workload_log import workload_log
+from module.telemetry import span, count
 
-def execute_sql_query(query: str):
+# Prefix pesan error hasil eksekusi (disimpan di history sebagai role "error")
+ERROR_PREFIXES = ("SQL Error", "Timeout Error", "Query Dibatalkan")
+
+# Thread pool eksekusi SQL, agar script Streamlit tetap bisa menampilkan tombol Batalkan
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="sql")
+
+
+def is_error_result(result) -> bool:
+    return isinstance(result, str) and result.startswith(ERROR_PREFIXES)
+
+
+def query_class(clean_query: str, offset: int = 0) -> str:
+    """Kelas query untuk budget waktu (lihat QUERY_TIMEOUTS)."""
+    if offset > 0:
+        return "page"
+    if re.search(r"\bgroup\s+by\b|\b(sum|count|avg|min|max|total)\s*\(", clean_query, re.IGNORECASE):
+        return "aggregate"
+    return "select"
+
+
+def _install_deadline(conn, timeout, cancel_event=None):
+    """
+    Progress handler dipanggil SQLite tiap QUERY_PROGRESS_STEPS instruksi VM;
+    mengembalikan 1 membuat statement berhenti dengan OperationalError "interrupted".
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+
+    def check():
+        if cancel_event is not None and cancel_event.is_set():
+            return 1
+        if deadline is not None and time.monotonic() > deadline:
+            return 1
+        return 0
+
+    conn.set_progress_handler(check, QUERY_PROGRESS_STEPS)
+
+
+def _sanitize_query(query: str):
+    """Mengembalikan (clean_query, pesan_error). pesan_error None jika query aman."""
 
     # --- 1. SANITASI QUERY (Fix "One statement at a time" Error) ---
     # Kadang LLM menghasilkan "SELECT ...; SELECT ...;"
@@ -26,41 +77,191 @@ def execute_sql_query(query: str):
     
     for keyword in forbidden_keywords:
         if keyword in query_upper:
-            return f"SQL Error: Perintah '{keyword}' tidak diizinkan demi keamanan data (Read-Only Mode).", []
+            return clean_query, f"SQL Error: Perintah '{keyword}' tidak diizinkan demi keamanan data (Read-Only Mode)."
     # --------------------------------
-    
+    return clean_query, None
+
+
+def _row_size(row) -> int:
+    # Perkiraan kasar ukuran satu baris (cukup untuk budget, bukan akuntansi presisi)
+    size = 16
+    for value in row:
+        if isinstance(value, (str, bytes)):
+            size += len(value) + 8
+        else:
+            size += 8
+    return size
+
+
+def _fetch_limited(cursor, max_rows: int, max_bytes: int):
+    """
+    Mengambil baris secara bertahap (fetchmany) sampai budget baris/byte habis.
+    Mengembalikan (rows, has_more).
+    """
+    rows = []
+    used_bytes = 0
+    while True:
+        batch = cursor.fetchmany(min(RESULT_FETCH_BATCH, max_rows + 1 - len(rows)))
+        if not batch:
+            return rows, False
+        for row in batch:
+            if len(rows) >= max_rows or (rows and used_bytes >= max_bytes):
+                return rows, True
+            rows.append(row)
+            used_bytes += _row_size(row)
+
+
+def _count_rows(conn, clean_query: str, budget: float = RESULT_COUNT_BUDGET):
+    """Total baris hasil query, atau None jika menghitungnya melebihi budget waktu."""
+    deadline = time.monotonic() + budget
+    conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 1000)
     try:
-        # Gunakan mode uri=True dan query parameter ?mode=ro (Read Only) untuk proteksi ganda (opsional)
-        # Tapi untuk SQLite standar, logic Python di atas sudah cukup kuat.
-        with sqlite3.connect(f"file:{DATABASE_PATH}?mode=ro", uri=True) as conn:
-            cursor = conn.cursor()
-            cursor.execute(query)
-
-            if query.strip().lower().startswith("select"):
-                rows = cursor.fetchall()
-                col_names = [description[0] for description in cursor.description]
-                return rows, col_names
+        return conn.execute(f"SELECT COUNT(*) FROM ({clean_query})").fetchone()[0]
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+def execute_sql_page(query: str, offset: int = 0, page_size: int = RESULT_PAGE_ROWS, use_cache: bool = True,
+                     timeout: float = None, cancel_event=None, question: str = None):
+    """
+    Menjalankan SELECT dan hanya mengambil satu halaman hasil (dibatasi baris & byte).
+    Mengembalikan (rows, columns, page_info) dengan page_info:
+      {"query", "offset", "next_offset", "truncated", "total_estimate"}
+    Halaman berikutnya diambil dengan offset=page_info["next_offset"];
+    LIMIT/OFFSET didorong ke SQL sehingga baris sebelumnya tidak ditarik ke Python.
+    Query dihentikan jika melewati timeout (default per kelas query, lihat QUERY_TIMEOUTS)
+    atau jika cancel_event (threading.Event) di-set.
+    Jika gagal: ("SQL Error: ...", [], {}), ("Timeout Error: ...", [], {}) atau ("Query Dibatalkan: ...", [], {}).
+    Setiap eksekusi dicatat di workload log bersama `question` (pertanyaan asal).
+    """
+    # Diisi _execute_sql_page: query setelah sanitasi/guard, plan, dan status cache
+    meta = {"query": query, "plan": None, "cached": False}
+    started = time.perf_counter()
+    with span("sql.execute", offset=offset) as current:
+        rows, col_names, page_info = _execute_sql_page(query, offset, page_size, use_cache, timeout, cancel_event, meta)
+        error = rows if is_error_result(rows) else None
+        if error:
+            current.set(error=error.split(":", 1)[0])
+        elif not isinstance(rows, str):
+            current.set(rows=len(rows), truncated=page_info.get("truncated", False))
+
+    if WORKLOAD_LOG_ENABLED:
+        workload_log.record(
+            meta["query"], (time.perf_counter() - started) * 1000,
+            rows=len(rows) if not isinstance(rows, str) else None, plan=meta["plan"], question=question,
+            error=error, offset=offset, cached=meta["cached"],
+        )
+    return rows, col_names, page_info
+
+
+def _execute_sql_page(query, offset, page_size, use_cache, timeout, cancel_event, meta):
+    clean_query, error = _sanitize_query(query)
+    if error:
+        return error, [], {}
+    meta["query"] = clean_query
+
+    is_select = clean_query.lower().startswith("select")
+    if timeout is None:
+        timeout = QUERY_TIMEOUTS[query_class(clean_query, offset)]
+    variant = f"page:{offset}:{page_size}"
+
+    try:
+        # Hasil SELECT yang identik dipakai ulang selama isi database belum berubah.
+        # Token diambil SEBELUM eksekusi agar hasil yang basi tidak ikut di-cache.
+        # Key cache = query SEBELUM guard (guard bisa menulis ulang query), untuk get & put.
+        cache_key = clean_query
+        if use_cache and is_select:
+            data_token = get_data_token(DATABASE_PATH)
+            cached = result_cache.get(cache_key, variant=variant)
+            count("cache", cache="result", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                meta["cached"] = True
+                return cached
+
+        # Koneksi read-only (?mode=ro + PRAGMA query_only) diambil dari pool,
+        # sehingga tidak perlu connect ulang di setiap query.
+        with get_pool(DATABASE_PATH).connection() as conn:
+            # Guard EXPLAIN QUERY PLAN hanya di halaman pertama; halaman berikutnya
+            # memakai page_info["query"] yang sudah lolos guard.
+            if GUARD_ENABLED and is_select and offset == 0:
+                with span("sql.guard"):
+                    clean_query, error = guard_query(conn, clean_query)
+                meta["query"] = clean_query
+                if error:
+                    return error, [], {}
+
+            if WORKLOAD_LOG_ENABLED and is_select and offset == 0:
+                meta["plan"] = plan_summary(conn, clean_query)
+
+            # Deadline berlaku untuk eksekusi DAN fetch (keduanya menjalankan VM SQLite)
+            _install_deadline(conn, timeout, cancel_event)
+            try:
+                cursor = conn.cursor()
+                if offset > 0:
+                    cursor.execute(f"SELECT * FROM ({clean_query}) LIMIT ? OFFSET ?", (page_size + 1, offset))
+                else:
+                    cursor.execute(clean_query)
+
+                if is_select:
+                    col_names = [description[0] for description in cursor.description]
+                    if offset > 0 or clean_query != cache_key:
+                        # Query dibungkus subquery (halaman lanjutan / guard): nama kolom duplikat
+                        # dari JOIN dikembalikan seperti hasil query aslinya
+                        col_names = original_column_names(col_names)
+                    rows, has_more = _fetch_limited(cursor, page_size, RESULT_PAGE_MAX_BYTES)
+                cursor.close()
+            finally:
+                conn.set_progress_handler(None, 0)
+
+            if is_select:
+                if has_more:
+                    total_estimate = _count_rows(conn, clean_query)
+                else:
+                    total_estimate = offset + len(rows)
+                page_info = {
+                    "query": clean_query,
+                    "offset": offset,
+                    "next_offset": offset + len(rows) if has_more else None,
+                    "truncated": has_more,
+                    "total_estimate": total_estimate,
+                }
+                if use_cache:
+                    result_cache.put(cache_key, rows, col_names, token=data_token, variant=variant, meta=page_info)
+                return rows, col_names, page_info
             else:
                 # Seharusnya tidak akan sampai sini karena filter di atas, tapi untuk jaga-jaga:
-                return "SQL executed (No data returned)", []
+                return "SQL executed (No data returned)", [], {}
                 
+    except sqlite3.OperationalError as e:
+        if str(e) != "interrupted":
+            return f"SQL Error: {str(e)}", [], {}
+        if cancel_event is not None and cancel_event.is_set():
+            return "Query Dibatalkan: Eksekusi query dihentikan oleh pengguna.", [], {}
+        return f"Timeout Error: Query melebihi batas waktu {timeout:g} detik dan dihentikan.", [], {}
     except sqlite3.Error as e:
-        return f"SQL Error: {str(e)}", []
+        return f"SQL Error: {str(e)}", [], {}
+
+
+def submit_sql_page(query: str, offset: int = 0, page_size: int = RESULT_PAGE_ROWS, cancel_event=None,
+                    question: str = None):
+    """Jalankan execute_sql_page di thread pool; mengembalikan Future."""
+    # copy_context: span di thread pool tetap tercatat pada trace pertanyaan yang sama
+    return _executor.submit(contextvars.copy_context().run, execute_sql_page, query, offset, page_size,
+                            cancel_event=cancel_event, question=question)
+
+
+def execute_sql_query(query: str, use_cache: bool = True, question: str = None):
+    """Menjalankan query dan mengembalikan (rows, columns) halaman pertama (dibatasi RESULT_PAGE_ROWS)."""
+    rows, col_names, _ = execute_sql_page(query, use_cache=use_cache, question=question)
+    return rows, col_names
 
 
 def get_current_schema():
-    # Untuk mengambil schema, kita tetap butuh koneksi standar
+    # Schema diambil dari cache (lihat schema_cache.py), hanya dibaca ulang
+    # dari sqlite_master jika PRAGMA schema_version berubah.
     try:
-        with sqlite3.connect(DATABASE_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = cursor.fetchall()
-            schema = ""
-            for table in tables:
-                table_name = table[0]
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                cols = cursor.fetchall()
-                schema += f"- {table_name}({', '.join([col[1] for col in cols])})\n"
-            return schema.strip()
+        return get_schema_info()["description"]
     except Exception:
         return "Schema not found."
\ No newline at end of file
@@ -0,0 +1,239 @@
+# ----------------------- telemetry.py -----------------------
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from module.config import (
+    TELEMETRY_ENABLED, TELEMETRY_EXPORTERS, TELEMETRY_JSONL_PATH, TELEMETRY_JSONL_MAX_BYTES,
+    TELEMETRY_JSONL_BACKUPS, TELEMETRY_PROMETHEUS_PORT
+)
+
+# Span waktu per tahap pipeline (LLM, SQLite, pandas, Plotly, history).
+#   with span("sql.execute") as s:
+#       ...
+#       s.set(rows=len(rows), cache="miss")
+# Setiap span selesai -> satu baris JSONL (file berotasi, ditulis thread latar)
+# dan/atau agregat Prometheus di http://127.0.0.1:<port>/metrics.
+# Jika TELEMETRY_ENABLED = False, span() mengembalikan objek no-op yang sama
+# (cukup satu pengecekan boolean per pemanggilan).
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNTED_ATTRS = ("rows", "prompt_tokens", "completion_tokens")
+
+_trace_id = contextvars.ContextVar("telemetry_trace", default=None)
+_current_span = contextvars.ContextVar("telemetry_span", default=None)
+_lock = threading.Lock()
+_histograms = {}   # span -> [bucket_counts..., +Inf count, sum]
+_counters = {}     # (metric, frozenset(labels)) -> value
+_exporter = {"logger": None, "listener": None, "server": None}
+
+
+class _NoopSpan:
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "_token")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key: str, value):
+        self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            self.attrs.setdefault("error", exc_type.__name__)
+        _record(self.name, duration, self.attrs)
+        return False
+
+
+def span(name: str, **attrs):
+    """Context manager pengukur durasi satu tahap; no-op jika telemetry mati."""
+    if not TELEMETRY_ENABLED:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def start_trace() -> str:
+    """Mulai trace baru (satu per pertanyaan) agar span-span dapat dikelompokkan."""
+    if not TELEMETRY_ENABLED:
+        return ""
+    trace = uuid.uuid4().hex[:16]
+    _trace_id.set(trace)
+    return trace
+
+
+def record_span(name: str, duration: float, **attrs):
+    """Catat span yang diukur manual (mis. stream yang berjalan lintas yield)."""
+    if TELEMETRY_ENABLED:
+        _record(name, duration, attrs)
+
+
+def count(metric: str, value: float = 1, **labels):
+    """Counter bebas, mis. count("cache", cache="question", result="hit")."""
+    if not TELEMETRY_ENABLED:
+        return
+    key = (metric, frozenset(labels.items()))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def current_span():
+    return _current_span.get() if TELEMETRY_ENABLED else None
+
+
+def _record(name: str, duration: float, attrs: dict):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = [0] * (len(DURATION_BUCKETS) + 2)
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                hist[i] += 1
+        hist[-2] += 1
+        hist[-1] += duration
+        for attr in COUNTED_ATTRS:
+            if isinstance(attrs.get(attr), (int, float)):
+                key = (attr, frozenset({("span", name)}))
+                _counters[key] = _counters.get(key, 0) + attrs[attr]
+        if "error" in attrs:
+            key = ("errors", frozenset({("span", name)}))
+            _counters[key] = _counters.get(key, 0) + 1
+
+    logger = _exporter["logger"]
+    if logger is not None:
+        record = {"ts": round(time.time(), 3), "trace": _trace_id.get(), "span": name,
+                  "duration_ms": round(duration * 1000, 3)}
+        record.update(attrs)
+        logger.info(json.dumps(record, default=str))
+
+
+# --- Exporter ---
+
+def render_prometheus() -> str:
+    """Agregat dalam format teks Prometheus."""
+    lines = [
+        "# HELP nl2sql_span_duration_seconds Durasi tahap pipeline",
+        "# TYPE nl2sql_span_duration_seconds histogram",
+    ]
+    with _lock:
+        histograms = {k: list(v) for k, v in _histograms.items()}
+        counters = dict(_counters)
+    for name, hist in sorted(histograms.items()):
+        for bound, value in zip(DURATION_BUCKETS, hist):
+            lines.append(f'nl2sql_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {value}')
+        lines.append(f'nl2sql_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {hist[-2]}')
+        lines.append(f'nl2sql_span_duration_seconds_count{{span="{name}"}} {hist[-2]}')
+        lines.append(f'nl2sql_span_duration_seconds_sum{{span="{name}"}} {hist[-1]:.6f}')
+    for metric in sorted({m for m, _ in counters}):
+        lines.append(f"# TYPE nl2sql_{metric}_total counter")
+        for (m, labels), value in sorted(counters.items(), key=lambda kv: sorted(kv[0][1])):
+            if m != metric:
+                continue
+            label_txt = ",".join(f'{k}="{v}"' for k, v in sorted(labels))
+            lines.append(f"nl2sql_{metric}_total{{{label_txt}}} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_exporters():
+    """Dipanggil sekali saat import: file JSONL via thread latar & endpoint /metrics."""
+    if "jsonl" in TELEMETRY_EXPORTERS:
+        os.makedirs(os.path.dirname(TELEMETRY_JSONL_PATH) or ".", exist_ok=True)
+        handler = RotatingFileHandler(
+            TELEMETRY_JSONL_PATH, maxBytes=TELEMETRY_JSONL_MAX_BYTES, backupCount=TELEMETRY_JSONL_BACKUPS,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        records = queue.SimpleQueue()
+        listener = QueueListener(records, handler)
+        listener.start()
+        logger = logging.getLogger("nl2sql.telemetry")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(QueueHandler(records))
+        _exporter.update(logger=logger, listener=listener)
+
+    if "prometheus" in TELEMETRY_EXPORTERS and TELEMETRY_PROMETHEUS_PORT:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", TELEMETRY_PROMETHEUS_PORT), _MetricsHandler)
+        except OSError as e:
+            # Proses lain (mis. session Streamlit kedua) sudah memakai port ini
+            print(f"Telemetry: endpoint /metrics tidak dijalankan ({e})")
+        else:
+            threading.Thread(target=server.serve_forever, name="telemetry-metrics", daemon=True).start()
+            _exporter["server"] = server
+
+
+def llm_callbacks() -> list:
+    """Callback LangChain pencatat token prompt/completion ke span yang sedang aktif."""
+    if not TELEMETRY_ENABLED:
+        return []
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenUsageCallback(BaseCallbackHandler):
+        def on_llm_end(self, response, **kwargs):
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt, completion = usage.get("prompt_tokens"), usage.get("completion_tokens")
+            if prompt is None:
+                for generations in response.generations:
+                    for gen in generations:
+                        meta = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                        prompt = (prompt or 0) + meta.get("input_tokens", 0)
+                        completion = (completion or 0) + meta.get("output_tokens", 0)
+            current = _current_span.get()
+            if current is not None:
+                current.add("prompt_tokens", prompt or 0)
+                current.add("completion_tokens", completion or 0)
+            else:
+                count("prompt_tokens", prompt or 0, span="unattributed")
+                count("completion_tokens", completion or 0, span="unattributed")
+
+    return [TokenUsageCallback()]
+
+
+if TELEMETRY_ENABLED:
+    _start_exporters()
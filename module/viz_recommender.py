@@ -0,0 +1,170 @@
+# ----------------------- viz_recommender.py -----------------------
+import re
+import pandas as pd
+
+# Rekomendasi grafik berbasis aturan (tanpa LLM), dengan kontrak yang sama seperti
+# get_visualization_recommendation: {"chart_type", "x_column", "y_column"}.
+# Mengembalikan None jika kasusnya ambigu -> boleh diserahkan ke LLM.
+
+DATE_NAME_PATTERN = re.compile(
+    r"(date|tanggal|tgl|bulan|month|tahun|year|periode|period|week|minggu|hari|day|waktu|time)", re.I
+)
+# Kolom numerik hanya dianggap waktu jika namanya persis nama waktu (mis. tahun = 2024),
+# agar ukuran seperti penjualan_harian / total_bulanan tetap diperlakukan sebagai angka
+DATE_EXACT_NAME_PATTERN = re.compile(
+    r"^(date|tanggal|tgl|bulan|month|tahun|year|periode|period|week|minggu|hari|day|waktu|time)$|_date$|^tgl_", re.I
+)
+DATE_VALUE_PATTERN = r"^\d{4}-\d{2}(-\d{2})?([ T]\d{2}:\d{2}(:\d{2})?)?$"
+ID_NAME_PATTERN = re.compile(r"(^id$|_id$|^id_)", re.I)
+CATEGORY_NAME_HINTS = re.compile(r"(name|nama|city|kota|category|kategori|produk|product|customer|pelanggan)", re.I)
+MEASURE_NAME_HINTS = re.compile(
+    r"(total|revenue|pendapatan|penjualan|sales|amount|jumlah|qty|quantity|count|sum|subtotal|stok|stock|price|harga)",
+    re.I,
+)
+COMPOSITION_WORDS = {
+    "proporsi", "persentase", "komposisi", "distribusi", "porsi", "pangsa", "kontribusi",
+    "share", "percentage", "proportion", "composition", "breakdown",
+}
+TREND_WORDS = {"tren", "trend", "harian", "bulanan", "tahunan", "daily", "monthly", "yearly", "waktu", "perkembangan"}
+
+PIE_MAX_CATEGORIES = 8
+
+# Sinonim Indonesia -> potongan nama kolom, agar kolom angka yang disebut di pertanyaan diprioritaskan
+QUERY_COLUMN_SYNONYMS = {
+    "stok": "stock", "harga": "price", "jumlah": "quantity", "pendapatan": "total",
+    "penjualan": "total", "omzet": "total", "subtotal": "subtotal",
+}
+
+
+def _is_date_like(series: pd.Series) -> bool:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    if pd.api.types.is_numeric_dtype(series):
+        return not pd.api.types.is_float_dtype(series) and bool(DATE_EXACT_NAME_PATTERN.search(str(series.name)))
+    if DATE_NAME_PATTERN.search(str(series.name)):
+        return True
+    if series.dtype == object or pd.api.types.is_string_dtype(series):
+        sample = series.dropna().head(50).astype(str)
+        return len(sample) > 0 and bool(sample.str.match(DATE_VALUE_PATTERN).all())
+    return False
+
+
+def _pick(columns, hint_pattern):
+    """Pilih kolom yang namanya cocok dengan hint; jika tidak ada, kolom pertama."""
+    for col in columns:
+        if hint_pattern.search(str(col)):
+            return col
+    return columns[0]
+
+
+def pick_measure(measure_cols, words):
+    """Kolom angka yang disebut di pertanyaan lebih dulu, lalu yang namanya seperti ukuran (total, jumlah, ...)."""
+    wanted = words | {QUERY_COLUMN_SYNONYMS[w] for w in words if w in QUERY_COLUMN_SYNONYMS}
+    for col in measure_cols:
+        if wanted & set(str(col).lower().split("_")):
+            return col
+    return _pick(measure_cols, MEASURE_NAME_HINTS)
+
+
+def question_words(user_query: str) -> set:
+    return set(re.findall(r"\w+", user_query.lower()))
+
+
+def classify_columns(df: pd.DataFrame) -> dict:
+    """
+    Membagi kolom menjadi numeric, date (sumbu waktu), measure (angka non-ID) dan category.
+    Nama kolom duplikat (SELECT * atas JOIN, mis. customer_id dua kali) tidak bisa dipakai
+    sebagai sumbu grafik sehingga tidak ikut diklasifikasikan.
+    """
+    duplicated = df.columns.duplicated(keep=False)
+    numeric_cols, date_cols, category_cols = [], [], []
+    for i, col in enumerate(df.columns):
+        if duplicated[i]:
+            continue
+        series = df.iloc[:, i]
+        is_numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        is_date = _is_date_like(series)
+        if is_numeric:
+            numeric_cols.append(col)
+        if is_date:
+            date_cols.append(col)
+        if not is_numeric and not is_date:
+            category_cols.append(col)
+    return {
+        "numeric": numeric_cols,
+        "date": date_cols,
+        "measure": [c for c in numeric_cols if c not in date_cols and not ID_NAME_PATTERN.search(str(c))],
+        "category": category_cols,
+    }
+
+
+def recommend_visualization(user_query: str, df: pd.DataFrame):
+    if len(df) < 2 or len(df.columns) > 5:
+        return {"chart_type": "none"}
+
+    words = question_words(user_query)
+    kinds = classify_columns(df)
+    numeric_cols, date_cols = kinds["numeric"], kinds["date"]
+    measure_cols, category_cols = kinds["measure"], kinds["category"]
+
+    if not measure_cols:
+        # Tidak ada angka yang bisa diplot (mis. daftar nama saja)
+        return {"chart_type": "none"} if not numeric_cols else None
+
+    y_col = pick_measure(measure_cols, words)
+
+    # 1. Sumbu waktu -> line
+    if date_cols:
+        return {"chart_type": "line", "x_column": date_cols[0], "y_column": y_col}
+
+    # 2. Kategori + angka -> bar / pie
+    if category_cols:
+        named = [c for c in category_cols if CATEGORY_NAME_HINTS.search(str(c))]
+        if len(category_cols) > 1 and not named:
+            return None
+        x_col = named[0] if named else category_cols[0]
+        n_unique = df[x_col].nunique(dropna=True)
+        if n_unique < 2:
+            return {"chart_type": "none"}
+
+        wants_share = bool(words & COMPOSITION_WORDS)
+        if wants_share and n_unique <= PIE_MAX_CATEGORIES and (df[y_col].dropna() >= 0).all():
+            return {"chart_type": "pie", "x_column": x_col, "y_column": y_col}
+        return {"chart_type": "bar", "x_column": x_col, "y_column": y_col}
+
+    # 3. Hanya kolom angka: ambigu kecuali user minta tren (pakai kolom pertama sebagai sumbu x)
+    if words & TREND_WORDS and len(numeric_cols) >= 2:
+        x_col = numeric_cols[0]
+        others = [c for c in measure_cols if c != x_col]
+        if others:
+            return {"chart_type": "line", "x_column": x_col, "y_column": pick_measure(others, words)}
+    return None
+
+
+def validate_visualization(viz_spec, df: pd.DataFrame):
+    """
+    Validasi rencana grafik dari LLM (mode combined) terhadap kolom hasil yang sebenarnya.
+    Mengembalikan config dengan nama kolom asli, {"chart_type": "none"}, atau None jika
+    rencana tidak cocok dengan data (kolom tidak ada, Y bukan angka, dsb.).
+    """
+    if not isinstance(viz_spec, dict):
+        return None
+    chart_type = str(viz_spec.get("chart_type") or "").lower()
+    if chart_type == "none" or len(df) < 2 or len(df.columns) > 5:
+        return {"chart_type": "none"}
+    if chart_type not in ("bar", "line", "pie"):
+        return None
+
+    columns = {str(c).lower(): c for c in df.columns[~df.columns.duplicated(keep=False)]}
+    x_col = columns.get(str(viz_spec.get("x_column") or "").lower())
+    y_col = columns.get(str(viz_spec.get("y_column") or "").lower())
+    if x_col is None or y_col is None or x_col == y_col:
+        return None
+    kinds = classify_columns(df)
+    if y_col not in kinds["measure"]:
+        return None
+    if chart_type == "line" and x_col not in kinds["date"] and x_col not in kinds["numeric"]:
+        return None
+    if chart_type == "pie" and df[x_col].nunique() > PIE_MAX_CATEGORIES:
+        return None
+    return {"chart_type": chart_type, "x_column": x_col, "y_column": y_col}
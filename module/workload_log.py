@@ -0,0 +1,233 @@
+# ----------------------- workload_log.py -----------------------
+"""
+Log workload SQL yang dijalankan aplikasi.
+
+- generated_sql : teks query (setelah guard) -> jumlah eksekusi, dibaca index_advisor.
+- executions    : satu baris per eksekusi (fingerprint, durasi, baris, ringkasan plan,
+                  pertanyaan asal, error) untuk laporan slow query.
+
+Laporan per fingerprint (query yang sama dengan literal berbeda digabung):
+    python -m module.workload_log                  # 10 teratas per total waktu & p95
+    python -m module.workload_log --days 7 --top 20
+"""
+import argparse
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+from module.config import WORKLOAD_LOG_PATH, WORKLOAD_LOG_MAX_EXECUTIONS
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w.\"])\d+(?:\.\d+)?(?:e[+-]?\d+)?\b", re.IGNORECASE)
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PRUNE_EVERY = 1000
+
+
+def fingerprint(sql: str) -> str:
+    """Bentuk query tanpa literal: string/angka -> ?, daftar IN (?, ?, ...) -> (?+), spasi & huruf dinormalkan."""
+    text = _COMMENTS.sub(" ", sql)
+    text = _STRINGS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _IN_LIST.sub("(?+)", text)
+    return " ".join(text.lower().split()).rstrip(";").strip()
+
+
+class WorkloadLog:
+    """Log persisten (SQLite WAL) query yang dijalankan beserta statistik tiap eksekusi."""
+
+    def __init__(self, path: str = WORKLOAD_LOG_PATH, max_executions: int = WORKLOAD_LOG_MAX_EXECUTIONS):
+        self.path = path
+        self.max_executions = max_executions
+        self._lock = threading.Lock()
+        self._conn = None
+        self._inserts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS generated_sql (
+                    sql TEXT PRIMARY KEY,
+                    runs INTEGER NOT NULL DEFAULT 0,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS executions (
+                    id INTEGER PRIMARY KEY,
+                    ts REAL NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    question TEXT,
+                    duration_ms REAL NOT NULL,
+                    rows INTEGER,
+                    plan TEXT,
+                    error TEXT,
+                    page_offset INTEGER NOT NULL DEFAULT 0,
+                    cached INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_executions_ts ON executions (ts)")
+            self._conn = conn
+        return self._conn
+
+    def record(self, sql: str, duration_ms: float, rows: int = None, plan: str = None, question: str = None,
+               error: str = None, offset: int = 0, cached: bool = False):
+        """
+        Catat satu eksekusi. Query yang benar-benar sampai ke SQLite (plan terisi,
+        halaman pertama) juga dihitung di generated_sql untuk index advisor.
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("BEGIN")
+                try:
+                    conn.execute(
+                        "INSERT INTO executions (ts, fingerprint, sql, question, duration_ms, rows, plan, error, "
+                        "page_offset, cached) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (now, fingerprint(sql), sql, question, duration_ms, rows, plan, error, offset, int(cached)),
+                    )
+                    if plan is not None and offset == 0 and not cached:
+                        conn.execute(
+                            "INSERT INTO generated_sql (sql, runs, first_seen, last_seen) VALUES (?, 1, ?, ?) "
+                            "ON CONFLICT(sql) DO UPDATE SET runs = runs + 1, last_seen = excluded.last_seen",
+                            (sql, now, now),
+                        )
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+                self._inserts += 1
+                if self._inserts % _PRUNE_EVERY == 0:
+                    self._prune(conn)
+        except sqlite3.Error as e:
+            print(f"Workload log error: {e}")
+
+    def _prune(self, conn):
+        """Batasi ukuran log: hanya max_executions eksekusi terbaru yang disimpan."""
+        conn.execute(
+            "DELETE FROM executions WHERE id <= (SELECT MAX(id) FROM executions) - ?", (self.max_executions,)
+        )
+
+    def top_queries(self, limit: int = 200):
+        """[(sql, runs)] diurutkan dari yang paling sering dijalankan."""
+        try:
+            with self._lock:
+                return self._connect().execute(
+                    "SELECT sql, runs FROM generated_sql ORDER BY runs DESC, last_seen DESC LIMIT ?", (limit,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Workload log error: {e}")
+            return []
+
+    def executions(self, since: float = 0.0):
+        """[(fingerprint, sql, question, duration_ms, rows, plan, error, cached)] sejak timestamp `since`."""
+        try:
+            with self._lock:
+                return self._connect().execute(
+                    "SELECT fingerprint, sql, question, duration_ms, rows, plan, error, cached "
+                    "FROM executions WHERE ts >= ? ORDER BY id", (since,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Workload log error: {e}")
+            return []
+
+    def clear(self):
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM generated_sql")
+                conn.execute("DELETE FROM executions")
+        except sqlite3.Error as e:
+            print(f"Workload log error: {e}")
+
+
+# Satu instance dibagi oleh semua session Streamlit
+workload_log = WorkloadLog()
+
+
+# --- Laporan slow query per fingerprint ---
+
+def fingerprint_report(executions, max_questions: int = 3) -> list:
+    """
+    Agregasi per fingerprint. Durasi hanya dari eksekusi SQLite (bukan cache hit).
+    Mengembalikan list dict: fingerprint, runs, cache_hits, errors, total_ms, mean_ms,
+    p50_ms, p95_ms, max_ms, mean_rows, sample_sql, plan, questions [(pertanyaan, jumlah)].
+    """
+    groups = {}
+    for fp, sql, question, duration_ms, rows, plan, error, cached in executions:
+        g = groups.setdefault(fp, {"durations": [], "rows": [], "cache_hits": 0, "errors": 0,
+                                   "questions": {}, "sample_sql": sql, "plan": None})
+        if question:
+            g["questions"][question] = g["questions"].get(question, 0) + 1
+        if cached:
+            g["cache_hits"] += 1
+            continue
+        g["durations"].append(duration_ms)
+        if error:
+            g["errors"] += 1
+        elif rows is not None:
+            g["rows"].append(rows)
+        if plan:
+            g["plan"], g["sample_sql"] = plan, sql
+
+    report = []
+    for fp, g in groups.items():
+        if not g["durations"]:
+            continue
+        durations = np.asarray(g["durations"], dtype=float)
+        report.append({
+            "fingerprint": fp,
+            "runs": len(durations),
+            "cache_hits": g["cache_hits"],
+            "errors": g["errors"],
+            "total_ms": float(durations.sum()),
+            "mean_ms": float(durations.mean()),
+            "p50_ms": float(np.percentile(durations, 50)),
+            "p95_ms": float(np.percentile(durations, 95)),
+            "max_ms": float(durations.max()),
+            "mean_rows": float(np.mean(g["rows"])) if g["rows"] else None,
+            "sample_sql": g["sample_sql"],
+            "plan": g["plan"],
+            "questions": sorted(g["questions"].items(), key=lambda kv: -kv[1])[:max_questions],
+        })
+    return report
+
+
+def print_report(report: list, top: int = 10):
+    if not report:
+        print("ℹ️ Workload log belum berisi eksekusi.")
+        return
+    for title, key in (("Total waktu", "total_ms"), ("p95", "p95_ms")):
+        print(f"\n=== {top} fingerprint teratas per {title} ===")
+        for i, r in enumerate(sorted(report, key=lambda r: r[key], reverse=True)[:top], 1):
+            rows_txt = f"{r['mean_rows']:.0f}" if r["mean_rows"] is not None else "-"
+            print(f"\n{i}. {r['fingerprint'][:160]}")
+            print(f"   {r['runs']}x (cache hit {r['cache_hits']}, error {r['errors']}) | total {r['total_ms']:.1f} ms"
+                  f" | p50 {r['p50_ms']:.1f} | p95 {r['p95_ms']:.1f} | max {r['max_ms']:.1f} ms | rata-rata baris {rows_txt}")
+            if r["plan"]:
+                print(f"   plan: {r['plan'][:160]}")
+            for question, n in r["questions"]:
+                print(f"   ? ({n}x) {question[:120]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laporan slow query per fingerprint dari workload log")
+    parser.add_argument("--days", type=float, default=0, help="Hanya eksekusi N hari terakhir (0 = semua)")
+    parser.add_argument("--top", type=int, default=10, help="Jumlah fingerprint per peringkat")
+    parser.add_argument("--questions", type=int, default=3, help="Pertanyaan asal yang ditampilkan per fingerprint")
+    args = parser.parse_args()
+
+    since = time.time() - args.days * 86400 if args.days > 0 else 0.0
+    report = fingerprint_report(workload_log.executions(since), max_questions=args.questions)
+    print_report(report, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,25 @@
+import time
+import threading
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from dotenv import load_dotenv
 
 # Import module
-from module.query_engine import get_sql_query, generate_data_insight, get_visualization_recommendation
-from module.sql_utils import execute_sql_query, get_current_schema
+from module.config import LLM_STAGE_TIMEOUT, HISTORY_WINDOW_TURNS, INTENT_FAST_PATH, QUERY_POLL_INTERVAL, SQL_MODE
+from module.query_engine import (
+    get_sql_query, get_sql_and_visualization, forget_sql_query, stream_data_insight,
+    submit_visualization_recommendation, resolve_visualization, visualization_from_plan
+)
+from module.sql_utils import execute_sql_page, submit_sql_page, is_error_result, get_current_schema
 from module.download_utils import download_button
-from module.history_utils import load_history_from_disk, save_history_to_disk, clear_all_history
+from module.dashboard_utils import get_dashboard_metrics
+from module.intent_registry import match_intent
+from module.telemetry import span, start_trace, record_span
+from module.history_utils import load_history_from_disk, save_history_to_disk, clear_all_history, load_older_history
+from module.result_store import make_result_entry
+from module.render_utils import (
+    result_to_dataframe, result_content_to_dataframe, build_chart, cached_render, store_render,
+    render_user, render_sql, render_error, render_result, render_insight, render_chart
+)
 load_dotenv()
 
 # --- Page Config ---
@@ -213,6 +224,12 @@ st.markdown("""
 
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+# Info paginasi hasil query per ID pesan: {msg_id: {"query", "next_offset", "extra_rows", ...}}
+if "result_pages" not in st.session_state:
+    st.session_state.result_pages = {}
+# Jumlah giliran terakhir yang dirender (bertambah saat "Muat percakapan sebelumnya")
+if "visible_turns" not in st.session_state:
+    st.session_state.visible_turns = HISTORY_WINDOW_TURNS
 
 # --- Helper Functions ---
 def format_chat_history(history):
@@ -225,19 +242,93 @@ def format_chat_history(history):
             formatted_history += f"Assistant (SQL): {content}\n"
     return formatted_history
 
+def message_id(idx):
+    """
+    ID stabil pesan history: posisi global (offset pesan lama yang belum dimuat + index lokal)
+    dalam satu 'generasi' history (berganti saat Reset).
+    """
+    return f"{st.session_state.chat_history_id}:{st.session_state.chat_history_offset + idx}"
+
+def group_turns(history):
+    """
+    Mengelompokkan history menjadi giliran: satu 'user' + pesan jawabannya
+    (sql, result, insight, viz). Mengembalikan list index awal tiap giliran.
+    """
+    starts = [idx for idx, (role, _) in enumerate(history) if role == "user"]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return starts
+
+def show_older_turns():
+    """Callback 'Muat percakapan sebelumnya': perlebar jendela, ambil dari disk jika perlu."""
+    st.session_state.visible_turns += HISTORY_WINDOW_TURNS
+    turns_in_memory = len(group_turns(st.session_state.chat_history))
+    if turns_in_memory < st.session_state.visible_turns:
+        load_older_history("sql")
+
+def load_more_rows(msg_id):
+    """Callback tombol 'Muat lebih banyak': ambil halaman berikutnya untuk hasil msg_id."""
+    page = st.session_state.result_pages.get(msg_id)
+    if not page or page.get("next_offset") is None:
+        return
+    rows, _, page_info = execute_sql_page(page["query"], offset=page["next_offset"])
+    if isinstance(rows, str):
+        st.toast(rows)
+        return
+    page["extra_rows"] = page.get("extra_rows", []) + rows
+    page["next_offset"] = page_info["next_offset"]
+
+def cancel_running_query():
+    """Callback tombol 'Batalkan': query sudah dihentikan saat run sebelumnya terputus, tinggal dicatat."""
+    event = st.session_state.pop("query_cancel_event", None)
+    if event is not None:
+        event.set()
+    if st.session_state.chat_history and st.session_state.chat_history[-1][0] == "assistant_sql":
+        st.session_state.chat_history.append(("error", "Query Dibatalkan: Eksekusi query dihentikan oleh pengguna."))
+        save_history_to_disk("sql")
+
+def run_query_with_cancel(sql_query, question=None):
+    """
+    Eksekusi SQL di thread terpisah sementara script menampilkan tombol Batalkan.
+    Interaksi apa pun (termasuk klik Batalkan) menghentikan run ini; blok finally
+    lalu men-set cancel_event sehingga progress handler SQLite memutus statement.
+    """
+    cancel_event = threading.Event()
+    st.session_state.query_cancel_event = cancel_event
+    future = submit_sql_page(sql_query, cancel_event=cancel_event, question=question)
+    cancel_area = st.empty()
+    cancel_area.button("⏹️ Batalkan query", key="cancel_query", on_click=cancel_running_query)
+    status = st.empty()
+    started = time.monotonic()
+    try:
+        with st.spinner("⚙️ Menjalankan query..."):
+            while not future.done():
+                time.sleep(QUERY_POLL_INTERVAL)
+                # Panggilan st.* memberi Streamlit kesempatan memproses klik tombol
+                status.caption(f"⏱️ {time.monotonic() - started:.1f} detik")
+        cancel_area.empty()
+        status.empty()
+        return future.result()
+    finally:
+        cancel_event.set()
+        st.session_state.pop("query_cancel_event", None)
+
+def render_result_pager(msg_id, shown_rows):
+    """Keterangan jumlah baris + tombol paginasi untuk hasil yang dipotong."""
+    page = st.session_state.result_pages.get(msg_id)
+    if not page or not page.get("truncated"):
+        return
+    total = page.get("total_estimate")
+    total_txt = f"{total:,}" if total is not None else "lebih banyak"
+    st.caption(f"Menampilkan {shown_rows:,} dari {total_txt} baris.")
+    if page.get("next_offset") is not None:
+        st.button("⬇️ Muat lebih banyak", key=f"more_rows_{msg_id}", on_click=load_more_rows, args=(msg_id,))
+
 def get_database_summary():
-    """Mengambil statistik cepat untuk Dashboard awal"""
+    """Mengambil statistik cepat untuk Dashboard awal (satu query, di-cache per data_version)"""
     try:
-        res_prod, _ = execute_sql_query("SELECT COUNT(*) FROM products")
-        res_cust, _ = execute_sql_query("SELECT COUNT(*) FROM customers")
-        res_rev, _ = execute_sql_query("SELECT SUM(total_amount) FROM orders")
-        
-        total_products = res_prod[0][0] if res_prod else 0
-        total_customers = res_cust[0][0] if res_cust else 0
-        total_revenue = res_rev[0][0] if res_rev else 0
-        
-        return total_products, total_customers, total_revenue
-    except:
+        return get_dashboard_metrics()
+    except Exception:
         return 0, 0, 0
 
 # --- Sidebar ---
@@ -254,6 +345,7 @@ with st.sidebar:
     st.caption("Powered by Llama 3 & Groq")
     if st.button("🗑️ Reset Conversation"):
         clear_all_history() # Hapus file fisik & memori
+        st.session_state.visible_turns = HISTORY_WINDOW_TURNS
         st.rerun()
 
 # --- MAIN LOGIC ---
@@ -266,43 +358,46 @@ with col_title2:
     st.title("AI Data Analyst SQL Assistant")
 
 # 2. LOGIKA TAMPILAN AWAL (LANDING PAGE)
+# Dibungkus placeholder agar bisa dikosongkan saat pertanyaan pertama mulai diproses
+landing_area = st.empty()
 if len(st.session_state.chat_history) == 0:
-    st.markdown('<p class="welcome-text">Selamat datang! Saya adalah asisten pintar yang terhubung langsung ke database penjualan Anda. <strong>Pilih menu cepat di bawah atau ketik pertanyaan Anda.</strong></p>', unsafe_allow_html=True)
-    
-    # --- SECTION A: LIVE METRICS ---
-    st.markdown('<div class="section-header">📊 Live Database Overview</div>', unsafe_allow_html=True)
-    col1, col2, col3 = st.columns(3)
-    
-    # Ambil data real-time
-    t_prod, t_cust, t_rev = get_database_summary()
-    
-    with col1:
-        st.metric("Total Produk", f"{t_prod:,}", delta="Items", delta_color="off")
-    with col2:
-        st.metric("Total Pelanggan", f"{t_cust:,}", delta="Active", delta_color="off")
-    with col3:
-        rev_fmt = f"Rp {t_rev:,.0f}".replace(",", ".")
-        st.metric("Total Pendapatan", rev_fmt, delta="All Time", delta_color="off")
+    with landing_area.container():
+        st.markdown('<p class="welcome-text">Selamat datang! Saya adalah asisten pintar yang terhubung langsung ke database penjualan Anda. <strong>Pilih menu cepat di bawah atau ketik pertanyaan Anda.</strong></p>', unsafe_allow_html=True)
+        
+        # --- SECTION A: LIVE METRICS ---
+        st.markdown('<div class="section-header">📊 Live Database Overview</div>', unsafe_allow_html=True)
+        col1, col2, col3 = st.columns(3)
+        
+        # Ambil data real-time
+        t_prod, t_cust, t_rev = get_database_summary()
+        
+        with col1:
+            st.metric("Total Produk", f"{t_prod:,}", delta="Items", delta_color="off")
+        with col2:
+            st.metric("Total Pelanggan", f"{t_cust:,}", delta="Active", delta_color="off")
+        with col3:
+            rev_fmt = f"Rp {t_rev:,.0f}".replace(",", ".")
+            st.metric("Total Pendapatan", rev_fmt, delta="All Time", delta_color="off")
 
-    # --- SECTION B: QUICK ACTION CARDS ---
-    st.markdown('<div class="section-header">🚀 Mulai Analisis Cepat</div>', unsafe_allow_html=True)
-    
-    qc1, qc2, qc3, qc4 = st.columns(4)
-    
-    prompt_clicked = None
-    
-    with qc1:
-        if st.button("🏆 Top Produk", help="Lihat 5 produk termahal", use_container_width=True):
-            prompt_clicked = "Tampilkan 5 produk dengan harga termahal"
-    with qc2:
-        if st.button("📈 Tren Penjualan", help="Analisis tren penjualan per bulan", use_container_width=True):
-            prompt_clicked = "Tampilkan tren penjualan harian berdasarkan tanggal order"
-    with qc3:
-        if st.button("🏙️ Analisis Kota", help="Total pendapatan per kota", use_container_width=True):
-            prompt_clicked = "Berapa total pendapatan dari masing-masing kota?"
-    with qc4:
-        if st.button("📦 Cek Stok", help="Produk dengan stok menipis", use_container_width=True):
-            prompt_clicked = "Tampilkan produk dengan stok kurang dari 20"
+        # --- SECTION B: QUICK ACTION CARDS ---
+        st.markdown('<div class="section-header">🚀 Mulai Analisis Cepat</div>', unsafe_allow_html=True)
+        
+        qc1, qc2, qc3, qc4 = st.columns(4)
+        
+        prompt_clicked = None
+        
+        with qc1:
+            if st.button("🏆 Top Produk", help="Lihat 5 produk termahal", use_container_width=True):
+                prompt_clicked = "Tampilkan 5 produk dengan harga termahal"
+        with qc2:
+            if st.button("📈 Tren Penjualan", help="Analisis tren penjualan per bulan", use_container_width=True):
+                prompt_clicked = "Tampilkan tren penjualan harian berdasarkan tanggal order"
+        with qc3:
+            if st.button("🏙️ Analisis Kota", help="Total pendapatan per kota", use_container_width=True):
+                prompt_clicked = "Berapa total pendapatan dari masing-masing kota?"
+        with qc4:
+            if st.button("📦 Cek Stok", help="Produk dengan stok menipis", use_container_width=True):
+                prompt_clicked = "Tampilkan produk dengan stok kurang dari 20"
 
     if prompt_clicked:
         st.session_state.chat_history.append(("user", prompt_clicked))
@@ -310,96 +405,42 @@ if len(st.session_state.chat_history) == 0:
         st.rerun()
 
 # 3. TAMPILAN CHAT HISTORY
-if len(st.session_state.chat_history) > 0:
+history_rendered = len(st.session_state.chat_history)
+if history_rendered > 0:
     st.markdown('<div class="section-header">💬 Conversation History</div>', unsafe_allow_html=True)
     
-    last_df = None 
-    for role, content in st.session_state.chat_history:
+    # Hanya N giliran terakhir yang dirender agar waktu rerun tetap datar
+    # walau sesi sangat panjang; giliran lama dimuat lewat tombol di bawah.
+    turn_starts = group_turns(st.session_state.chat_history)
+    window_start = turn_starts[max(0, len(turn_starts) - st.session_state.visible_turns)]
+    hidden_turns = len(turn_starts) - st.session_state.visible_turns
+    if hidden_turns > 0 or st.session_state.chat_history_offset > 0:
+        hidden_txt = f"{hidden_turns} giliran" if hidden_turns > 0 else "Percakapan"
+        st.caption(f"{hidden_txt} sebelumnya disembunyikan.")
+        st.button("⬆️ Muat percakapan sebelumnya", key="load_older_turns", on_click=show_older_turns)
+
+    # DataFrame & figure pesan lama diambil dari cache render; hanya pesan baru yang dibangun
+    last_df, last_df_key = None, None
+    for idx in range(window_start, history_rendered):
+        role, content = st.session_state.chat_history[idx]
+        msg_id = message_id(idx)
         if role == "user":
-            with st.chat_message("user", avatar="👤"):
-                st.markdown(content)
+            render_user(content)
         elif role == "assistant_sql":
-            with st.expander("🛠️ Lihat Query SQL", expanded=False):
-                st.code(content, language="sql")
+            render_sql(content)
         elif role == "error":
-            with st.chat_message("assistant", avatar="🤖"):
-                st.error(f"❌ Terjadi kesalahan: {content}")
+            render_error(content)
         elif role == "result":
-            result_data, col_names = content
-            with st.chat_message("assistant", avatar="🤖"):
-                if result_data:
-                    last_df = pd.DataFrame(result_data, columns=col_names)
-                    last_df.index = last_df.index + 1
-                    st.dataframe(last_df, use_container_width=True)
-                else:
-                    st.warning("📭 Tidak ada data.")
-                    last_df = None
+            extra_rows = st.session_state.result_pages.get(msg_id, {}).get("extra_rows", [])
+            last_df_key = ("df", msg_id, len(extra_rows))
+            last_df = cached_render(last_df_key, lambda: result_content_to_dataframe(content, extra_rows))
+            render_result(last_df)
+            render_result_pager(msg_id, len(last_df) if last_df is not None else 0)
         elif role == "insight":
-            with st.chat_message("assistant", avatar="💡"):
-                st.markdown(f"**Analisis:** {content}")
+            render_insight(content)
         elif role == "viz_config":
-            viz_config = content
-            if last_df is not None and not last_df.empty:
-                chart_type = viz_config.get("chart_type")
-                x_col = viz_config.get("x_column")
-                y_col = viz_config.get("y_column")
-                
-                if chart_type != "none":
-                    cols_lower = {c.lower(): c for c in last_df.columns}
-                    x_col = cols_lower.get(x_col.lower(), x_col) if x_col else None
-                    y_col = cols_lower.get(y_col.lower(), y_col) if y_col else None
-
-                    if x_col and y_col and x_col in last_df.columns and y_col in last_df.columns:
-                        try:
-                            template = "plotly_dark"
-                            fig = None
-                            
-                            if chart_type == "bar":
-                                df_sorted = last_df.sort_values(by=y_col, ascending=False).head(10)
-                                fig = px.bar(
-                                    df_sorted, 
-                                    x=x_col, 
-                                    y=y_col, 
-                                    color=x_col,
-                                    template=template,
-                                    title=f"Top {y_col} by {x_col}",
-                                    color_discrete_sequence=px.colors.qualitative.Vivid
-                                )
-                            elif chart_type == "line":
-                                fig = px.line(
-                                    last_df, 
-                                    x=x_col, 
-                                    y=y_col, 
-                                    markers=True,
-                                    template=template,
-                                    title=f"Trend: {y_col} vs {x_col}",
-                                    color_discrete_sequence=['#667eea']
-                                )
-                            elif chart_type == "pie":
-                                fig = px.pie(
-                                    last_df, 
-                                    names=x_col, 
-                                    values=y_col,
-                                    hole=0.4,
-                                    template=template,
-                                    title=f"Distribution of {y_col}",
-                                    color_discrete_sequence=px.colors.qualitative.Vivid
-                                )
-                            
-                            if fig:
-                                fig.update_layout(
-                                    plot_bgcolor="rgba(0,0,0,0)",
-                                    paper_bgcolor="rgba(0,0,0,0)",
-                                    font=dict(color="#e0e0e0"),
-                                    title_font_size=20,
-                                    title_font_color="#667eea",
-                                    showlegend=True,
-                                    height=500
-                                )
-                                with st.chat_message("assistant", avatar="📊"):
-                                    st.plotly_chart(fig, use_container_width=True)
-                        except Exception:
-                            pass
+            fig = cached_render(("fig", msg_id, last_df_key), lambda: build_chart(last_df, content))
+            render_chart(fig)
 
 # 4. PEMROSESAN INPUT
 user_input = st.chat_input("💭 Tanyakan sesuatu tentang data Anda...")
@@ -420,42 +461,100 @@ if process_trigger:
             should_run = False
             
     if should_run:
+        # Jawaban ditampilkan bertahap: SQL & tabel muncul begitu eksekusi selesai,
+        # insight di-stream token per token, grafik menyusul saat siap.
+        # Setiap tahap langsung disimpan ke history.
+        landing_area.empty()
+        if history_rendered == 0:
+            st.markdown('<div class="section-header">💬 Conversation History</div>', unsafe_allow_html=True)
+        if history_rendered < len(st.session_state.chat_history):
+            render_user(user_input)
+
+        # Satu trace telemetry per pertanyaan (no-op jika TELEMETRY mati)
+        start_trace()
+        question_started = time.perf_counter()
+        intent = None
+        viz_plan = None
         schema = get_current_schema()
         history_text = format_chat_history(st.session_state.chat_history[:-1])
 
-        with st.spinner("🔍 Menganalisis pertanyaan..."):
-            try:
-                # 1. Generate SQL & Simpan
-                sql_query = get_sql_query(user_input, schema, chat_history=history_text)
-                st.session_state.chat_history.append(("assistant_sql", sql_query))
-                save_history_to_disk("sql") # <--- SIMPAN
-                
-                # 2. Execute SQL
-                result, columns = execute_sql_query(sql_query)
+        try:
+            # 1. Generate SQL & Simpan
+            # Pertanyaan umum (Quick Action dll.) langsung dari template, tanpa LLM
+            with span("pipeline.intent") as current:
+                intent = match_intent(user_input) if INTENT_FAST_PATH else None
+                current.set(intent=intent[0] if intent else None)
+            if intent:
+                sql_query = intent[1]
+            else:
+                with st.spinner("🔍 Menyusun query SQL..."):
+                    if SQL_MODE == "combined":
+                        # SQL + rencana grafik dalam satu panggilan LLM
+                        sql_query, viz_plan = get_sql_and_visualization(user_input, schema, chat_history=history_text)
+                    else:
+                        sql_query = get_sql_query(user_input, schema, chat_history=history_text)
+            st.session_state.chat_history.append(("assistant_sql", sql_query))
+            save_history_to_disk("sql") # <--- SIMPAN
+            render_sql(sql_query)
+            
+            # 2. Execute SQL
+            result, columns, page_info = run_query_with_cancel(sql_query, user_input)
+            
+            if is_error_result(result):
+                # SQL yang gagal/timeout jangan disimpan di cache pertanyaan
+                forget_sql_query(user_input, schema, chat_history=history_text)
+                st.session_state.chat_history.append(("error", result))
+                save_history_to_disk("sql")
+                render_error(result)
+            else:
+                st.session_state.chat_history.append(("result", make_result_entry(result, columns)))
+                save_history_to_disk("sql") # <--- SIMPAN DATA
+                # Hanya halaman pertama yang disimpan; sisanya diambil saat diminta
+                result_id = message_id(len(st.session_state.chat_history) - 1)
+                st.session_state.result_pages[result_id] = page_info
+                with span("ui.dataframe", rows=len(result)):
+                    df_temp = result_to_dataframe(result, columns) if result else None
+                df_key = ("df", result_id, 0)
+                store_render(df_key, df_temp)
+                render_result(df_temp)
+                render_result_pager(result_id, len(result) if result else 0)
                 
-                if isinstance(result, str) and result.startswith("SQL Error"):
-                    st.session_state.chat_history.append(("error", result))
-                else:
-                    st.session_state.chat_history.append(("result", (result, columns)))
-                    save_history_to_disk("sql") # <--- SIMPAN DATA
+                if result:
+                    # 3. Viz jalan di background, insight di-stream sambil menunggu
+                    # (mode combined: rencana grafik sudah ada, cukup divalidasi lokal)
+                    if viz_plan is None:
+                        viz_future = submit_visualization_recommendation(user_input, df_temp)
+                        viz_deadline = time.monotonic() + LLM_STAGE_TIMEOUT
+
+                    insight_chunks = []
+                    def insight_stream():
+                        yield "**Analisis:** "
+                        for chunk in stream_data_insight(user_input, df_temp, page_info=page_info):
+                            insight_chunks.append(chunk)
+                            yield chunk
+
+                    with st.chat_message("assistant", avatar="💡"):
+                        st.write_stream(insight_stream())
+                    st.session_state.chat_history.append(("insight", "".join(insight_chunks)))
+                    save_history_to_disk("sql")
+
+                    if viz_plan is not None:
+                        viz_config = visualization_from_plan(user_input, df_temp, viz_plan)
+                    else:
+                        with st.spinner("📊 Menyiapkan grafik..."):
+                            viz_config = resolve_visualization(viz_future, viz_deadline - time.monotonic())
+                    st.session_state.chat_history.append(("viz_config", viz_config))
+                    save_history_to_disk("sql") # <--- SIMPAN FINAL
+                    with span("ui.chart", chart=viz_config.get("chart_type", "none")):
+                        fig = build_chart(df_temp, viz_config)
+                    store_render(("fig", message_id(len(st.session_state.chat_history) - 1), df_key), fig)
+                    render_chart(fig)
                     
-                    if result:
-                        df_temp = pd.DataFrame(result, columns=columns)
-                        
-                        # 3. Insight & Viz
-                        insight = generate_data_insight(user_input, df_temp)
-                        st.session_state.chat_history.append(("insight", insight))
-                        
-                        viz_config = get_visualization_recommendation(user_input, df_temp)
-                        st.session_state.chat_history.append(("viz_config", viz_config))
-                
-                save_history_to_disk("sql") # <--- SIMPAN FINAL
-                st.rerun()
-                        
-            except Exception as e:
-                st.session_state.chat_history.append(("error", f"System Error: {str(e)}"))
-                save_history_to_disk("sql") # <--- SIMPAN ERROR
-                st.rerun()
+        except Exception as e:
+            st.session_state.chat_history.append(("error", f"System Error: {str(e)}"))
+            save_history_to_disk("sql") # <--- SIMPAN ERROR
+            render_error(f"System Error: {str(e)}")
+        record_span("pipeline.question", time.perf_counter() - question_started, intent=bool(intent))
 # Download Button
 if len(st.session_state.chat_history) > 0:
     st.markdown("---")
@@ -1,7 +1,13 @@
+import argparse
+import os
 import sqlite3
 import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from faker import Faker
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 
 # Inisialisasi Faker dengan lokasi Indonesia
 fake = Faker('id_ID')
@@ -56,14 +62,17 @@ def create_tables(cursor):
     ''')
     print("✅ Tabel berhasil dibuat.")
 
+CATEGORIES = {
+    'Elektronik': ['Laptop', 'Smartphone', 'Headphone', 'Monitor', 'Mouse', 'Keyboard'],
+    'Pakaian': ['Kemeja Batik', 'Kaos Polos', 'Celana Jeans', 'Jaket Hoodie', 'Sepatu Sneakers'],
+    'Perabot': ['Meja Kerja', 'Kursi Gaming', 'Lampu Tidur', 'Rak Buku', 'Lemari'],
+    'Buku': ['Novel', 'Komik', 'Buku Pemrograman', 'Ensiklopedia']
+}
+CITIES = ['Jakarta', 'Surabaya', 'Bandung', 'Medan', 'Makassar', 'Semarang', 'Yogyakarta', 'Kendari', 'Denpasar']
+
 def generate_data(cursor):
     # --- 1. Generate Produk (50 item) ---
-    categories = {
-        'Elektronik': ['Laptop', 'Smartphone', 'Headphone', 'Monitor', 'Mouse', 'Keyboard'],
-        'Pakaian': ['Kemeja Batik', 'Kaos Polos', 'Celana Jeans', 'Jaket Hoodie', 'Sepatu Sneakers'],
-        'Perabot': ['Meja Kerja', 'Kursi Gaming', 'Lampu Tidur', 'Rak Buku', 'Lemari'],
-        'Buku': ['Novel', 'Komik', 'Buku Pemrograman', 'Ensiklopedia']
-    }
+    categories = CATEGORIES
     
     products = []
     print("⏳ Sedang membuat data produk...")
@@ -92,7 +101,7 @@ def generate_data(cursor):
     # --- 2. Generate Pelanggan (100 orang) ---
     customers = []
     print("⏳ Sedang membuat data pelanggan...")
-    cities = ['Jakarta', 'Surabaya', 'Bandung', 'Medan', 'Makassar', 'Semarang', 'Yogyakarta', 'Kendari', 'Denpasar']
+    cities = CITIES
     
     for _ in range(100):
         name = fake.name()
@@ -139,8 +148,187 @@ def generate_data(cursor):
 
     print("✅ Data dummy berhasil di-generate!")
 
+# --- MODE SKALA BESAR (--scale) ---
+# Volume per scale factor 1; --scale 10 = 1 juta order, ~3 juta item.
+SCALE_PRODUCTS = 500
+SCALE_CUSTOMERS = 10_000
+SCALE_ORDERS = 100_000
+BULK_BATCH_ROWS = 50_000        # Baris per executemany
+BULK_CHUNK_ORDERS = 200_000     # Order yang dibangun sekaligus di memori (per proses)
+
+# Distribusi pelanggan per kota (kota besar lebih dominan)
+CITY_WEIGHTS = [0.30, 0.16, 0.13, 0.10, 0.07, 0.08, 0.07, 0.03, 0.06]
+CATEGORY_WEIGHTS = [0.25, 0.35, 0.15, 0.25]
+# Musiman per bulan (Jan..Des): lebaran/pertengahan tahun & akhir tahun lebih ramai
+MONTH_WEIGHTS = [0.85, 0.80, 0.95, 1.15, 1.05, 1.00, 0.95, 1.00, 1.00, 1.05, 1.25, 1.45]
+WEEKDAY_WEIGHTS = [0.95, 0.90, 0.90, 0.95, 1.05, 1.20, 1.10]   # Senin..Minggu
+PROMO_DAYS = {(9, 9): 2.5, (10, 10): 2.5, (11, 11): 3.5, (12, 12): 4.0}  # Harbolnas dkk.
+PRODUCT_ZIPF = 1.1    # Popularitas produk: segelintir produk sangat laris
+CUSTOMER_PARETO = 1.3 # Aktivitas pelanggan: sebagian kecil pelanggan sangat sering belanja
+ORDER_SIZE_WEIGHTS = [0.45, 0.25, 0.15, 0.10, 0.05]  # 1..5 item per order
+
+
+def _bulk_pragmas(conn):
+    # Tanpa journal & fsync: aman untuk file baru yang bisa dibuat ulang kapan saja
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")   # 256 MB
+
+
+def _insert_batches(conn, sql, rows):
+    for start in range(0, len(rows), BULK_BATCH_ROWS):
+        conn.executemany(sql, rows[start:start + BULK_BATCH_ROWS])
+
+
+def _day_weights(days):
+    """Bobot per tanggal: musiman bulanan x hari dalam minggu x hari promo x tren tumbuh."""
+    weights = np.array([
+        MONTH_WEIGHTS[d.month - 1] * WEEKDAY_WEIGHTS[d.weekday()] * PROMO_DAYS.get((d.month, d.day), 1.0)
+        for d in days
+    ])
+    weights *= np.linspace(0.8, 1.2, len(days))
+    return weights / weights.sum()
+
+
+def _bulk_products(rng, n):
+    cat_idx = rng.choice(len(CATEGORIES), size=n, p=CATEGORY_WEIGHTS)
+    names = list(CATEGORIES)
+    words = [fake.word().capitalize() for _ in range(300)]
+    low_high = {'Elektronik': (1_000_000, 15_000_000), 'Perabot': (500_000, 3_000_000)}
+    rows, prices = [], np.empty(n, dtype=np.int64)
+    for i, c in enumerate(cat_idx):
+        cat = names[c]
+        lo, hi = low_high.get(cat, (50_000, 500_000))
+        prices[i] = round(int(rng.integers(lo, hi)), -3)
+        item = CATEGORIES[cat][rng.integers(len(CATEGORIES[cat]))]
+        rows.append((i + 1, f"{item} {words[rng.integers(len(words))]}", cat, int(prices[i]), int(rng.integers(5, 500))))
+    return rows, prices
+
+
+def _bulk_customers(rng, n, today):
+    first = [fake.first_name() for _ in range(400)]
+    last = [fake.last_name() for _ in range(400)]
+    city_idx = rng.choice(len(CITIES), size=n, p=CITY_WEIGHTS)
+    join_offsets = rng.integers(0, 730, size=n)
+    return [
+        (i + 1, f"{first[rng.integers(400)]} {last[rng.integers(400)]}", CITIES[city_idx[i]],
+         (today - timedelta(days=int(join_offsets[i]))).isoformat())
+        for i in range(n)
+    ]
+
+
+def _build_orders(seed, first_order_id, n_orders, prices, n_customers, today, db_path=None, conn=None):
+    """
+    Membangun n_orders order (+ item) secara vektor (NumPy) lalu menulisnya ke `conn`
+    atau ke file partisi baru `db_path` (mode paralel). Mengembalikan db_path.
+    """
+    rng = np.random.default_rng(seed)
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        _bulk_pragmas(conn)
+        conn.execute("CREATE TABLE orders (order_id INTEGER PRIMARY KEY, customer_id INTEGER, order_date DATE, total_amount INTEGER)")
+        conn.execute("CREATE TABLE order_items (order_id INTEGER, product_id INTEGER, quantity INTEGER, subtotal INTEGER)")
+
+    days = [today - timedelta(days=d) for d in range(364, -1, -1)]
+    day_p = _day_weights(days)
+    day_str = np.array([d.isoformat() for d in days])
+    product_p = 1.0 / np.arange(1, len(prices) + 1) ** PRODUCT_ZIPF
+    product_p /= product_p.sum()
+    customer_p = rng.pareto(CUSTOMER_PARETO, n_customers) + 1
+    customer_p /= customer_p.sum()
+
+    conn.execute("BEGIN")
+    for chunk_start in range(0, n_orders, BULK_CHUNK_ORDERS):
+        n = min(BULK_CHUNK_ORDERS, n_orders - chunk_start)
+        order_ids = np.arange(first_order_id + chunk_start, first_order_id + chunk_start + n)
+        customers = rng.choice(n_customers, size=n, p=customer_p) + 1
+        order_days = rng.choice(len(days), size=n, p=day_p)
+
+        sizes = rng.choice(len(ORDER_SIZE_WEIGHTS), size=n, p=ORDER_SIZE_WEIGHTS) + 1
+        item_orders = np.repeat(order_ids, sizes)
+        item_products = rng.choice(len(prices), size=len(item_orders), p=product_p)
+        item_qty = rng.choice(3, size=len(item_orders), p=[0.7, 0.2, 0.1]) + 1
+        item_subtotal = prices[item_products] * item_qty
+        # Total order = jumlah subtotal item (tanpa UPDATE per order)
+        totals = np.bincount(item_orders - order_ids[0], weights=item_subtotal, minlength=n).astype(np.int64)
+
+        _insert_batches(conn, "INSERT INTO orders (order_id, customer_id, order_date, total_amount) VALUES (?, ?, ?, ?)",
+                        list(zip(order_ids.tolist(), customers.tolist(), day_str[order_days].tolist(), totals.tolist())))
+        _insert_batches(conn, "INSERT INTO order_items (order_id, product_id, quantity, subtotal) VALUES (?, ?, ?, ?)",
+                        list(zip(item_orders.tolist(), (item_products + 1).tolist(), item_qty.tolist(), item_subtotal.tolist())))
+    conn.execute("COMMIT")
+    if own_conn:
+        conn.close()
+    return db_path
+
+
+def generate_bulk_data(conn, scale: float, workers: int = 1, seed: int = 42):
+    """Data sintetis skala besar: skew produk/pelanggan, musiman, distribusi kota."""
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    Faker.seed(seed)
+    today = date.today()
+    n_products = max(50, int(SCALE_PRODUCTS * scale))
+    n_customers = max(100, int(SCALE_CUSTOMERS * scale))
+    n_orders = max(200, int(SCALE_ORDERS * scale))
+
+    print(f"⏳ Membuat {n_products:,} produk & {n_customers:,} pelanggan...")
+    product_rows, prices = _bulk_products(rng, n_products)
+    conn.execute("BEGIN")
+    _insert_batches(conn, "INSERT INTO products (product_id, name, category, price, stock_quantity) VALUES (?, ?, ?, ?, ?)", product_rows)
+    _insert_batches(conn, "INSERT INTO customers (customer_id, name, city, join_date) VALUES (?, ?, ?, ?)",
+                    _bulk_customers(rng, n_customers, today))
+    conn.execute("COMMIT")
+
+    print(f"⏳ Membuat {n_orders:,} order dengan {workers} worker...")
+    if workers <= 1:
+        _build_orders(seed, 1, n_orders, prices, n_customers, today, conn=conn)
+    else:
+        # Setiap worker menulis file partisi sendiri (rentang order_id terpisah), lalu digabung
+        tmp_dir = tempfile.mkdtemp(prefix="seed_")
+        per_worker = -(-n_orders // workers)
+        jobs = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for w in range(workers):
+                first = w * per_worker
+                count = min(per_worker, n_orders - first)
+                if count <= 0:
+                    break
+                path = os.path.join(tmp_dir, f"part_{w}.db")
+                jobs.append(pool.submit(_build_orders, seed + 1000 + w, first + 1, count, prices, n_customers, today, path))
+            parts = [job.result() for job in jobs]
+
+        print("⏳ Menggabungkan partisi...")
+        for path in parts:
+            conn.execute("ATTACH DATABASE ? AS part", (path,))
+            conn.execute("BEGIN")
+            conn.execute("INSERT INTO orders SELECT * FROM part.orders")
+            conn.execute("INSERT INTO order_items (order_id, product_id, quantity, subtotal) SELECT * FROM part.order_items")
+            conn.execute("COMMIT")
+            conn.execute("DETACH DATABASE part")
+            os.remove(path)
+        os.rmdir(tmp_dir)
+
+    # Statistik untuk query planner (dipakai juga oleh query_guard)
+    conn.execute("ANALYZE")
+    print(f"✅ Data skala {scale:g} selesai dalam {time.perf_counter() - started:.1f} detik.")
+
 def main():
-    conn = sqlite3.connect(DB_NAME)
+    parser = argparse.ArgumentParser(description="Generate database dummy e-commerce")
+    parser.add_argument("--summary-table", action="store_true",
+                        help="Buat tabel ringkasan dashboard yang dirawat trigger (metrik O(1))")
+    parser.add_argument("--db", default=DB_NAME, help="Path file database")
+    parser.add_argument("--scale", type=float, default=0,
+                        help="Scale factor data sintetis (1 = 100 ribu order); 0 = data demo kecil")
+    parser.add_argument("--workers", type=int, default=1, help="Jumlah proses paralel untuk mode --scale")
+    parser.add_argument("--seed", type=int, default=42, help="Seed acak mode --scale (hasil reproducible)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
     cursor = conn.cursor()
     
     # Bersihkan data lama jika ada (opsional, agar tidak duplikat saat run ulang)
@@ -148,13 +336,29 @@ def main():
     cursor.execute("DROP TABLE IF EXISTS orders")
     cursor.execute("DROP TABLE IF EXISTS customers")
     cursor.execute("DROP TABLE IF EXISTS products")
+    cursor.execute("DROP TABLE IF EXISTS dashboard_summary")
     
     create_tables(cursor)
-    generate_data(cursor)
+    if args.scale > 0:
+        conn.commit()
+        conn.isolation_level = None
+        _bulk_pragmas(conn)
+        generate_bulk_data(conn, args.scale, workers=args.workers, seed=args.seed)
+        # Kembali ke mode journal normal agar aplikasi bisa membuka file seperti biasa
+        conn.execute("PRAGMA locking_mode = NORMAL")
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.isolation_level = ""
+    else:
+        generate_data(cursor)
+    
+    if args.summary_table:
+        from module.dashboard_utils import install_summary_table
+        install_summary_table(conn)
+        print("✅ Tabel ringkasan dashboard + trigger berhasil dibuat.")
     
     conn.commit()
     conn.close()
-    print(f"🎉 Database '{DB_NAME}' siap digunakan untuk proyek LLM kamu!")
+    print(f"🎉 Database '{args.db}' siap digunakan untuk proyek LLM kamu!")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
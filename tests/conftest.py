@@ -0,0 +1,25 @@
+# ----------------------- conftest.py -----------------------
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+
+# Semua file data (database, cache, history, workload log) dibuat di direktori
+# sementara; ecommerce.db di repo tidak pernah diubah. Env di-set sebelum modul
+# aplikasi di-import karena module.config membacanya saat import.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="nl2sql_tests_")
+DB_PATH = os.path.join(WORKDIR, "ecommerce.db")
+
+shutil.copy(os.path.join(ROOT, "ecommerce.db"), DB_PATH)
+os.environ["DATABASE_PATH"] = DB_PATH
+os.environ["WORKLOAD_LOG_PATH"] = os.path.join(WORKDIR, "workload_log.db")
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.chdir(WORKDIR)
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def db_path():
+    return DB_PATH
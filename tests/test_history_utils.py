@@ -0,0 +1,87 @@
+# ----------------------- test_history_utils.py -----------------------
+import pytest
+from module.history_utils import HistoryStore
+
+# Giliran dengan panjang berbeda: sukses (4 pesan), error (3 pesan), tanpa data (2 pesan)
+TURN_SHAPES = [
+    ["user", "assistant_sql", "result", "insight"],
+    ["user", "assistant_sql", "error"],
+    ["user", "assistant_sql"],
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    messages = []
+    for turn in range(25):
+        messages += [(role, f"{turn}:{role}") for role in TURN_SHAPES[turn % len(TURN_SHAPES)]]
+    store.append("sql", messages)
+    return store, messages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 7, 10, 50, 1000])
+def test_load_tail_starts_at_user_turn(store, limit):
+    store, messages = store
+    start, loaded = store.load_tail("sql", limit)
+    assert loaded == messages[start:]
+    assert loaded[0][0] == "user"
+    # Giliran terakhir selalu dimuat utuh, meski lebih panjang dari limit
+    last_turn = max(i for i, (role, _) in enumerate(messages) if role == "user")
+    assert start <= last_turn
+    assert start >= min(len(messages) - limit, last_turn)
+
+
+@pytest.mark.parametrize("limit", [1, 3, 6, 10, 40])
+def test_load_before_pages_back_through_whole_turns(store, limit):
+    store, messages = store
+    start, loaded = store.load_tail("sql", limit)
+    pages = [loaded]
+    while start > 0:
+        new_start, older = store.load_before("sql", start, limit)
+        assert new_start < start
+        assert older == messages[new_start:start]
+        assert older[0][0] == "user"
+        start = new_start
+        pages.insert(0, older)
+    assert [m for page in pages for m in page] == messages
+
+
+def test_load_before_without_user_message_goes_to_start(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    messages = [("assistant_sql", "SELECT 1"), ("result", ([], [])), ("user", "q"), ("assistant_sql", "SELECT 2")]
+    store.append("sql", messages)
+    assert store.load_before("sql", 2, 1) == (0, messages[:2])
+
+
+def test_conversations_do_not_interleave(tmp_path):
+    # Dua tab menyimpan bergantian ke store yang sama
+    store = HistoryStore(str(tmp_path / "history.db"))
+    for turn in range(3):
+        for tab in ("a", "b"):
+            store.append("sql", [("user", f"{tab}{turn}?"), ("assistant_sql", f"SELECT '{tab}{turn}'")], conversation=tab)
+    for tab in ("a", "b"):
+        start, loaded = store.load_tail("sql", 3, conversation=tab)
+        assert store.count("sql", conversation=tab) == 6
+        assert loaded == [("user", f"{tab}2?"), ("assistant_sql", f"SELECT '{tab}2'")]
+        assert store.load_before("sql", start, 2, conversation=tab)[1] == [
+            ("user", f"{tab}1?"), ("assistant_sql", f"SELECT '{tab}1'")
+        ]
+    store.clear(conversation="a")
+    assert store.count("sql", conversation="a") == 0
+    assert store.count("sql", conversation="b") == 6
+
+
+def test_legacy_history_file_gets_conversation_column(tmp_path):
+    import pickle
+    import sqlite3
+
+    path = str(tmp_path / "history.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE messages (seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, "
+            "role TEXT NOT NULL, payload BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO messages (kind, role, payload, created_at) VALUES ('sql', 'user', ?, 0)",
+                     (pickle.dumps("halo"),))
+    assert HistoryStore(path).load_tail("sql") == (0, [("user", "halo")])
@@ -0,0 +1,35 @@
+# ----------------------- test_insight_utils.py -----------------------
+import pandas as pd
+from module.insight_utils import summarize_dataframe, format_digest, local_insight
+
+DF = pd.DataFrame({"city": ["Jakarta", "Bandung", "Surabaya"], "total_amount": [500, 300, 100]})
+
+
+def test_full_result_has_no_truncation_note():
+    digest = summarize_dataframe(DF)
+    assert "truncated" not in digest
+    assert "terpotong" not in format_digest(digest)
+
+
+def test_truncated_result_is_flagged():
+    digest = summarize_dataframe(DF, truncated=True, total_rows=5432)
+    assert digest["total_rows"] == 5432
+    assert "hanya 3 dari 5.432 baris" in format_digest(digest)
+    assert "3 baris pertama dari 5.432" in local_insight("", digest)
+
+
+def test_truncated_unknown_total():
+    digest = summarize_dataframe(DF, truncated=True)
+    assert "lebih dari 3" in format_digest(digest)
+
+
+def test_duplicate_column_names():
+    # SELECT * FROM orders JOIN customers -> customer_id dua kali
+    df = pd.DataFrame(
+        [[1, 10, 500, 10, "Jakarta"], [2, 11, 300, 11, "Bandung"]],
+        columns=["order_id", "customer_id", "total_amount", "customer_id", "city"],
+    )
+    digest = summarize_dataframe(df)
+    assert digest["measure"] == "total_amount"
+    assert digest["dimension"] == "city"
+    assert "Jakarta" in local_insight("", digest)
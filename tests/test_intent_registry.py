@@ -0,0 +1,61 @@
+import pytest
+from module.intent_registry import match_intent
+
+
+@pytest.mark.parametrize("question, intent", [
+    # Quick Action
+    ("Tampilkan 5 produk dengan harga termahal", "produk_termahal"),
+    ("Tampilkan tren penjualan harian berdasarkan tanggal order", "tren_penjualan_harian"),
+    ("Berapa total pendapatan dari masing-masing kota?", "pendapatan_per_kota"),
+    ("Tampilkan produk dengan stok kurang dari 20", "stok_menipis"),
+    # Frasa lain yang didukung
+    ("produk termurah", "produk_termurah"),
+    ("10 produk yang paling banyak terjual", "produk_terlaris"),
+    ("stok menipis", "stok_menipis"),
+    ("tren penjualan", "tren_penjualan_bulanan"),
+    ("pendapatan per kategori", "pendapatan_per_kategori"),
+    ("pendapatan di Jakarta", "pendapatan_kota"),
+    ("pelanggan di Bandung", "pelanggan_kota"),
+    ("produk elektronik", "produk_kategori"),
+    ("tunjukkan 3 produk terlaris", "produk_terlaris"),
+    ("apa produk termurah?", "produk_termurah"),
+    ("tren penjualan per hari", "tren_penjualan_harian"),
+])
+def test_supported_phrasings_match(question, intent, db_path):
+    match = match_intent(question, db_path)
+    assert match is not None and match[0] == intent
+
+
+@pytest.mark.parametrize("question", [
+    "Tampilkan produk dengan stok lebih dari 50 yang harganya rendah",
+    "produk dengan stok tidak kurang dari 20",
+    "jumlah pelanggan di Bandung",
+    "berapa pelanggan di Bandung",
+    "rata-rata pendapatan per kota",
+    "berapa rata rata pendapatan per kota",
+    "avg pendapatan per kategori",
+    "produk termahal di atas 1 juta",
+    "produk yang bukan termahal",
+    "produk elektronik yang paling mahal di Medan",
+    "penjualan per kota tahun 2024",
+    # Subjek lain / filter tambahan di sekitar frasa intent
+    "pelanggan yang membeli produk termahal",
+    "tampilkan pendapatan dari produk elektronik",
+    "pelanggan yang paling sering membeli produk elektronik",
+    "kota dengan produk terlaris",
+    "siapa pembeli 5 produk terlaris",
+    "nama pelanggan yang membeli produk dengan stok menipis",
+    "tren penjualan harian produk Laptop",
+    "tren penjualan harian untuk pelanggan Budi",
+    "tren penjualan harian kuartal 3",
+    "transaksi dengan produk termurah",
+])
+def test_other_meanings_go_to_llm(question, db_path):
+    assert match_intent(question, db_path) is None
+
+
+def test_limit_and_slot_values(db_path):
+    assert match_intent("Tampilkan 5 produk dengan harga termahal", db_path)[1].endswith("LIMIT 5")
+    assert "LIMIT" not in match_intent("semua produk termahal", db_path)[1]
+    assert "stock_quantity < 20" in match_intent("Tampilkan produk dengan stok kurang dari 20", db_path)[1]
+    assert "c.city = 'Jakarta'" in match_intent("pendapatan di jakarta", db_path)[1]
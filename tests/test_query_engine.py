@@ -0,0 +1,66 @@
+# ----------------------- test_query_engine.py -----------------------
+import threading
+import time
+import pandas as pd
+import module.query_engine as query_engine
+
+DF = pd.DataFrame({"city": ["Jakarta", "Bandung"], "total_amount": [500, 300]})
+
+
+class _SlowChain:
+    def __init__(self, first_delay: float, gap: float = 0.0):
+        self.first_delay, self.gap = first_delay, gap
+        self.closed = threading.Event()
+
+    def stream(self, inputs):
+        try:
+            time.sleep(self.first_delay)
+            yield "Jakarta"
+            for word in (" memimpin", " penjualan"):
+                time.sleep(self.gap)
+                yield word
+        finally:
+            self.closed.set()
+
+
+def _stream(monkeypatch, chain, timeout):
+    monkeypatch.setattr(query_engine, "INSIGHT_MODE", "llm")
+    monkeypatch.setattr(query_engine, "get_chain", lambda *args, **kwargs: chain)
+    started = time.monotonic()
+    chunks = list(query_engine.stream_data_insight("kota terlaris", DF, timeout=timeout))
+    return chunks, time.monotonic() - started
+
+
+def test_stream_completes_within_deadline(monkeypatch):
+    chunks, _ = _stream(monkeypatch, _SlowChain(0), timeout=5)
+    assert "".join(chunks) == "Jakarta memimpin penjualan"
+
+
+def test_deadline_applies_to_first_chunk(monkeypatch):
+    chunks, elapsed = _stream(monkeypatch, _SlowChain(first_delay=1.0), timeout=0.2)
+    assert chunks == [query_engine.INSIGHT_FALLBACK]
+    assert elapsed < 0.8
+
+
+def test_deadline_between_chunks_keeps_partial_text(monkeypatch):
+    chunks, _ = _stream(monkeypatch, _SlowChain(0, gap=0.5), timeout=0.3)
+    assert chunks == ["Jakarta", " …"]
+
+
+def test_digest_failure_falls_back(monkeypatch):
+    def broken(*args, **kwargs):
+        raise AttributeError("'DataFrame' object has no attribute 'name'")
+
+    monkeypatch.setattr(query_engine, "summarize_dataframe", broken)
+    assert list(query_engine.stream_data_insight("q", DF)) == [query_engine.INSIGHT_FALLBACK]
+
+
+def test_timed_out_stream_is_closed(monkeypatch):
+    chain = _SlowChain(first_delay=0.5)
+    calls = []
+    monkeypatch.setattr(query_engine, "INSIGHT_MODE", "llm")
+    monkeypatch.setattr(query_engine, "get_chain", lambda *args, **kwargs: calls.append(kwargs) or chain)
+    assert list(query_engine.stream_data_insight("q", DF, timeout=0.1)) == [query_engine.INSIGHT_FALLBACK]
+    # Deadline diteruskan ke client LLM, dan generator ditutup setelah chunk yang tertunda kembali
+    assert calls[0]["timeout"] == 0.1
+    assert chain.closed.wait(2)
@@ -0,0 +1,102 @@
+# ----------------------- test_query_guard.py -----------------------
+import pytest
+import module.query_guard as query_guard
+import module.telemetry as telemetry
+from module.connection_pool import get_pool
+from module.query_guard import guard_query, is_aggregate_query, original_column_names
+
+# ecommerce.db kecil (orders 200 baris, order_items 576), jadi ambang guard
+# diturunkan agar aturan full scan & join mahal ikut teruji.
+
+
+@pytest.fixture
+def small_thresholds(monkeypatch):
+    monkeypatch.setattr(query_guard, "GUARD_LARGE_TABLE_ROWS", 100)
+    monkeypatch.setattr(query_guard, "GUARD_MAX_ROWS", 50)
+    monkeypatch.setattr(query_guard, "GUARD_MAX_JOIN_COST", 10_000)
+
+
+def _guard(db_path, query):
+    with get_pool(db_path).connection() as conn:
+        return guard_query(conn, query, db_path)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT COUNT(*) FROM orders", True),
+    ("SELECT customer_id, SUM(total_amount) FROM orders GROUP BY customer_id", True),
+    ("SELECT * FROM orders WHERE total_amount > (SELECT AVG(total_amount) FROM orders)", False),
+    ("SELECT order_id, SUM(total_amount) OVER (ORDER BY order_date) FROM orders", False),
+    ("SELECT * FROM orders WHERE order_date = 'group by'", False),
+    ("SELECT * FROM orders", False),
+])
+def test_is_aggregate_query(query, expected):
+    assert is_aggregate_query(query) is expected
+
+
+def test_full_scan_gets_limit(small_thresholds, db_path):
+    query, error = _guard(db_path, "SELECT * FROM orders")
+    assert error is None
+    assert query == "SELECT * FROM orders\nLIMIT 50"
+
+
+def test_large_limit_is_tightened(small_thresholds, db_path):
+    query, error = _guard(db_path, "SELECT * FROM orders ORDER BY order_date LIMIT 500")
+    assert error is None
+    assert query == "SELECT * FROM orders ORDER BY order_date LIMIT 50"
+
+
+def test_small_limit_untouched(small_thresholds, db_path):
+    assert _guard(db_path, "SELECT * FROM orders LIMIT 10") == ("SELECT * FROM orders LIMIT 10", None)
+
+
+def test_aggregate_not_wrapped(small_thresholds, db_path):
+    sql = "SELECT customer_id, COUNT(*) FROM orders GROUP BY customer_id"
+    assert _guard(db_path, sql) == (sql, None)
+
+
+def test_expensive_join_rejected(small_thresholds, db_path):
+    sql = "SELECT * FROM orders o JOIN order_items i ON i.quantity < o.total_amount"
+    query, error = _guard(db_path, sql)
+    assert query == sql
+    assert error.startswith("SQL Error: Query ditolak karena join terlalu mahal")
+    assert "kombinasi baris" in error
+
+
+def test_keyed_join_allowed(small_thresholds, db_path):
+    sql = "SELECT o.order_id, i.quantity FROM orders o JOIN order_items i ON i.order_id = o.order_id LIMIT 10"
+    assert _guard(db_path, sql) == (sql, None)
+
+
+def test_rewrite_reported_on_span(small_thresholds, monkeypatch, db_path):
+    monkeypatch.setattr(telemetry, "TELEMETRY_ENABLED", True)
+    with telemetry.span("sql.guard") as s:
+        _guard(db_path, "SELECT * FROM orders")
+    assert s.attrs == {"guard": "limit_added", "limit": 50}
+
+
+def test_limit_after_trailing_comment(small_thresholds, db_path):
+    query, _ = _guard(db_path, "SELECT * FROM orders ORDER BY order_date -- terbaru dulu")
+    assert query.endswith("\nLIMIT 50")
+    with get_pool(db_path).connection() as conn:
+        assert len(conn.execute(query).fetchall()) == 50
+
+
+def test_offset_comma_limit_is_tightened(small_thresholds, db_path):
+    query, _ = _guard(db_path, "SELECT * FROM orders LIMIT 5, 500")
+    assert query == "SELECT * FROM orders LIMIT 5, 50"
+
+
+def test_expression_limit_is_wrapped(small_thresholds, db_path):
+    query, _ = _guard(db_path, "SELECT * FROM orders LIMIT (SELECT COUNT(*) FROM orders)")
+    assert query.startswith("SELECT * FROM (") and query.endswith(") LIMIT 50")
+
+
+def test_join_columns_keep_duplicate_names(small_thresholds, db_path):
+    sql = "SELECT * FROM orders o JOIN customers c ON c.customer_id = o.customer_id"
+    guarded, _ = _guard(db_path, sql)
+    with get_pool(db_path).connection() as conn:
+        plain = [d[0] for d in conn.execute(sql).description]
+        assert [d[0] for d in conn.execute(guarded).description] == plain
+        wrapped = [d[0] for d in conn.execute(f"SELECT * FROM ({sql}) LIMIT 1").description]
+    assert "customer_id:1" in wrapped
+    assert original_column_names(wrapped) == plain
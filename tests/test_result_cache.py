@@ -0,0 +1,13 @@
+# ----------------------- test_result_cache.py -----------------------
+from module.config import RESULT_CACHE_COMPACT_ROWS, RESULT_PAGE_ROWS
+from module.result_cache import QueryResultCache
+
+
+def test_full_page_is_stored_compressed():
+    # Satu halaman penuh harus melewati ambang kompresi, kalau tidak cabangnya mati
+    assert RESULT_CACHE_COMPACT_ROWS < RESULT_PAGE_ROWS
+    cache = QueryResultCache()
+    rows = [(i, f"kota{i % 7}", i * 1.5) for i in range(RESULT_PAGE_ROWS)]
+    cache.put("SELECT * FROM orders", rows, ["a", "b", "c"], meta={"truncated": True})
+    assert next(iter(cache._entries.values()))[2] is True
+    assert cache.get("SELECT *  FROM orders") == (rows, ["a", "b", "c"], {"truncated": True})
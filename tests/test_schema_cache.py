@@ -0,0 +1,15 @@
+# ----------------------- test_schema_cache.py -----------------------
+import shutil
+import sqlite3
+from module.schema_cache import get_schema_info
+
+
+def test_schema_hides_sqlite_internal_tables(tmp_path, db_path):
+    # ANALYZE membuat sqlite_stat1; tabel sqlite_* tidak boleh masuk prompt
+    path = str(tmp_path / "analyzed.db")
+    shutil.copy(db_path, path)
+    with sqlite3.connect(path) as conn:
+        conn.execute("ANALYZE")
+    info = get_schema_info(path)
+    assert "orders" in info["tables"]
+    assert not [name for name in info["tables"] if name.startswith("sqlite_")]
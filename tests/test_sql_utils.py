@@ -0,0 +1,37 @@
+# ----------------------- test_sql_utils.py -----------------------
+import module.query_guard as query_guard
+import module.sql_utils as sql_utils
+from module.result_cache import result_cache
+
+
+def test_result_cache_hit_on_guarded_query(monkeypatch):
+    # Guard menulis ulang query (LIMIT disisipkan); eksekusi kedua harus tetap cache hit
+    monkeypatch.setattr(query_guard, "GUARD_LARGE_TABLE_ROWS", 100)
+    monkeypatch.setattr(query_guard, "GUARD_MAX_ROWS", 50)
+    result_cache.clear()
+    guarded = []
+    real_guard = sql_utils.guard_query
+
+    def counting_guard(conn, query, *args):
+        guarded.append(query)
+        return real_guard(conn, query, *args)
+
+    monkeypatch.setattr(sql_utils, "guard_query", counting_guard)
+
+    rows, cols, info = sql_utils.execute_sql_page("SELECT * FROM orders")
+    assert len(rows) == 50
+    assert info["query"].endswith("\nLIMIT 50")
+
+    cached_rows, cached_cols, cached_info = sql_utils.execute_sql_page("SELECT * FROM orders")
+    assert len(guarded) == 1
+    assert cached_rows == rows and cached_cols == cols
+    assert cached_info["query"] == info["query"]
+
+
+def test_paged_join_keeps_column_names():
+    sql = "SELECT * FROM orders o JOIN customers c ON c.customer_id = o.customer_id"
+    _, first_cols, info = sql_utils.execute_sql_page(sql, page_size=10, use_cache=False)
+    _, next_cols, _ = sql_utils.execute_sql_page(info["query"], offset=info["next_offset"], page_size=10,
+                                                 use_cache=False)
+    assert first_cols.count("customer_id") == 2
+    assert next_cols == first_cols
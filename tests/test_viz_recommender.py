@@ -0,0 +1,35 @@
+# ----------------------- test_viz_recommender.py -----------------------
+import pandas as pd
+import pytest
+from module.viz_recommender import _is_date_like, classify_columns, recommend_visualization, validate_visualization
+
+
+@pytest.mark.parametrize("series, expected", [
+    (pd.Series([2023, 2024], name="tahun"), True),
+    (pd.Series([1, 2], name="bulan"), True),
+    (pd.Series([20240101, 20240102], name="order_date"), True),
+    (pd.Series([120, 340], name="penjualan_harian"), False),
+    (pd.Series([5, 7], name="total_bulanan"), False),
+    (pd.Series([1.5, 2.5], name="tahun"), False),
+    (pd.Series(["2024-01", "2024-02"], name="bulan_order"), True),
+    (pd.Series(["2024-01-05", "2024-01-06"], name="x"), True),
+    (pd.Series(["Jakarta", "Bandung"], name="city"), False),
+    (pd.to_datetime(pd.Series(["2024-01-05"], name="x")), True),
+])
+def test_is_date_like(series, expected):
+    assert _is_date_like(series) is expected
+
+
+def test_duplicate_column_names_are_skipped():
+    # SELECT * atas orders JOIN customers -> customer_id muncul dua kali
+    df = pd.DataFrame(
+        [[1, 10, 500, 10, "Jakarta"], [2, 11, 300, 11, "Bandung"], [3, 12, 100, 12, "Medan"]],
+        columns=["order_id", "customer_id", "total_amount", "customer_id", "city"],
+    )
+    kinds = classify_columns(df)
+    assert "customer_id" not in kinds["numeric"] + kinds["category"]
+    assert kinds["measure"] == ["total_amount"]
+    assert recommend_visualization("pendapatan per kota", df) == {
+        "chart_type": "bar", "x_column": "city", "y_column": "total_amount"
+    }
+    assert validate_visualization({"chart_type": "pie", "x_column": "customer_id", "y_column": "total_amount"}, df) is None